@@ -26,6 +26,9 @@ def main():
         parser.add_argument('-br', '--branch', dest='branch', action='store',
                             help='major number of snapshots being published', required=True)
 
+        parser.add_argument('--full', dest='full', action='store_true',
+                            help='test every project, not only those changed since their last successful test',
+                            default=False)
         Tools.add_standard_cli_arguments(parser)
 
         args = parser.parse_args()
@@ -53,6 +56,9 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
 
         tools.checkout_branch(counter.next_step(), branch)
 
@@ -64,7 +70,8 @@ def main():
 
         tools.run_make_clean_install(counter.next_step())
 
-        tools.run_make_test(counter.next_step())
+        tools.run_make_test(counter.next_step(), full=args.full)
+        tools.finish()
 
     except Exception as e:
         print(e)
@@ -44,6 +44,9 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
 
         tools.checkout_branch(counter.next_step(), "master")
 
@@ -54,6 +57,7 @@ def main():
         tools.run_make_pull(counter.next_step())
 
         tools.run_make_install(counter.next_step())
+        tools.finish()
 
     except Exception as err:
         print(err)
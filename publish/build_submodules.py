@@ -38,8 +38,12 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
 
         tools.run_make_clean_install(counter.next_step())
+        tools.finish()
 
     except Exception as e:
         print(e)
@@ -49,6 +49,9 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
 
         #
         # Change repo's release versions and references
@@ -67,6 +70,7 @@ def main():
                 - Then run generate snapshots
             """
         )
+        tools.finish()
     except Exception as e:
         print(e)
         sys.exit(2)
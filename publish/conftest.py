@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# the scripts import publish_utils with publish/ on the path, as it is when they are run
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# a release script and a module of publish_utils, not tests
+collect_ignore = ["test_submodules.py", "publish_utils/test_selection.py"]
+
+
+def git(*args, cwd="."):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, text=True, capture_output=True).stdout
+
+
+def make_repo(path, files=None):
+    """a git repo at path with files (name -> content) committed"""
+    os.makedirs(path, exist_ok=True)
+    git("init", "-q", cwd=path)
+    git("config", "user.name", "test", cwd=path)
+    git("config", "user.email", "test@example.com", cwd=path)
+    for name, content in (files or {"README.md": "readme\n"}).items():
+        with open(os.path.join(path, name), "w") as output_file:
+            output_file.write(content)
+    git("add", "-A", cwd=path)
+    git("commit", "-q", "-m", "initial", cwd=path)
+    return path
+
+
+def process_is_gone(pid: int) -> bool:
+    """true if pid has exited (a zombie that nothing has reaped yet counts as gone)"""
+    try:
+        with open(f"/proc/{pid}/stat") as input_file:
+            return input_file.read().split(")")[-1].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+def is_gone_soon(pid: int) -> bool:
+    """waits up to 5 seconds for pid to exit"""
+    for _ in range(50):
+        if process_is_gone(pid):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+@pytest.fixture
+def release_dir(tmp_path, monkeypatch):
+    """a repo that Tools accepts as a clone of chisel-release; Tools changes into it, so the cwd is restored afterwards"""
+    path = make_repo(str(tmp_path / "chisel-release"))
+    git("remote", "add", "origin", "https://github.com/ucb-bar/chisel-release.git", cwd=path)
+    monkeypatch.chdir(tmp_path)
+    return path
+
+
+@pytest.fixture
+def new_repo():
+    """make_repo, for tests that need more than one repo"""
+    return make_repo
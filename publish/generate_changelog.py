@@ -7,6 +7,7 @@ from datetime import datetime
 
 from publish_utils.tools import Tools
 from publish_utils.step_counter import StepCounter
+from publish_utils.step_scheduler import StepScheduler
 
 
 def main():
@@ -59,19 +60,30 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
+
+        steps = StepScheduler(tools, counter)
 
         #
         # pull in the latest '.x' branches and update the top level
         #
-        tools.checkout_branch(counter.next_step(), release_dot_x_version)
-        tools.git_pull(counter.next_step())
-        tools.run_submodule_update_recursive(counter.next_step())
-        tools.run_submodule_fetch_from_origin(counter.next_step())
-
-        tools.populate_db_with_request_issues(counter.next_step(), date_range, clear_db)
-        tools.verify_version_tag(counter.next_step())
-        tools.generate_git_log_one_liners(counter.next_step())
-        tools.generate_changelog(counter.next_step())
+        steps.add(tools.checkout_branch, release_dot_x_version)
+        steps.add(tools.git_pull)
+        steps.add(tools.run_submodule_update_recursive)
+        fetched = steps.add(tools.run_submodule_fetch_from_origin)
+
+        #
+        # downloading the issues and finding the tags of each repo are independent of each other
+        #
+        issues = steps.add(tools.populate_db_with_request_issues, date_range, clear_db, after=[fetched])
+        steps.add(tools.verify_version_tag, after=[fetched])
+        one_liners = steps.add(tools.generate_git_log_one_liners, after=[fetched])
+        steps.add(tools.generate_changelog, after=[issues, one_liners])
+
+        steps.run()
+        tools.finish()
 
     except Exception as e:
         print(e)
@@ -21,14 +21,7 @@ def main():
                             help='a directory which is a clone of chisel-release', default=".")
         parser.add_argument('-m', '--major-version', dest='major_version', action='store',
                             help='major number of snapshots being published', required=True)
-        parser.add_argument('-b', '--start-step', dest='start_step', type=int, action='store',
-                            help='command step to start on',
-                            default=1)
-        parser.add_argument('-e', '--stop-step', dest='stop_step', type=int, action='store',
-                            help='command step to end on',
-                            default=10000)
-        parser.add_argument('-l', '--list-only', dest='list_only', action='store_true',
-                            help='list command step, do not execute', default=False)
+        Tools.add_standard_cli_arguments(parser)
 
         args = parser.parse_args()
 
@@ -50,6 +43,9 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
 
         #
         # pull in the latest 'master' branches and update the top level
@@ -73,6 +69,7 @@ def main():
         tools.git_add_dash_u(counter.next_step())
         tools.git_commit(counter.next_step(), "Bump .x branches that just had masters merged into them")
         tools.git_push(counter.next_step())
+        tools.finish()
 
     except Exception as e:
         print(e)
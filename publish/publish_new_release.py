@@ -6,6 +6,7 @@ from argparse import ArgumentParser
 
 from publish_utils.tools import Tools
 from publish_utils.step_counter import StepCounter
+from publish_utils.step_scheduler import StepScheduler
 
 
 def make_parser():
@@ -23,6 +24,9 @@ def make_parser():
             type=validate_bump_type, required=True,
             help='What type of release is this? '
                  '[major, minor, rc<#>, rc-clear, m<#>, ds, ds<YYYYMMDD>, ds-clear]')
+    parser.add_argument('--full', dest='full', action='store_true',
+                        help='test every project, not only those changed since their last successful test',
+                        default=False)
     Tools.add_standard_cli_arguments(parser)
 
     return parser
@@ -53,70 +57,75 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
+
+        steps = StepScheduler(tools, counter)
 
         #
         # pull in the latest '.x' branches and update the top level
         #
-        tools.checkout_branch(counter.next_step(), release_dot_x_version)
-        tools.git_pull(counter.next_step())
-        tools.run_submodule_update_recursive(counter.next_step())
-        tools.run_make_pull(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), "Bump .x branches")
-        tools.git_push(counter.next_step())
+        steps.add(tools.checkout_branch, release_dot_x_version)
+        steps.add(tools.git_pull)
+        steps.add(tools.run_submodule_update_recursive)
+        steps.add(tools.run_make_pull)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, "Bump .x branches")
+        steps.add(tools.git_push)
 
         #
         # pull in the latest '-release' branches and update the top level
         #
-        tools.checkout_branch(counter.next_step(), release_version)
-        tools.git_pull(counter.next_step())
-        tools.run_submodule_update_recursive(counter.next_step())
-        tools.run_make_pull(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), "Bump -release versions")
-        tools.git_push(counter.next_step())
+        steps.add(tools.checkout_branch, release_version)
+        steps.add(tools.git_pull)
+        steps.add(tools.run_submodule_update_recursive)
+        steps.add(tools.run_make_pull)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, "Bump -release versions")
+        steps.add(tools.git_push)
 
         #
         # Change repo's release versions and references
         # according to the 'bumptype'
         #
-        tools.bump_release(counter.next_step(), bump_type)
-        tools.check_version_updates(counter.next_step())
-        tools.add_and_commit_submodules(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), "Bump new -release versions")
+        steps.add(tools.bump_release, bump_type)
+        steps.add(tools.check_version_updates)
+        steps.add(tools.add_and_commit_submodules)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, "Bump new -release versions")
 
         #
         # Merge tracked branches (usually master or .x) in to -release branches
-        tools.merge_tracked_branches_into_release_branches(counter.next_step())
-        tools.verify_merge(counter.next_step())
+        steps.add(tools.merge_tracked_branches_into_release_branches)
+        steps.add(tools.verify_merge)
 
         #
         # Test that everything compiles and tests with new release numbers
         #
-        tools.run_make_clean(counter.next_step())
-        tools.run_make_install(counter.next_step())
-        tools.run_make_test(counter.next_step())
+        steps.add(tools.run_make_clean)
+        steps.add(tools.run_make_install)
+        steps.add(tools.run_make_test, full=args.full)
 
         #
         # Commit merges
         #
-        tools.commit_each_submodule(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), f"Release {release_version} top level committed")
+        steps.add(tools.commit_each_submodule)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, f"Release {release_version} top level committed")
 
         # Publish release
         #
-        tools.publish_signed(counter.next_step())
+        steps.add(tools.publish_signed)
 
         #
         # Push release, release numbers have been bumped by here
         #
-        tools.push_submodules(counter.next_step())
-        tools.git_push(counter.next_step())
+        steps.add(tools.push_submodules)
+        steps.add(tools.git_push)
 
-        tools.comment(
-            counter.next_step(),
+        steps.add(
+            tools.comment,
             f"""
             You are almost done
                 - Follow steps in docs/sonatype_finalize_release.md
@@ -124,6 +133,9 @@ def main():
                 - Then run generate snapshots
             """
         )
+
+        steps.run()
+        tools.finish()
     except Exception as e:
         print(e)
         sys.exit(2)
@@ -7,6 +7,7 @@ from datetime import datetime
 
 from publish_utils.tools import Tools
 from publish_utils.step_counter import StepCounter
+from publish_utils.step_scheduler import StepScheduler
 
 
 def main():
@@ -24,6 +25,9 @@ def main():
         parser.add_argument('-o', '--override-date', dest='date_stamp', action='store',
                             help='overrides the date used for dated snapshots, format YYYYMMDD',
                             default=current_date)
+        parser.add_argument('--full', dest='full', action='store_true',
+                            help='test every project, not only those changed since their last successful test',
+                            default=False)
         Tools.add_standard_cli_arguments(parser)
 
         args = parser.parse_args()
@@ -51,63 +55,71 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
+
+        steps = StepScheduler(tools, counter)
 
         #
         # pull in the latest '.x' branches and update the top level
         #
-        tools.checkout_branch(counter.next_step(), release_dot_x_version)
-        tools.git_pull(counter.next_step())
-        tools.run_submodule_update_recursive(counter.next_step())
-        tools.run_make_pull(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), "Bump .x branches")
-        tools.git_push(counter.next_step())
+        steps.add(tools.checkout_branch, release_dot_x_version)
+        steps.add(tools.git_pull)
+        steps.add(tools.run_submodule_update_recursive)
+        steps.add(tools.run_make_pull)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, "Bump .x branches")
+        steps.add(tools.git_push)
 
         #
         # pull in the latest '-release' branches and update the top level
         #
-        tools.checkout_branch(counter.next_step(), release_version)
-        tools.git_pull(counter.next_step())
-        tools.run_submodule_update_recursive(counter.next_step())
-        tools.run_make_pull(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), "Bump -release versions")
-        tools.git_push(counter.next_step())
+        steps.add(tools.checkout_branch, release_version)
+        steps.add(tools.git_pull)
+        steps.add(tools.run_submodule_update_recursive)
+        steps.add(tools.run_make_pull)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, "Bump -release versions")
+        steps.add(tools.git_push)
 
         #
         # Change repo's release versions and references
         # according to the 'bumptype'
         #
-        tools.bump_release(counter.next_step(), bump_type)
-        tools.check_version_updates(counter.next_step())
-        tools.add_and_commit_submodules(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), "Bump new -release versions")
+        steps.add(tools.bump_release, bump_type)
+        steps.add(tools.check_version_updates)
+        steps.add(tools.add_and_commit_submodules)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, "Bump new -release versions")
 
         #
         # Merge .x branches in to -release branches
-        tools.merge_dot_x_branches_into_release_branches(counter.next_step())
+        steps.add(tools.merge_dot_x_branches_into_release_branches)
         # TODO: It is not unusual for this step to give errors on rocket, template and tutorials, fix this
-        tools.verify_merge(counter.next_step())
+        steps.add(tools.verify_merge)
 
-        tools.run_make_clean_install(counter.next_step())
-        tools.run_make_test(counter.next_step())
+        steps.add(tools.run_make_clean_install)
+        steps.add(tools.run_make_test, full=args.full)
 
         #
         # Commit merges
         #
-        tools.commit_each_submodule(counter.next_step())
-        tools.git_add_dash_u(counter.next_step())
-        tools.git_commit(counter.next_step(), f"Release {release_version} top level committed")
+        steps.add(tools.commit_each_submodule)
+        steps.add(tools.git_add_dash_u)
+        steps.add(tools.git_commit, f"Release {release_version} top level committed")
 
         # TODO: This step will typically require a password to be entered in terminal window, fix this
-        tools.publish_signed(counter.next_step())
+        steps.add(tools.publish_signed)
 
         #
         # Push release, release numbers have been bumped by here
         #
-        tools.push_submodules(counter.next_step())
-        tools.git_push(counter.next_step())
+        steps.add(tools.push_submodules)
+        steps.add(tools.git_push)
+
+        steps.run()
+        tools.finish()
 
     except Exception as e:
         print(e)
@@ -0,0 +1,118 @@
+"""records the steps of a release script that have completed, so a re-run can skip them"""
+
+import glob
+import hashlib
+import json
+import os
+import subprocess
+
+from datetime import datetime
+from typing import Optional
+
+
+def reads_remote(step_function):
+    """
+    marks a step whose outcome depends on a remote (fetch, pull, downloading issues): it is run again even when
+    a checkpoint shows it completed, as the remote may have changed when the release dir hasn't.
+    Steps that only write to a remote (push, tag, publish) are skipped like any other, running them again fails
+    or publishes twice. Apply it below @command_step
+    """
+    step_function.reads_remote = True
+    return step_function
+
+
+def sha256_of_file(file_name: str) -> str:
+    if not os.path.exists(file_name):
+        return ""
+    with open(file_name, "rb") as input_file:
+        return hashlib.sha256(input_file.read()).hexdigest()
+
+
+def state_fingerprint() -> str:
+    """
+    fingerprint of the release dir (the current directory) that the steps work on:
+    the top level HEAD, each submodule's HEAD, any uncommitted changes to them, and version.yml
+    """
+    digest = hashlib.sha256()
+    commands = [
+        "git rev-parse HEAD",
+        "git diff HEAD --ignore-submodules",
+        "git submodule foreach --quiet --recursive 'echo $displaypath $(git rev-parse HEAD); git diff HEAD'",
+    ]
+    for command in commands:
+        command_result = subprocess.run(command, shell=True, capture_output=True)
+        if command_result.returncode != 0:
+            raise Exception(f"{command} failed: {str(command_result.stderr, 'utf-8').strip()}")
+        digest.update(command_result.stdout)
+    digest.update(sha256_of_file("version.yml").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def arguments_fingerprint(args: tuple, kwargs: dict) -> str:
+    """fingerprint of the arguments a step was called with (other than the step number)"""
+    return hashlib.sha256(repr((list(args), sorted(kwargs.items()))).encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    A checkpoint record (checkpoint_<step>_<function>.json in the log dir) is written for each step that completes.
+    It holds the fingerprint of the arguments of the step, and the state fingerprint before (inputs) and after (outputs)
+    the step ran. A re-run can resume after the last step whose outputs are the current state: nothing has changed
+    since it, and the steps before it, completed. The records belong to one run of the script, and are removed
+    when it completes (see Tools.finish), so only a failed run is resumed.
+    """
+
+    def __init__(self, log_dir: str):
+        self.log_dir = log_dir
+
+    def file_name(self, step_number: int, function_name: str) -> str:
+        return f"{self.log_dir}/checkpoint_{step_number:03d}_{function_name}.json"
+
+    def records(self) -> dict:
+        """step number -> checkpoint record"""
+        result = {}
+        for file_name in glob.glob(f"{self.log_dir}/checkpoint_*.json"):
+            try:
+                with open(file_name) as input_file:
+                    record = json.load(input_file)
+                result[record["step"]] = record
+            except (OSError, ValueError, KeyError):
+                print(f"ignoring unreadable checkpoint {file_name}")
+        return result
+
+    def get(self, step_number: int) -> Optional[dict]:
+        return self.records().get(step_number)
+
+    def resume_step(self, current_state: str) -> int:
+        """the last step that left the release dir in current_state, or 0 if there isn't one"""
+        steps = [step for step, record in self.records().items() if record["outputs"] == current_state]
+        return max(steps, default=0)
+
+    def write(self, step_number: int, function_name: str, arguments: str, inputs: str, outputs: str, result=None):
+        record = {
+            "step": step_number,
+            "function": function_name,
+            "arguments": arguments,
+            "inputs": inputs,
+            "outputs": outputs,
+            "completed": datetime.now().strftime("%Y%m%d-%H%M%S"),
+        }
+        try:
+            # steps that return a value (e.g. get_current_branch) must return it when they are skipped
+            json.dumps(result)
+            record["result"] = result
+        except (TypeError, ValueError):
+            pass
+        with open(self.file_name(step_number, function_name), "w") as output_file:
+            json.dump(record, output_file, indent=2)
+
+    def discard_after(self, step_number: int):
+        """removes the records of later steps; they were completed from a state that has now changed"""
+        for file_name in glob.glob(f"{self.log_dir}/checkpoint_*.json"):
+            name = os.path.basename(file_name)
+            try:
+                later = int(name.split("_")[1]) > step_number
+            except (IndexError, ValueError):
+                continue
+            if later:
+                os.remove(file_name)
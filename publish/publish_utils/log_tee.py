@@ -0,0 +1,180 @@
+"""runs a command with its output streamed into a log file, watching the output for errors as it arrives"""
+
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+
+from collections import deque
+from typing import List, Optional
+
+# sbt and scalatest report errors like this
+DEFAULT_ERROR_PATTERNS = [r"\[error\]"]
+
+
+class LogMatch:
+    """a line of output that matched an error or fatal pattern, with the lines that preceded it"""
+
+    def __init__(self, kind: str, line: str, line_number: int, context: List[str]):
+        self.kind = kind
+        self.line = line
+        self.line_number = line_number
+        self.context = context
+
+
+class TeeResult(subprocess.CompletedProcess):
+    """a CompletedProcess that also has the error and fatal lines found in the output"""
+
+    def __init__(self, args, returncode: int, errors: List[LogMatch], fatal: Optional[LogMatch], aborted: bool):
+        super().__init__(args, returncode)
+        self.errors = errors
+        self.fatal = fatal
+        self.aborted = aborted
+
+
+class ProcessGroups:
+    """
+    The commands a LogTee is running in their own process group. They don't see the terminal's interrupt, and a
+    KeyboardInterrupt only reaches the LogTee when it runs on the main thread, so whoever runs LogTees on other threads
+    (a StepScheduler) stops them with terminate_all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    def add(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.add(process)
+
+    def discard(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.discard(process)
+
+    def terminate_all(self, first_signal=signal.SIGTERM):
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            LogTee.terminate(process, first_signal)
+
+
+def compile_patterns(patterns: List[str]):
+    if not patterns:
+        return None
+    return re.compile(b"|".join(b"(?:" + pattern.encode("utf-8") + b")" for pattern in patterns))
+
+
+def decode(line: bytes) -> str:
+    return str(line, "utf-8", errors="replace").rstrip("\r\n")
+
+
+class LogTee:
+    """
+    Runs a command with stdout and stderr piped into the end of a log file, written in large chunks.
+    As complete lines arrive they are matched against the error and fatal patterns, and the last context_lines lines
+    are kept, so each match has the output that led up to it. Matches are printed as they are found (if echo),
+    rather than found by searching the log after the command has finished. With abort_on_fatal, the command's process
+    group is terminated on the first fatal match, and the process group is registered with process_groups while
+    the command runs.
+    """
+
+    chunk_size = 1 << 16
+    max_errors = 1000
+    # the log is still flushed this often (in seconds), so it can be followed while the command runs
+    flush_interval = 2.0
+
+    def __init__(self, log_name: str,
+                 error_patterns: List[str] = None,
+                 fatal_patterns: List[str] = None,
+                 context_lines: int = 20,
+                 abort_on_fatal: bool = False,
+                 echo: bool = True,
+                 process_groups: ProcessGroups = None):
+        self.log_name = log_name
+        self.error_re = compile_patterns(DEFAULT_ERROR_PATTERNS if error_patterns is None else error_patterns)
+        self.fatal_re = compile_patterns(fatal_patterns)
+        self.context_lines = context_lines
+        self.abort_on_fatal = abort_on_fatal
+        self.echo = echo
+        self.process_groups = process_groups
+
+    def run(self, command, shell: bool = True, **kwargs) -> TeeResult:
+        errors = []
+        fatal = None
+        aborted = False
+        context = deque(maxlen=self.context_lines)
+        line_number = 0
+        partial = b""
+
+        def scan(line: bytes):
+            nonlocal line_number, fatal
+            line_number += 1
+            if self.fatal_re is not None and fatal is None and self.fatal_re.search(line):
+                fatal = LogMatch("fatal", decode(line), line_number, [decode(c) for c in context])
+                if self.echo:
+                    print(f"fatal: {fatal.line} (line {line_number} of this command's output in {self.log_name})")
+            elif self.error_re is not None and self.error_re.search(line):
+                if len(errors) < LogTee.max_errors:
+                    errors.append(LogMatch("error", decode(line), line_number, [decode(c) for c in context]))
+                if self.echo and len(errors) == 1:
+                    print(f"first error: {decode(line)} (see {self.log_name})")
+            context.append(line)
+
+        with open(self.log_name, "ab", buffering=1 << 20) as log_file:
+            # a separate process group, so everything the command started can be terminated
+            process = subprocess.Popen(command, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       start_new_session=self.abort_on_fatal, **kwargs)
+            if self.abort_on_fatal and self.process_groups is not None:
+                self.process_groups.add(process)
+            last_flush = time.monotonic()
+            try:
+                while True:
+                    chunk = os.read(process.stdout.fileno(), LogTee.chunk_size)
+                    if not chunk:
+                        break
+                    log_file.write(chunk)
+                    if time.monotonic() - last_flush > LogTee.flush_interval:
+                        log_file.flush()
+                        last_flush = time.monotonic()
+                    lines = (partial + chunk).split(b"\n")
+                    partial = lines.pop()
+                    if len(partial) > LogTee.chunk_size * 16:
+                        # a line this long is matched in pieces, rather than kept growing
+                        lines.append(partial)
+                        partial = b""
+                    for line in lines:
+                        scan(line)
+                    if fatal is not None and self.abort_on_fatal and not aborted:
+                        aborted = True
+                        self.terminate(process)
+                if partial:
+                    scan(partial)
+            except KeyboardInterrupt:
+                # in its own process group, the command doesn't see the terminal's interrupt
+                if self.abort_on_fatal:
+                    self.terminate(process, signal.SIGINT)
+                raise
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+                if self.process_groups is not None:
+                    self.process_groups.discard(process)
+                if aborted:
+                    log_file.write(f"\naborted after a fatal error: {fatal.line}\n".encode("utf-8"))
+
+        return TeeResult(command, returncode, errors, fatal, aborted)
+
+    @staticmethod
+    def terminate(process: subprocess.Popen, first_signal=signal.SIGTERM):
+        for sig in (first_signal, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                process.wait(timeout=10)
+                return
+            except subprocess.TimeoutExpired:
+                pass
@@ -0,0 +1,150 @@
+"""runs the steps of a release script as a DAG, running independent steps at the same time"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Optional
+
+from publish_utils.step_counter import StepCounter
+
+# the step changes the working tree (checkout, merge, commit, build): nothing else may use the tree while it runs
+EXCLUSIVE_TREE = "exclusive-tree"
+# the step reads the working tree (including the current branches): it may run alongside other readers
+TREE = "tree"
+# the step talks to a remote (fetch, push, publish)
+NETWORK = "network"
+
+
+def step_resources(*resources):
+    """
+    declares the resources a step uses, steps that don't declare any are assumed to need the exclusive working tree.
+    Apply it below @command_step
+    """
+    def decorate(step_function):
+        step_function.resources = resources
+        return step_function
+
+    return decorate
+
+
+class Step:
+    def __init__(self, number: int, function, name: str, args: tuple, kwargs: dict, after: List[int], resources: tuple):
+        self.number = number
+        self.function = function
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.after = after
+        self.resources = resources
+
+    def run(self):
+        return self.function(self.number, *self.args, **self.kwargs)
+
+
+class StepScheduler:
+    """
+    Steps are added in the order the script lists them, and numbered in that order (so --start-step and --stop-step
+    mean what they did when the steps were run one after another). A step depends on the step added before it,
+    unless it lists the steps it depends on with after=[...]; after=[] makes it independent of every other step.
+    Running a step waits for its dependencies, and for its resources: a step that needs the exclusive working tree
+    runs alone (among the steps using the tree), and at most network_jobs steps use the network at once.
+    Steps outside the --start-step/--stop-step range are skipped, and count as done for the steps that depend on them.
+    Once a step fails, no more steps are started, and the failure is raised when the running steps have finished.
+    On Ctrl-C the commands the running steps started in their own process group (tools.process_groups) are terminated.
+    """
+
+    def __init__(self, tools, counter: StepCounter = None, jobs: int = 4, network_jobs: int = 2):
+        self.tools = tools
+        self.counter = counter if counter is not None else StepCounter()
+        self.jobs = max(1, jobs)
+        self.network_jobs = max(1, network_jobs)
+        self.steps = []
+
+    def add(self, step_function, *args, after: Optional[List[int]] = None, **kwargs) -> int:
+        """adds a step (a command_step method of tools) and returns its number, for use in after=[...]"""
+        number = self.counter.next_step()
+        if after is None:
+            after = [self.steps[-1].number] if self.steps else []
+        resources = getattr(step_function, "resources", (EXCLUSIVE_TREE,))
+        name = getattr(step_function, "step_name", step_function.__name__)
+        self.steps.append(Step(number, step_function, name, args, kwargs, list(after), resources))
+        return number
+
+    def print_plan(self):
+        print(f"step plan ({len(self.steps)} steps, up to {self.jobs} at a time):")
+        for step in self.steps:
+            after = ", ".join(str(number) for number in step.after) if step.after else "-"
+            resources = ", ".join(step.resources)
+            print(f"step {step.number:3d} {step.name:<48} after {after:<12} uses [{resources}]")
+
+    def in_range(self, step: Step) -> bool:
+        return self.tools.get_start_step() <= step.number <= self.tools.get_stop_step()
+
+    def can_start(self, step: Step, running: list, tree_reserved: bool) -> bool:
+        tree_users = [s for s in running if TREE in s.resources or EXCLUSIVE_TREE in s.resources]
+        if EXCLUSIVE_TREE in step.resources and tree_users:
+            return False
+        if TREE in step.resources and (tree_reserved or any(EXCLUSIVE_TREE in s.resources for s in tree_users)):
+            return False
+        if NETWORK in step.resources and len([s for s in running if NETWORK in s.resources]) >= self.network_jobs:
+            return False
+        return True
+
+    def run(self):
+        self.print_plan()
+        if self.tools.get_list_only():
+            return
+
+        done = set()
+        waiting = list(self.steps)
+        running = {}
+        failure = None
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            try:
+                while waiting or running:
+                    started = True
+                    while started and failure is None:
+                        started = False
+                        # a step waiting for the exclusive working tree keeps later steps from taking the tree first
+                        tree_reserved = False
+                        for step in list(waiting):
+                            if not all(number in done for number in step.after):
+                                continue
+                            if not self.in_range(step):
+                                # prints that the step is skipped
+                                step.run()
+                                waiting.remove(step)
+                                done.add(step.number)
+                                started = True
+                            elif len(running) < self.jobs and self.can_start(step, list(running.values()), tree_reserved):
+                                waiting.remove(step)
+                                running[pool.submit(step.run)] = step
+                                started = True
+                            elif EXCLUSIVE_TREE in step.resources:
+                                tree_reserved = True
+
+                    if not running:
+                        if waiting and failure is None:
+                            names = ", ".join(f"{step.number} {step.name}" for step in waiting)
+                            raise Exception(f"steps can never run, their dependencies are not met: {names}")
+                        break
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        step = running.pop(future)
+                        try:
+                            future.result()
+                            done.add(step.number)
+                        except BaseException as e:
+                            if failure is None:
+                                failure = e
+                            if running:
+                                print(f"step {step.number} {step.name} failed, waiting for the running steps to finish")
+            except KeyboardInterrupt:
+                # only the main thread sees the interrupt: the running steps' commands are stopped here,
+                # as those run in their own process group (make test) never see the terminal's Ctrl-C
+                names = ", ".join(f"{step.number} {step.name}" for step in running.values())
+                print(f"interrupted, stopping the running steps: {names}")
+                self.tools.process_groups.terminate_all()
+                raise
+
+        if failure is not None:
+            raise failure
@@ -0,0 +1,157 @@
+"""runs a command in each submodule of the release, several submodules at a time"""
+
+import os
+import subprocess
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Callable, List, Optional, Union
+
+
+class Submodule:
+    """a submodule as described by .gitmodules"""
+
+    def __init__(self, name: str, path: str, branch: str = "", url: str = ""):
+        self.name = name
+        self.path = path
+        self.branch = branch
+        self.url = url
+
+    def is_checked_out(self, toplevel: str) -> bool:
+        """git submodule foreach only visits submodules that have been initialized and checked out"""
+        return os.path.exists(os.path.join(toplevel, self.path, ".git"))
+
+
+class SubmoduleResult:
+    """the outcome of running a command in one submodule"""
+
+    def __init__(self, submodule: Submodule, command: str, returncode: Optional[int], output: str = "", elapsed: float = 0.0):
+        self.submodule = submodule
+        self.command = command
+        self.returncode = returncode
+        self.output = output
+        self.elapsed = elapsed
+        self.started = None
+
+    @property
+    def failed(self) -> bool:
+        return self.returncode is not None and self.returncode != 0
+
+    @property
+    def skipped(self) -> bool:
+        """true if the command was never started (because another submodule failed first)"""
+        return self.returncode is None
+
+
+class SubmoduleExecutor:
+    """
+    Replaces `git submodule foreach '...'`: the submodules are listed from .gitmodules once,
+    and the command for each one is run (in the submodule's directory) on a bounded thread pool.
+    The command sees the same $name, $sm_path, $displaypath and $toplevel as a foreach command.
+    Each submodule's output is written to the log as a single section, when that submodule finishes.
+    With fail_fast, no new submodules are started once one has failed (the ones already running finish).
+    """
+
+    def __init__(self, toplevel: str = ".", jobs: int = 8, fail_fast: bool = True):
+        self.toplevel = os.path.abspath(toplevel)
+        self.jobs = max(1, jobs)
+        self.fail_fast = fail_fast
+        self._submodules = None
+        self._log_lock = threading.Lock()
+
+    def get_submodules(self) -> List[Submodule]:
+        """the submodules of the top level, in .gitmodules order"""
+        if self._submodules is None:
+            self._submodules = SubmoduleExecutor.read_gitmodules(self.toplevel)
+        return self._submodules
+
+    @staticmethod
+    def read_gitmodules(toplevel: str) -> List[Submodule]:
+        command_result = subprocess.run(
+            ["git", "config", "-f", ".gitmodules", "--get-regexp", r"^submodule\..*\.(path|branch|url)$"],
+            cwd=toplevel, text=True, capture_output=True)
+        # git config exits with 1 when nothing matches (there are no submodules)
+        if command_result.returncode not in (0, 1):
+            raise Exception(f"could not read {toplevel}/.gitmodules: {command_result.stderr.strip()}")
+
+        fields = {}
+        for line in command_result.stdout.splitlines():
+            key, _, value = line.partition(" ")
+            name, field = key[len("submodule."):].rsplit(".", 1)
+            fields.setdefault(name, {})[field] = value
+
+        return [
+            Submodule(name, values["path"], values.get("branch", ""), values.get("url", ""))
+            for name, values in fields.items() if "path" in values
+        ]
+
+    def environment(self, submodule: Submodule) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "name": submodule.name,
+            "sm_path": submodule.path,
+            "displaypath": submodule.path,
+            "toplevel": self.toplevel,
+        })
+        return env
+
+    def write_section(self, log_name: str, result: SubmoduleResult):
+        time_stamp = result.started.strftime("%Y%m%d-%H%M%S")
+        section = f"{time_stamp}: Entering '{result.submodule.path}': {result.command}\n"
+        section += result.output
+        if result.output and not result.output.endswith("\n"):
+            section += "\n"
+        time_stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        section += f"{time_stamp}: Leaving '{result.submodule.path}': exit {result.returncode} ({result.elapsed:.1f}s)\n"
+        with self._log_lock:
+            with open(log_name, "a") as log_file:
+                log_file.write(section)
+
+    def run_one(self, submodule: Submodule, command: str, log_name: str) -> SubmoduleResult:
+        started = datetime.now()
+        start = time.monotonic()
+        command_result = subprocess.run(
+            command, shell=True, cwd=os.path.join(self.toplevel, submodule.path), env=self.environment(submodule),
+            text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        result = SubmoduleResult(submodule, command, command_result.returncode, command_result.stdout,
+                                 time.monotonic() - start)
+        result.started = started
+        self.write_section(log_name, result)
+        return result
+
+    def run(self,
+            command: Union[str, Callable[[Submodule], Optional[str]]],
+            log_name: str,
+            exclude: tuple = ()) -> List[SubmoduleResult]:
+        """
+        runs command in each checked out submodule (other than those named in exclude).
+        command is either a shell command, or a function returning the shell command for a submodule
+        (or None to skip it). Returns a result for each submodule, in .gitmodules order; those never started
+        (after a failure, with fail_fast) are marked as skipped.
+        """
+        work = []
+        for submodule in self.get_submodules():
+            if submodule.name in exclude or not submodule.is_checked_out(self.toplevel):
+                continue
+            submodule_command = command(submodule) if callable(command) else command
+            if submodule_command is not None:
+                work.append((submodule, submodule_command))
+
+        commands = {submodule.name: c for submodule, c in work}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            pending = {pool.submit(self.run_one, submodule, c, log_name): submodule for submodule, c in work}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[pending.pop(future).name] = result
+                    if result.failed and self.fail_fast:
+                        # futures that haven't started yet are dropped; running ones are left to finish
+                        for waiting in [f for f in pending if f.cancel()]:
+                            skipped = pending.pop(waiting)
+                            results[skipped.name] = SubmoduleResult(skipped, commands[skipped.name], None)
+
+        return [results[submodule.name] for submodule, _ in work]
@@ -0,0 +1,115 @@
+"""chooses the projects make test needs to test: those that changed, or depend on a project that changed, since they last passed"""
+
+import hashlib
+import json
+import os
+import subprocess
+
+from typing import Dict, List
+
+
+def submodule_sha(path: str) -> str:
+    """
+    identifies the content of the submodule at path: the SHA of the tree in its index (the tree of HEAD,
+    unless changes are staged, as they are after a merge --no-commit), plus a hash of any unstaged changes
+    and of the untracked (not ignored) files, which the build picks up too (e.g. a new source file not yet added).
+    The tree is the one the commit of those staged changes will have, so tests passed before committing still count.
+    Returns "" if it can't be identified (e.g. during a merge with conflicts).
+    """
+    command_result = subprocess.run(["git", "-C", path, "write-tree"], text=True, capture_output=True)
+    if command_result.returncode != 0:
+        return ""
+    sha = command_result.stdout.strip()
+    command_result = subprocess.run(["git", "-C", path, "diff"], capture_output=True)
+    if command_result.returncode != 0:
+        return ""
+    changes = command_result.stdout
+    command_result = subprocess.run(["git", "-C", path, "ls-files", "-z", "--others", "--exclude-standard"],
+                                    capture_output=True)
+    if command_result.returncode != 0:
+        return ""
+    for name in command_result.stdout.split(b"\0"):
+        if name:
+            changes += b"untracked " + name + b"\0"
+            try:
+                with open(os.path.join(os.fsencode(path), name), "rb") as input_file:
+                    changes += hashlib.sha256(input_file.read()).digest()
+            except OSError:
+                # e.g. a dangling symlink, its name is all there is
+                pass
+    if changes:
+        sha += "+" + hashlib.sha256(changes).hexdigest()[:16]
+    return sha
+
+
+def parse_dependency_array(text: str) -> Dict[str, List[str]]:
+    """parses versioning.py dependency-array output: one 'module "dependency ..."' line per module"""
+    dependencies = {}
+    for line in text.splitlines():
+        module, _, rest = line.partition(" ")
+        if module:
+            dependencies[module] = rest.strip().strip('"').split()
+    return dependencies
+
+
+class TestSelection:
+    """
+    For each project, the record (stamps/last_green_tests.json) holds the SHAs (see submodule_sha) of the project
+    and of the modules it depends on (transitively, according to the defaultVersions maps) when its tests last passed.
+    A project needs testing if any of those SHAs has changed: so the projects that changed are tested,
+    along with the projects that depend on them. A project with no record is always tested.
+    """
+
+    def __init__(self, record_name: str, dependencies: Dict[str, List[str]]):
+        self.record_name = record_name
+        self.dependencies = dependencies
+        self.current = {}
+
+    def load(self) -> dict:
+        if not os.path.exists(self.record_name):
+            return {}
+        try:
+            with open(self.record_name) as input_file:
+                return json.load(input_file)
+        except (OSError, ValueError):
+            print(f"ignoring unreadable test record {self.record_name}, testing every project")
+            return {}
+
+    def current_sha(self, module: str) -> str:
+        if module not in self.current:
+            self.current[module] = submodule_sha(module)
+        return self.current[module]
+
+    def inputs(self, project: str) -> Dict[str, str]:
+        """the current SHA of project and each module it depends on"""
+        return {module: self.current_sha(module) for module in [project] + self.dependencies.get(project, [])}
+
+    def select(self, projects: List[str]) -> Dict[str, str]:
+        """returns the projects that need testing (in the order given), with the reason for each"""
+        record = self.load()
+        selected = {}
+        for project in projects:
+            last = record.get(project)
+            current = self.inputs(project)
+            if last is None:
+                selected[project] = "no successful test recorded"
+                continue
+            changed = [module for module, sha in current.items() if last.get(module) != sha or sha == ""]
+            if project in changed:
+                selected[project] = "changed"
+            elif changed:
+                selected[project] = f"depends on {', '.join(changed)}, which changed"
+        return selected
+
+    def record_success(self, projects: List[str]):
+        """records that the projects' tests passed, with their current SHAs"""
+        record = self.load()
+        for project in projects:
+            current = self.inputs(project)
+            if any(sha == "" for sha in current.values()):
+                # there is nothing that identifies what was tested
+                record.pop(project, None)
+            else:
+                record[project] = current
+        with open(self.record_name, "w") as output_file:
+            json.dump(record, output_file, indent=2, sort_keys=True)
@@ -3,10 +3,17 @@
 import os
 import subprocess
 import re
+import threading
 
 from datetime import datetime
 from argparse import ArgumentParser, ArgumentTypeError
 
+from publish_utils.log_tee import LogTee, ProcessGroups
+from publish_utils.checkpoint import CheckpointStore, arguments_fingerprint, reads_remote, state_fingerprint
+from publish_utils.step_scheduler import EXCLUSIVE_TREE, NETWORK, TREE, step_resources
+from publish_utils.submodule_executor import SubmoduleExecutor
+from publish_utils.test_selection import TestSelection, parse_dependency_array
+
 
 def command_step(step_function):
     """
@@ -15,8 +22,14 @@ def command_step(step_function):
     - get the name of the function being run and use is as the step name
     - generator a log file name for this command based on the function name
     - if in list mode just show the step number and name and do not run the command
+    - skip the step if a checkpoint shows it completed and nothing has changed since, otherwise
+      record a checkpoint when it completes (steps that read a remote, and the --start-step step, are never skipped)
     """
 
+    function_name = step_function.__name__
+    resources = getattr(step_function, 'resources', (EXCLUSIVE_TREE,))
+    always_run = getattr(step_function, 'reads_remote', False)
+
     def wrapper(*args, **kwargs):
         tool_object = args[0]
 
@@ -26,7 +39,6 @@ def command_step(step_function):
         start_step = getattr(tool_object, 'get_start_step')()
         stop_step = getattr(tool_object, 'get_stop_step')()
 
-        function_name = str(step_function).split(" ")[1].split('.')[1]
         getattr(tool_object, 'set_current_function_name')(function_name)
 
         log_dir = getattr(tool_object, 'get_log_dir')()
@@ -38,13 +50,24 @@ def command_step(step_function):
         if list_only:
             print(f"step {step_number:3d} {function_name}")
         elif start_step <= step_number <= stop_step:
+            arguments = arguments_fingerprint(args[2:], kwargs)
+            checkpoint = getattr(tool_object, 'find_checkpoint')(step_number, function_name, arguments, always_run)
+            if checkpoint is not None:
+                print(f"skipping step {step_number} {function_name}, completed {checkpoint['completed']}")
+                return checkpoint.get('result')
+
             print(f"running step {step_number} {function_name}")
+            inputs = getattr(tool_object, 'get_state_fingerprint')()
             result = step_function(*args, **kwargs)
             getattr(tool_object, 'step_complete')()
+            getattr(tool_object, 'write_checkpoint')(step_number, function_name, arguments, inputs, result)
             return result
         else:
             print(f"skipping step {step_number} {function_name}")
 
+    # used by the StepScheduler
+    wrapper.step_name = function_name
+    wrapper.resources = resources
     return wrapper
 
 
@@ -77,6 +100,9 @@ class Tools:
 
         self.white_space = re.compile(r'\s')
 
+        # the current step, its function and log file are kept per thread, so a StepScheduler can run steps concurrently
+        self.step_state = threading.local()
+
         if not os.path.exists(self.log_dir):
             os.mkdir(self.log_dir)
         elif not os.path.isdir(self.log_dir):
@@ -100,12 +126,32 @@ class Tools:
         self.current_log_file = ""
         # set this to True to only list the commands in the script
         self.list_only = False
+        # output that means make test cannot succeed, it is stopped as soon as one of these is seen
+        self.test_fatal_patterns = [r"java\.lang\.OutOfMemoryError", r"No space left on device"]
         # default Makefile name, used for clean, pull, install, test
         self.default_makefile = f"{self.execution_dir}/../../resources/Makefile"
         # current function being run
         self.current_function_name = ""
         # current log file name
         self.log_name = ""
+        # how many submodules run_submodule_command works on at once
+        self.submodule_jobs = 8
+        # stop starting submodules once a submodule command has failed
+        self.fail_fast = True
+        # created on first use, so .gitmodules is only read once
+        self.submodule_executor = None
+        # records of completed steps, used to skip them when the script is re-run
+        self.checkpoints = CheckpointStore(self.log_dir)
+        # set this to False to run every step, even those with a matching checkpoint
+        self.resume = True
+        # steps up to this one may be skipped, it is found from the checkpoints when the first step runs
+        self.resume_step = None
+        # the highest step number reached, finish() only removes the checkpoints if the last step was run
+        self.last_step = 0
+        # steps run by a StepScheduler find and write checkpoints from several threads
+        self.checkpoint_lock = threading.Lock()
+        # commands run in their own process group (make test), so they can be stopped when the script is interrupted
+        self.process_groups = ProcessGroups()
 
     @staticmethod
     def add_standard_cli_arguments(parser: ArgumentParser):
@@ -117,12 +163,25 @@ class Tools:
                             default=10000)
         parser.add_argument('-l', '--list-only', dest='list_only', action='store_true',
                             help='just list command steps, do not execute', default=False)
+        parser.add_argument('-j', '--jobs', dest='jobs', type=int, action='store',
+                            help='number of submodules to run git commands in at once',
+                            default=8)
+        parser.add_argument('-f', '--no-resume', dest='no_resume', action='store_true',
+                            help='run every step, even those completed by an earlier run (see the checkpoints in the log dir)',
+                            default=False)
+        parser.add_argument('-k', '--keep-going', dest='keep_going', action='store_true',
+                            help='keep running a submodule command in the other submodules after it fails in one',
+                            default=False)
 
     @staticmethod
     def get_versioning_command_args(sub_command: str) -> str:
         args = ""
         if sub_command == "verify":
             args = "verify"
+        elif sub_command == "tag-spec":
+            args = "tag-spec"
+        elif sub_command == "dependency-array":
+            args = "dependency-array"
         elif sub_command == "ds":
             now = datetime.now()
             day_stamp = now.strftime("%Y%m%d")
@@ -194,31 +253,145 @@ class Tools:
         return f"python3 {right_python_path}/{versioning_script} {args}"
 
     def run_command(self, *args, **kwargs):
-        """wrapper that writes command itself and it's output to the log file, appending to existing file if there"""
+        """
+        wrapper that writes command itself and it's output to the log file, appending to existing file if there.
+        The output is streamed into the log by a LogTee, and the result has the lines matching error_patterns
+        (default [error]) and fatal_patterns as result.errors and result.fatal; with abort_on_fatal the command
+        is stopped at the first fatal line. With noredirect the output is not logged (it can be captured).
+        """
         command = args[0]
 
         # this adds the command to the log file, starting the log file fresh
-        new_command = f"{command} >> {self.log_name} 2>&1"
         now = datetime.now()
         time_stamp = now.strftime("%Y%m%d-%H%M%S")
         log_file = open(self.log_name, "a")
-        log_file.write(f"{time_stamp}: {new_command}\n")
+        log_file.write(f"{time_stamp}: {command}\n")
         log_file.close()
 
-        if kwargs.get('noredirect'):
-            kwargs.pop('noredirect', None)
-            new_command = f"{command}"
-        else:
-            new_command = f"{command} >> {self.log_name} 2>&1"
-        new_args = tuple([new_command] + list(args[1:]))
-        result = subprocess.run(*new_args, **kwargs)
-        return result
+        tee_options = {option: kwargs.pop(option) for option in
+                       ('error_patterns', 'fatal_patterns', 'context_lines', 'abort_on_fatal') if option in kwargs}
+        if kwargs.pop('noredirect', False):
+            return subprocess.run(*args, **kwargs)
+
+        # the output goes to the log, so there is nothing to capture (or decode)
+        for option in ('capture_output', 'text'):
+            kwargs.pop(option, None)
+        tee = LogTee(self.log_name, process_groups=self.process_groups, **tee_options)
+        return tee.run(command, *args[1:], **kwargs)
+
+    def get_submodule_executor(self) -> SubmoduleExecutor:
+        if self.submodule_executor is None:
+            self.submodule_executor = SubmoduleExecutor(".", self.submodule_jobs, self.fail_fast)
+        return self.submodule_executor
+
+    def run_submodule_command(self, command, exclude: tuple = ()) -> list:
+        """
+        runs command in each submodule, several at a time (see SubmoduleExecutor), in place of
+        git submodule foreach. command is a shell command, or a function returning the command for a submodule.
+        Each submodule gets its own section of the log, and if the command fails in any of them,
+        all the failures are reported before exiting.
+        """
+        description = command if isinstance(command, str) else self.current_function_name
+        now = datetime.now()
+        time_stamp = now.strftime("%Y%m%d-%H%M%S")
+        log_file = open(self.log_name, "a")
+        log_file.write(f"{time_stamp}: in each submodule, {self.submodule_jobs} at a time: {description}\n")
+        log_file.close()
+
+        results = self.get_submodule_executor().run(command, self.log_name, exclude)
+
+        failures = [result for result in results if result.failed]
+        if failures:
+            print(f"{description} failed in {len(failures)} submodule(s), see {self.log_name} for details")
+            for result in failures:
+                print(f"    {result.submodule.name}: exit {result.returncode}")
+            skipped = [result.submodule.name for result in results if result.skipped]
+            if skipped:
+                print(f"    not run (use --keep-going to run them anyway): {' '.join(skipped)}")
+            exit(1)
+        return results
+
+    def get_state_fingerprint(self) -> str:
+        return state_fingerprint()
+
+    def find_checkpoint(self, step_number: int, function_name: str, arguments: str, reads_remote: bool = False):
+        """
+        returns the checkpoint of step_number, if the step can be skipped: an earlier (failed) run completed it,
+        with the same arguments, and the release dir has not changed since that run's later steps completed.
+        Steps that read a remote (see reads_remote) are always run, the remote may have changed even if the release dir
+        hasn't, and so is the step given with --start-step, that step was asked for explicitly.
+        """
+        if not self.resume or reads_remote:
+            return None
+        if step_number == self.start_step and self.start_step > 1:
+            return None
+        with self.checkpoint_lock:
+            if self.resume_step is None:
+                self.resume_step = self.checkpoints.resume_step(self.get_state_fingerprint())
+                if self.resume_step > 0:
+                    print(f"resuming, steps up to {self.resume_step} were completed by an earlier run")
+            if step_number > self.resume_step:
+                return None
+            checkpoint = self.checkpoints.get(step_number)
+
+        if checkpoint is None or checkpoint['function'] != function_name or checkpoint['arguments'] != arguments:
+            return None
+        return checkpoint
+
+    def write_checkpoint(self, step_number: int, function_name: str, arguments: str, inputs: str, result):
+        outputs = self.get_state_fingerprint()
+        with self.checkpoint_lock:
+            if outputs != inputs:
+                # this step changed the state the later steps ran from, so they must run again
+                self.resume_step = 0
+                self.checkpoints.discard_after(step_number - 1)
+            self.checkpoints.write(step_number, function_name, arguments, inputs, outputs, result)
+
+    def finish(self):
+        """
+        called when a script has run all its steps: the checkpoints only let a failed run be resumed,
+        a later run of the script (starting from the state this one left) must run every step again
+        """
+        if self.list_only or self.stop_step < self.last_step:
+            return
+        with self.checkpoint_lock:
+            self.checkpoints.discard_after(0)
+            self.resume_step = None
+
+    def set_resume(self, value: bool):
+        self.resume = value
+
+    @property
+    def current_step(self) -> int:
+        return getattr(self.step_state, 'current_step', -1)
+
+    @current_step.setter
+    def current_step(self, value: int):
+        self.step_state.current_step = value
+
+    @property
+    def current_function_name(self) -> str:
+        return getattr(self.step_state, 'current_function_name', "")
+
+    @current_function_name.setter
+    def current_function_name(self, value: str):
+        self.step_state.current_function_name = value
+
+    @property
+    def log_name(self) -> str:
+        return getattr(self.step_state, 'log_name', "")
+
+    @log_name.setter
+    def log_name(self, value: str):
+        self.step_state.log_name = value
 
     def set_execution_dir(self, execution_dir: str):
         self.execution_dir = execution_dir
 
     def set_current_step(self, current_step: int):
         self.current_step = current_step
+        with self.checkpoint_lock:
+            self.last_step = max(self.last_step, current_step)
 
     def set_start_step(self, start_step):
         self.start_step = start_step
@@ -244,6 +417,12 @@ class Tools:
     def set_current_log_name(self, new_log_name):
         self.log_name = new_log_name
 
+    def set_submodule_jobs(self, jobs: int):
+        self.submodule_jobs = jobs
+
+    def set_fail_fast(self, value: bool):
+        self.fail_fast = value
+
     def get_list_only(self) -> bool:
         return self.list_only
 
@@ -282,6 +461,7 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE)
     def get_current_branch(self, step_number) -> str:
         """gets the current branch in the release dir"""
 
@@ -298,6 +478,8 @@ class Tools:
         return current_branch
 
     @command_step
+    @step_resources(EXCLUSIVE_TREE, NETWORK)
+    @reads_remote
     def git_pull(self, step_number: int) -> None:
         """runs git pull"""
 
@@ -310,6 +492,7 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE, NETWORK)
     def git_push(self, step_number: int) -> None:
         """runs git push"""
 
@@ -346,6 +529,8 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(EXCLUSIVE_TREE, NETWORK)
+    @reads_remote
     def run_submodule_update_recursive(self, step_number):
         """run git submodule update --init --recursive"""
 
@@ -359,19 +544,16 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE, NETWORK)
+    @reads_remote
     def run_submodule_fetch_from_origin(self, step_number):
-        """run git submodule foreach 'git fetch origin'"""
+        """run 'git fetch origin' in each submodule"""
 
-        command_result = self.run_command(
-            f"git submodule foreach 'git fetch origin'",
-            shell=True,
-            capture_output=False)
-
-        if command_result.returncode != 0:
-            print(f"git submodule foreach 'git fetch origin' failed, see {self.log_name} for details")
-            exit(1)
+        self.run_submodule_command("git fetch origin")
 
     @command_step
+    @step_resources(EXCLUSIVE_TREE, NETWORK)
+    @reads_remote
     def run_make_pull(self, step_number):
         """run make pull"""
 
@@ -386,19 +568,8 @@ class Tools:
     @command_step
     def git_merge_masters_into_dot_x(self, step_number):
         """git merge masters into dot x"""
-        command = f"""
-            git submodule foreach '
-                if git diff --cached --quiet; then git merge --no-ff --no-commit master;
-                fi
-            ' 
-        """
-        command_result = self.run_command(
-            command,
-            shell=True,
-            capture_output=False)
-        if command_result.returncode != 0:
-            print(f"make pull failed, see {self.log_name} for details")
-            exit(1)
+
+        self.run_submodule_command("if git diff --cached --quiet; then git merge --no-ff --no-commit master; fi")
 
     @command_step
     def run_make_clean_install(self, step_number):
@@ -447,8 +618,8 @@ class Tools:
             exit(1)
 
     @command_step
-    def run_make_test(self, step_number):
-        """run make test"""
+    def run_make_test(self, step_number, full: bool = False):
+        """run make test, for the projects that changed (or depend on one that did) since they last passed, or all of them if full"""
 
         def is_external_program_present(command: str):
             command_result = self.run_command(command, shell=True, capture_output=False)
@@ -457,15 +628,14 @@ class Tools:
                 print(f"Required: {just_command} failed, is it installed?, see {self.log_name} for details")
                 exit(1)
 
-        def show_errors() -> bool:
-            check_result = self.run_command(
-                f"""grep '\\[error\\]' {self.log_name}""",
-                shell=True,
-                text=True,
-                capture_output=True,
-            )
-
-            error_lines = check_result.stdout.splitlines()
+        def show_errors(result) -> bool:
+            # the [error] lines were picked out of the output as it was written to the log
+            error_lines = [error.line for error in result.errors]
+            if result.fatal is not None:
+                print(f"Fatal error during {self.current_function_name}, after:")
+                for line in result.fatal.context:
+                    print(f"    {line}")
+                print(result.fatal.line)
             has_errors = len(error_lines) > 0
             if has_errors:
                 print(f"Errors ({len(error_lines)} found during {self.current_function_name}")
@@ -479,21 +649,60 @@ class Tools:
         is_external_program_present(f"yosys -V")
         is_external_program_present(f"z3 --version")
 
+        selection, projects = self.get_test_selection()
         command = f"make -j1 -f {self.default_makefile} test"
+        if selection is not None and not full:
+            selected = selection.select(projects)
+            for project in projects:
+                print(f"    {project}: {selected.get(project, 'unchanged since its last successful test, skipping')}")
+            if not selected:
+                print(f"no project changed since its last successful test, use --full to test them anyway")
+                return
+            projects = list(selected.keys())
+            test_submodules = " ".join(projects)
+            command += f' TEST_SUBMODULES="{test_submodules}"'
+
         command_result = self.run_command(
             command,
             shell=True,
-            capture_output=False)
+            capture_output=False,
+            fatal_patterns=self.test_fatal_patterns,
+            abort_on_fatal=True)
 
         if command_result.returncode != 0:
             print(f"{command} failed, see {self.log_name} for details")
-            show_errors()
+            show_errors(command_result)
             exit(1)
 
-        if show_errors():
+        if show_errors(command_result):
             exit(1)
 
+        if selection is not None:
+            selection.record_success(projects)
+
+    def get_test_selection(self):
+        """
+        returns a TestSelection, using the dependencies from the build files' defaultVersions maps,
+        and the projects make test tests; or (None, None) if either can't be found (then every project is tested)
+        """
+        command = f"make -s -f {self.default_makefile} list_test_submodules"
+        command_result = self.run_command(command, shell=True, text=True, capture_output=True, noredirect=True)
+        if command_result.returncode != 0:
+            print(f"{command} failed, testing every project: {command_result.stderr.strip()}")
+            return None, None
+        projects = command_result.stdout.split()
+
+        command = Tools.get_versioning_command("dependency-array")
+        command_result = self.run_command(command, shell=True, text=True, capture_output=True, noredirect=True)
+        if command_result.returncode != 0:
+            print(f"{command} failed, testing every project: {command_result.stderr.strip()}")
+            return None, None
+        dependencies = parse_dependency_array(command_result.stdout)
+
+        return TestSelection("stamps/last_green_tests.json", dependencies), projects
+
     @command_step
+    @step_resources(TREE)
     def verify_merge(self, step_number):
         """verify merge"""
 
@@ -516,6 +725,8 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE, NETWORK)
+    @reads_remote
     def populate_db_with_request_issues(self, step_number, date_stamp: str, clear_db: bool):
         """populate db with request issues"""
 
@@ -533,16 +744,19 @@ class Tools:
             print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
             exit(1)
 
+    def get_latest_release_tags_command(self, count: int = 2) -> str:
+        """command printing the latest (non-SNAPSHOT) release tags of the current repository, oldest first"""
+        return f"python3 {self.execution_dir}/../../src/version/Version.py --git-tags --releases --latest {count}"
+
     @command_step
+    @step_resources(TREE)
     def verify_version_tag(self, step_number):
         """verify version tag"""
 
-        command = """
+        command = f"""
             git submodule foreach '
-                branch=$(sh ../major-version-from-branch.sh) && tags=($(git tag -l --sort=v:refname |
-                grep -v SNAPSHOT |
-                tail -n 2));
-                echo ${tags[0]} .. ${tags[1]}
+                branch=$(sh ../major-version-from-branch.sh) && tags=($({self.get_latest_release_tags_command()}));
+                echo ${{tags[0]}} .. ${{tags[1]}}
             '
         """
 
@@ -553,18 +767,17 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE)
     def generate_git_log_one_liners(self, step_number):
         """generate git log one liners"""
 
-        command = """
+        command = f"""
             git submodule foreach '
                 if [ $name != "chisel-template" -a $name != "chisel-tutorial" ]; then
                     branch=$(sh ../major-version-from-branch.sh) &&
-                    tags=($(git tag -l --sort=v:refname |
-                    grep -v SNAPSHOT |
-                    tail -n 2));
-                    echo repo: $name branch $branch tags ${tags[0]} .. ${tags[1]};
-                    git log --oneline ${tags[0]}..${tags[1]} > releaseNotes.${tags[1]}
+                    tags=($({self.get_latest_release_tags_command()}));
+                    echo repo: $name branch $branch tags ${{tags[0]}} .. ${{tags[1]}};
+                    git log --oneline ${{tags[0]}}..${{tags[1]}} > releaseNotes.${{tags[1]}}
                 fi
             '
         """
@@ -576,6 +789,7 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE)
     def generate_changelog(self, step_number):
         """generate changelog"""
 
@@ -590,8 +804,7 @@ class Tools:
         command += f""" git submodule foreach '\n"""
         command += f"""     if [ $name != "chisel-template" -a $name != "chisel-tutorial" ]; then\n"""
         command += f"""         branch=$(sh ../major-version-from-branch.sh) &&\n"""
-        command += f"""         tags=($(git tag -l --sort=v:refname |\n"""
-        command += f"""         grep -v SNAPSHOT | tail -n 2));\n"""
+        command += f"""         tags=($({self.get_latest_release_tags_command()}));\n"""
         command += """         echo $name ${tags[1]};\n"""
         command += """         echo $name ${tags[1]} >> ../changelog.txt;\n"""
         command += f"""         python3 {self.execution_dir}/../../src/gitlog2releasenotes/gitlog2releasenotes.py """
@@ -606,6 +819,7 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE)
     def check_version_updates(self, step_number):
         """check that updating the version seems to be ok"""
         command = f"git diff --submodule=diff"
@@ -629,20 +843,13 @@ class Tools:
     @command_step
     def merge_dot_x_branches_into_release_branches(self, step_number):
         """merges commits from .x branches into -release branches"""
-        command = f"""
-        git submodule foreach '
-            if [ "$name" != "rocket-chip" ] && git diff --quiet --cached ; then
-                 rbranch=$(git config -f $toplevel/.gitmodules submodule.$name.branch);
-                 xbranch=$(echo $rbranch | sed -e 's/-release/.x/');
-                 git merge --no-ff --no-commit $xbranch;
-            fi'
-        """
 
-        command_result = self.run_command(command, shell=True, text=True, capture_output=False)
+        def merge_command(submodule) -> str:
+            # the -release branch tracked in .gitmodules, with its .x branch
+            xbranch = submodule.branch.replace("-release", ".x", 1)
+            return f"if git diff --quiet --cached ; then git merge --no-ff --no-commit {xbranch}; fi"
 
-        if command_result.returncode != 0:
-            print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
-            exit(1)
+        self.run_submodule_command(merge_command, exclude=("rocket-chip",))
 
     @command_step
     def merge_tracked_branches_into_release_branches(self, step_number):
@@ -666,6 +873,7 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources(TREE)
     def check_dot_x_merge_status(self, step_number):
         """look for any obvious error from merge_dot_x_branches_into_release_branches step"""
         command = f"git status -b uno --ignore-submodules=untracked"
@@ -679,38 +887,18 @@ class Tools:
     @command_step
     def commit_each_submodule(self, step_number):
         """commit each submodule"""
-        command = f"""
-            git submodule foreach '
-                if git diff --cached --quiet ; then echo skipping ; else
-                    git commit --no-edit
-                fi
-            '
-        """
 
-        command_result = self.run_command(command, shell=True, text=True, capture_output=False)
-
-        if command_result.returncode != 0:
-            print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
-            exit(1)
+        self.run_submodule_command("if git diff --cached --quiet ; then echo skipping ; else git commit --no-edit; fi")
 
     @command_step
+    @step_resources(TREE, NETWORK)
     def push_submodules(self, step_number):
         """push each submodule"""
-        command = f"""
-            git submodule foreach '
-                if [ $name != rocket-chip ] ; then
-                    git push
-                fi
-            '
-        """
 
-        command_result = self.run_command(command, shell=True, text=True, capture_output=False)
-
-        if command_result.returncode != 0:
-            print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
-            exit(1)
+        self.run_submodule_command("git push", exclude=("rocket-chip",))
 
     @command_step
+    @step_resources(EXCLUSIVE_TREE, NETWORK)
     def publish_signed(self, step_number):
         """publish signed"""
         command = f"make -f {self.default_makefile} +publishSigned"
@@ -722,47 +910,42 @@ class Tools:
             exit(1)
 
     @command_step
+    @step_resources()
     def comment(self, step_number, message: str):
         """comment"""
 
         print(message)
 
     @command_step
+    @step_resources(TREE, NETWORK)
     def tag_submodules(self, step_number, is_dry_run: bool):
         """tag submodules"""
 
         subcommand = "echo" if is_dry_run else "eval"
-        command = f"""
-             git submodule foreach '
-                 rbranch=$(git config -f $toplevel/.gitmodules submodule.$name.branch);
-                 xbranch=$(echo $rbranch | sed -e "s/-release/.x/");
-                 {subcommand} git tag $(bash $PYTHONPATH/../scripts/genTag.sh $xbranch)
-             '
-        """
-
-        command_result = self.run_command(command, shell=True, text=True, capture_output=False)
+        # tag-spec reads every submodule's version from its build file in one process (genTag.sh ran sbt in each one).
+        command = Tools.get_versioning_command("tag-spec")
+        command_result = self.run_command(command, shell=True, text=True, capture_output=True, noredirect=True)
         if command_result.returncode != 0:
+            print(command_result.stderr, end="")
             print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
             exit(1)
 
-        if not is_dry_run:
-            command = f"""git submodule foreach 'git describe'"""
-            command_result = self.run_command(command, shell=True, text=True,
-                                              capture_output=False)
-
-            if command_result.returncode != 0:
-                print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
-                exit(1)
-
-            command = f"""git submodule foreach 'git push origin $(git describe)'"""
-            command_result = self.run_command(command, shell=True, text=True,
-                                              capture_output=False)
+        # each line is: <submodule path> <git tag arguments>
+        specs = dict(line.split(" ", 1) for line in command_result.stdout.splitlines() if line.strip())
+        # genTag.sh tagged every submodule, one left untagged would have its older tag pushed by git describe below
+        executor = self.get_submodule_executor()
+        missing = [submodule.path for submodule in executor.get_submodules()
+                   if submodule.is_checked_out(executor.toplevel) and submodule.path not in specs]
+        if missing:
+            print(f"{command} has no tag for {' '.join(missing)}, no submodules were tagged")
+            exit(1)
+        self.run_submodule_command(lambda submodule: f"{subcommand} git tag {specs[submodule.path]}")
 
-            if command_result.returncode != 0:
-                print(f"{command} failed with error {command_result.returncode}, see {self.log_name} for details")
-                exit(1)
+        if not is_dry_run:
+            self.run_submodule_command("git describe && git push origin $(git describe)")
 
     @command_step
+    @step_resources(TREE, NETWORK)
     def tag_top_level(self, step_number, is_dry_run: bool, release_version: str):
         """tag top level"""
 
@@ -62,6 +62,9 @@ def main():
         tools.set_start_step(start_step)
         tools.set_stop_step(stop_step)
         tools.set_list_only(list_only)
+        tools.set_submodule_jobs(args.jobs)
+        tools.set_fail_fast(not args.keep_going)
+        tools.set_resume(not args.no_resume)
 
         tools.tag_submodules(counter.next_step(), is_dry_run)
         tools.tag_top_level(counter.next_step(), is_dry_run, release_version)
@@ -73,6 +76,7 @@ def main():
                 - You should probably publish snapshots next
             """
         )
+        tools.finish()
     except Exception as e:
         print(e)
         sys.exit(2)
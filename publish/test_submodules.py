@@ -14,14 +14,16 @@ def usage():
     print(f"     --start-step <start_step>    (or -s)")
     print(f"     --stop-step <stop_step>      (or -e")
     print(f"     --list-only                  (or -l)")
+    print(f"     --no-resume                  (or -f) run every step, even those completed by an earlier run")
+    print(f"     --full                       test every project, not only those changed since their last successful test")
 
 
 def main():
     try:
         opts, args = getopt.getopt(
             sys.argv[1:],
-            "lhr:s:e:",
-            ["help", "repo=", "start-step=", "stop-step=", "list-only"]
+            "lhfr:s:e:",
+            ["help", "repo=", "start-step=", "stop-step=", "list-only", "no-resume", "full"]
         )
     except getopt.GetoptError as err:
         print(err)
@@ -32,6 +34,8 @@ def main():
     start_step = -1
     stop_step = 1000
     list_only = False
+    resume = True
+    full = False
     counter = StepCounter()
 
     for option, value in opts:
@@ -43,6 +47,10 @@ def main():
             stop_step = int(value)
         elif option in ("--list-only", "-l"):
             list_only = True
+        elif option in ("--no-resume", "-f"):
+            resume = False
+        elif option == "--full":
+            full = True
         elif option in ("--help", "-h"):
             usage()
             exit(1)
@@ -70,8 +78,10 @@ def main():
     tools.set_start_step(start_step)
     tools.set_stop_step(stop_step)
     tools.set_list_only(list_only)
+    tools.set_resume(resume)
 
-    tools.run_make_test(counter.next_step())
+    tools.run_make_test(counter.next_step(), full=full)
+    tools.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+"""the rules for skipping the steps of a release script that an earlier run completed"""
+
+import glob
+
+import pytest
+
+from publish_utils.checkpoint import CheckpointStore, reads_remote
+from publish_utils.step_scheduler import NETWORK, step_resources
+from publish_utils.tools import Tools, command_step
+
+
+class FakeTools(Tools):
+    """Tools with steps that only record that they ran"""
+
+    def __init__(self, release_dir, start_step=1, stop_step=10000):
+        super().__init__("checkpoint_test", release_dir)
+        self.set_start_step(start_step)
+        self.set_stop_step(stop_step)
+        self.ran = []
+
+    @command_step
+    def look(self, step_number, argument="a"):
+        self.ran.append(step_number)
+        return f"looked with {argument}"
+
+    @command_step
+    def edit(self, step_number, text):
+        self.ran.append(step_number)
+        with open("README.md", "a") as output_file:
+            output_file.write(text)
+
+    @command_step
+    @step_resources(NETWORK)
+    @reads_remote
+    def fetch(self, step_number):
+        self.ran.append(step_number)
+
+    @command_step
+    @step_resources(NETWORK)
+    def push(self, step_number):
+        self.ran.append(step_number)
+
+
+def failed_run(release_dir):
+    """steps 1-3 complete, the script fails before finishing"""
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.look(2)
+    tools.look(3)
+    return tools
+
+
+def test_rerun_skips_completed_steps(release_dir):
+    failed_run(release_dir)
+    tools = FakeTools(release_dir)
+    assert tools.look(1) == "looked with a"
+    tools.look(2)
+    tools.look(3)
+    tools.look(4)
+    assert tools.ran == [4]
+
+
+def test_changed_arguments_are_run(release_dir):
+    failed_run(release_dir)
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.look(2, argument="b")
+    assert tools.ran == [2]
+
+
+def test_changed_release_dir_runs_every_step(release_dir):
+    failed_run(release_dir)
+    with open(f"{release_dir}/README.md", "a") as output_file:
+        output_file.write("changed since the failed run\n")
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.look(2)
+    assert tools.ran == [1, 2]
+
+
+def test_step_that_changes_state_discards_later_checkpoints(release_dir):
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.edit(2, "x\n")
+    tools.look(3)
+    assert sorted(tools.checkpoints.records()) == [1, 2, 3]
+
+    tools = FakeTools(release_dir, start_step=2)
+    tools.edit(2, "y\n")
+    assert sorted(tools.checkpoints.records()) == [1, 2]
+    tools.look(3)
+    assert tools.ran == [2, 3]
+
+
+def test_steps_that_read_a_remote_are_never_skipped(release_dir):
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.fetch(2)
+    tools.look(3)
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.fetch(2)
+    tools.look(3)
+    assert tools.ran == [2]
+
+
+def test_completed_push_is_skipped(release_dir):
+    # pushing, tagging or publishing again would fail, or publish twice
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.push(2)
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.push(2)
+    tools.push(3)
+    assert tools.ran == [3]
+
+
+def test_start_step_is_run(release_dir):
+    failed_run(release_dir)
+    tools = FakeTools(release_dir, start_step=2)
+    tools.look(1)
+    tools.look(2)
+    tools.look(3)
+    # step 2 left the release dir as it was, so step 3 is still skipped
+    assert tools.ran == [2]
+
+
+def test_no_resume_runs_every_step(release_dir):
+    failed_run(release_dir)
+    tools = FakeTools(release_dir)
+    tools.set_resume(False)
+    tools.look(1)
+    tools.look(2)
+    assert tools.ran == [1, 2]
+
+
+def test_finish_removes_the_checkpoints(release_dir):
+    tools = failed_run(release_dir)
+    tools.finish()
+    assert glob.glob(f"{tools.log_dir}/checkpoint_*.json") == []
+
+    # a later run from the state the finished run left runs every step
+    tools = FakeTools(release_dir)
+    tools.look(1)
+    tools.look(2)
+    assert tools.ran == [1, 2]
+
+
+def test_finish_keeps_the_checkpoints_of_a_partial_run(release_dir):
+    tools = FakeTools(release_dir, stop_step=2)
+    tools.look(1)
+    tools.look(2)
+    tools.look(3)
+    tools.finish()
+    assert sorted(tools.checkpoints.records()) == [1, 2]
+
+
+@pytest.mark.parametrize("last_step, remaining", [(0, []), (1, [1]), (2, [1, 2]), (5, [1, 2, 3])])
+def test_discard_after(tmp_path, last_step, remaining):
+    store = CheckpointStore(str(tmp_path))
+    for step_number in (1, 2, 3):
+        store.write(step_number, "look", "arguments", "before", "after")
+    store.discard_after(last_step)
+    assert sorted(store.records()) == remaining
+
+
+def test_resume_step_is_the_last_step_that_left_the_state(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.write(1, "look", "arguments", "s0", "s1")
+    store.write(2, "look", "arguments", "s1", "s1")
+    store.write(3, "edit", "arguments", "s1", "s2")
+    assert store.resume_step("s1") == 2
+    assert store.resume_step("s2") == 3
+    assert store.resume_step("s3") == 0
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.write(1, "look", "arguments", "s0", "s1")
+    with open(store.file_name(2, "look"), "w") as output_file:
+        output_file.write("{not json")
+    assert sorted(store.records()) == [1]
@@ -0,0 +1,106 @@
+"""finding errors in a command's output as LogTee streams it into the log"""
+
+import os
+import threading
+import time
+
+from conftest import is_gone_soon
+from publish_utils.log_tee import LogTee, ProcessGroups
+
+
+def test_errors_are_found_with_their_context(tmp_path):
+    log_name = str(tmp_path / "log")
+    tee = LogTee(log_name, context_lines=2, echo=False)
+    result = tee.run("printf 'one\\ntwo\\nthree\\n[error] it broke\\nfour\\n[error] again'")
+    assert result.returncode == 0
+    assert [error.line for error in result.errors] == ["[error] it broke", "[error] again"]
+    assert result.errors[0].line_number == 4
+    assert result.errors[0].context == ["two", "three"]
+    assert result.fatal is None and not result.aborted
+    with open(log_name) as input_file:
+        assert input_file.read() == "one\ntwo\nthree\n[error] it broke\nfour\n[error] again"
+
+
+def test_log_is_appended_to(tmp_path):
+    log_name = str(tmp_path / "log")
+    with open(log_name, "w") as output_file:
+        output_file.write("earlier\n")
+    LogTee(log_name, echo=False).run("echo later")
+    with open(log_name) as input_file:
+        assert input_file.read() == "earlier\nlater\n"
+
+
+def test_custom_error_patterns(tmp_path):
+    tee = LogTee(str(tmp_path / "log"), error_patterns=[r"FAILED", r"^E "], echo=False)
+    result = tee.run("printf '[error] not this one\\nE first\\ntest FAILED\\n'")
+    assert [error.line for error in result.errors] == ["E first", "test FAILED"]
+
+
+def test_fatal_is_found_without_aborting(tmp_path):
+    tee = LogTee(str(tmp_path / "log"), fatal_patterns=[r"OutOfMemoryError"], echo=False)
+    result = tee.run("echo java.lang.OutOfMemoryError; echo after; exit 3")
+    assert result.fatal.kind == "fatal"
+    assert result.fatal.line == "java.lang.OutOfMemoryError"
+    assert not result.aborted
+    assert result.returncode == 3
+
+
+def test_fatal_aborts_the_process_group(tmp_path):
+    log_name = str(tmp_path / "log")
+    pid_name = str(tmp_path / "pid")
+    tee = LogTee(log_name, fatal_patterns=[r"No space left on device"], abort_on_fatal=True, echo=False)
+    # the background sleep stands in for the JVM that sbt starts
+    start = time.monotonic()
+    result = tee.run(f"sleep 60 & echo $! > {pid_name}; echo 'No space left on device'; wait")
+    assert time.monotonic() - start < 30
+    assert result.aborted
+    assert result.returncode != 0
+    with open(pid_name) as input_file:
+        child = int(input_file.read())
+    assert is_gone_soon(child)
+    with open(log_name) as input_file:
+        assert "aborted after a fatal error: No space left on device" in input_file.read()
+
+
+def wait_for_pid(pid_name: str) -> int:
+    for _ in range(100):
+        if os.path.exists(pid_name) and os.path.getsize(pid_name) > 0:
+            with open(pid_name) as input_file:
+                return int(input_file.read())
+        time.sleep(0.05)
+    raise TimeoutError(f"{pid_name} was not written")
+
+
+def test_process_group_is_registered_while_it_runs(tmp_path):
+    process_groups = ProcessGroups()
+    tee = LogTee(str(tmp_path / "log"), abort_on_fatal=True, echo=False, process_groups=process_groups)
+    tee.run("true")
+    assert process_groups._processes == set()
+
+
+def test_process_groups_are_terminated_from_another_thread(tmp_path):
+    pid_name = str(tmp_path / "pid")
+    process_groups = ProcessGroups()
+    tee = LogTee(str(tmp_path / "log"), abort_on_fatal=True, echo=False, process_groups=process_groups)
+    results = []
+    # as a StepScheduler runs it, on a worker thread
+    worker = threading.Thread(target=lambda: results.append(tee.run(f"sleep 60 & echo $! > {pid_name}; wait")))
+    worker.start()
+    child = wait_for_pid(pid_name)
+    start = time.monotonic()
+    process_groups.terminate_all()
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert time.monotonic() - start < 10
+    assert results[0].returncode != 0
+    assert is_gone_soon(child)
+    assert process_groups._processes == set()
+
+
+def test_long_line_is_matched_in_pieces(tmp_path):
+    tee = LogTee(str(tmp_path / "log"), echo=False)
+    length = LogTee.chunk_size * 20
+    result = tee.run(f"head -c {length} /dev/zero | tr '\\0' x; echo '[error] at the end'")
+    assert len(result.errors) == 1
+    assert result.errors[0].line.endswith("[error] at the end")
+    assert os.path.getsize(str(tmp_path / "log")) == length + len("[error] at the end\n")
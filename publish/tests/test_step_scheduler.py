@@ -0,0 +1,210 @@
+"""how the StepScheduler orders steps by their dependencies and admits them by the resources they use"""
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from conftest import is_gone_soon
+from publish_utils.log_tee import LogTee, ProcessGroups
+from publish_utils.step_scheduler import EXCLUSIVE_TREE, NETWORK, TREE, StepScheduler, step_resources
+
+
+class FakeTools:
+    def __init__(self, start_step=1, stop_step=10000, list_only=False):
+        self.start_step = start_step
+        self.stop_step = stop_step
+        self.list_only = list_only
+        self.process_groups = ProcessGroups()
+
+    def get_start_step(self):
+        return self.start_step
+
+    def get_stop_step(self):
+        return self.stop_step
+
+    def get_list_only(self):
+        return self.list_only
+
+
+class Recorder:
+    """makes fake steps that record when they run, and how many steps use each resource at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.order = []
+        self.active = []
+        self.overlaps = []
+
+    def step(self, *resources, duration=0.05, fail=False):
+        def run(step_number):
+            with self.lock:
+                self.order.append(step_number)
+                self.active.append(resources)
+                self.overlaps.append(list(self.active))
+            time.sleep(duration)
+            with self.lock:
+                self.active.remove(resources)
+            if fail:
+                raise RuntimeError(f"step {step_number} failed")
+
+        return step_resources(*resources)(run)
+
+    def most_at_once(self, resource):
+        return max((len([r for r in active if resource in r]) for active in self.overlaps), default=0)
+
+
+def test_steps_run_in_order_by_default():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    for _ in range(4):
+        steps.add(recorder.step(TREE))
+    steps.run()
+    assert recorder.order == [1, 2, 3, 4]
+    assert recorder.most_at_once(TREE) == 1
+
+
+def test_step_waits_for_its_dependencies():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    slow = steps.add(recorder.step(TREE, duration=0.2), after=[])
+    steps.add(recorder.step(TREE), after=[])
+    steps.add(recorder.step(TREE), after=[slow])
+    steps.run()
+    assert recorder.order.index(3) > recorder.order.index(1)
+    assert recorder.order.index(2) < recorder.order.index(3)
+
+
+def test_independent_tree_readers_run_at_once():
+    barrier = threading.Barrier(2, timeout=5)
+
+    @step_resources(TREE)
+    def reader(step_number):
+        # both readers must be running for either to get past the barrier
+        barrier.wait()
+
+    steps = StepScheduler(FakeTools())
+    steps.add(reader, after=[])
+    steps.add(reader, after=[])
+    steps.run()
+
+
+def test_exclusive_tree_step_runs_alone():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    steps.add(recorder.step(TREE), after=[])
+    steps.add(recorder.step(EXCLUSIVE_TREE), after=[])
+    steps.add(recorder.step(TREE), after=[])
+    steps.add(recorder.step(TREE, NETWORK), after=[])
+    steps.run()
+    for active in recorder.overlaps:
+        if (EXCLUSIVE_TREE,) in active:
+            assert active == [(EXCLUSIVE_TREE,)]
+
+
+def test_waiting_exclusive_step_keeps_later_readers_out():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    steps.add(recorder.step(TREE, duration=0.2), after=[])
+    steps.add(recorder.step(EXCLUSIVE_TREE), after=[])
+    steps.add(recorder.step(TREE), after=[])
+    steps.run()
+    assert recorder.order == [1, 2, 3]
+
+
+def test_network_steps_are_limited():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools(), jobs=8, network_jobs=2)
+    for _ in range(6):
+        steps.add(recorder.step(NETWORK), after=[])
+    steps.run()
+    assert len(recorder.order) == 6
+    assert recorder.most_at_once(NETWORK) == 2
+
+
+def test_steps_outside_the_range_count_as_done():
+    ran = []
+
+    def step(step_number):
+        # a command_step prints that it is skipped when its number is out of range
+        if step_number >= 2:
+            ran.append(step_number)
+
+    steps = StepScheduler(FakeTools(start_step=2))
+    first = steps.add(step)
+    steps.add(step, after=[first])
+    steps.run()
+    assert ran == [2]
+
+
+def test_dependency_that_can_never_be_met_is_an_error():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    steps.add(recorder.step(TREE))
+    steps.add(recorder.step(TREE), after=[99])
+    with pytest.raises(Exception, match="can never run.*2 run"):
+        steps.run()
+    assert recorder.order == [1]
+
+
+def test_failure_stops_later_steps():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    steps.add(recorder.step(TREE, fail=True))
+    steps.add(recorder.step(TREE))
+    with pytest.raises(RuntimeError, match="step 1 failed"):
+        steps.run()
+    assert recorder.order == [1]
+
+
+def test_failure_waits_for_running_steps():
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools())
+    slow = steps.add(recorder.step(TREE, duration=0.2), after=[])
+    steps.add(recorder.step(TREE, fail=True), after=[])
+    steps.add(recorder.step(TREE), after=[slow])
+    with pytest.raises(RuntimeError, match="step 2 failed"):
+        steps.run()
+    # step 1 finished before the failure was raised, and step 3 was not started after it
+    assert recorder.active == []
+    assert sorted(recorder.order) == [1, 2]
+
+
+def test_list_only_runs_nothing(capsys):
+    recorder = Recorder()
+    steps = StepScheduler(FakeTools(list_only=True))
+    steps.add(recorder.step(EXCLUSIVE_TREE))
+    steps.add(recorder.step(TREE, NETWORK), after=[])
+    steps.run()
+    assert recorder.order == []
+    assert "uses [tree, network]" in capsys.readouterr().out
+
+
+def test_interrupt_stops_the_running_steps_commands(tmp_path):
+    tools = FakeTools()
+    pid_name = str(tmp_path / "pid")
+    main_thread = threading.get_ident()
+
+    @step_resources(EXCLUSIVE_TREE)
+    def make_test(step_number):
+        # runs its command in its own process group, as run_make_test does
+        tee = LogTee(str(tmp_path / "log"), abort_on_fatal=True, echo=False, process_groups=tools.process_groups)
+        tee.run(f"sleep 60 & echo $! > {pid_name}; wait")
+
+    def press_ctrl_c():
+        while not (os.path.exists(pid_name) and os.path.getsize(pid_name) > 0):
+            time.sleep(0.05)
+        signal.pthread_kill(main_thread, signal.SIGINT)
+
+    steps = StepScheduler(tools)
+    steps.add(make_test)
+    threading.Thread(target=press_ctrl_c, daemon=True).start()
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        steps.run()
+    assert time.monotonic() - start < 10
+    with open(pid_name) as input_file:
+        child = int(input_file.read())
+    assert is_gone_soon(child)
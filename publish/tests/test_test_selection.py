@@ -0,0 +1,98 @@
+"""choosing the projects that make test needs to test"""
+
+import pytest
+
+from conftest import git
+# renamed, so pytest doesn't take it for a test class
+from publish_utils.test_selection import TestSelection as Selection, parse_dependency_array, submodule_sha
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch, new_repo):
+    """firrtl and chisel3 (which depends on firrtl) as repos in the current directory"""
+    monkeypatch.chdir(tmp_path)
+    new_repo("firrtl", {"Firrtl.scala": "object Firrtl\n"})
+    new_repo("chisel3", {"Chisel.scala": "object Chisel\n"})
+    return Selection("last_green_tests.json", {"chisel3": ["firrtl"], "firrtl": []})
+
+
+def reselect(selection: Selection, projects=("firrtl", "chisel3")):
+    """selects with fresh SHAs, as the next run of make test does"""
+    return Selection(selection.record_name, selection.dependencies).select(list(projects))
+
+
+def test_everything_is_selected_without_a_record(modules):
+    assert modules.select(["firrtl", "chisel3"]) == {
+        "firrtl": "no successful test recorded",
+        "chisel3": "no successful test recorded",
+    }
+
+
+def test_nothing_is_selected_after_success(modules):
+    modules.record_success(["firrtl", "chisel3"])
+    assert reselect(modules) == {}
+
+
+def test_change_selects_the_project_and_its_dependents(modules):
+    modules.record_success(["firrtl", "chisel3"])
+    with open("firrtl/Firrtl.scala", "a") as output_file:
+        output_file.write("// changed\n")
+    assert reselect(modules) == {
+        "firrtl": "changed",
+        "chisel3": "depends on firrtl, which changed",
+    }
+
+
+def test_change_does_not_select_the_projects_it_depends_on(modules):
+    modules.record_success(["firrtl", "chisel3"])
+    with open("chisel3/Chisel.scala", "a") as output_file:
+        output_file.write("// changed\n")
+    assert reselect(modules) == {"chisel3": "changed"}
+
+
+def test_untracked_file_is_a_change(modules):
+    modules.record_success(["firrtl", "chisel3"])
+    with open("firrtl/New.scala", "w") as output_file:
+        output_file.write("object New\n")
+    assert reselect(modules, ["firrtl"]) == {"firrtl": "changed"}
+
+
+def test_committing_what_was_tested_is_not_a_change(modules):
+    with open("firrtl/Firrtl.scala", "a") as output_file:
+        output_file.write("// merged\n")
+    git("add", "-A", cwd="firrtl")
+    modules.record_success(["firrtl", "chisel3"])
+    git("commit", "-q", "-m", "merged", cwd="firrtl")
+    assert reselect(modules) == {}
+
+
+def test_only_the_recorded_projects_are_kept(modules):
+    modules.record_success(["firrtl"])
+    assert reselect(modules) == {"chisel3": "no successful test recorded"}
+    # chisel3 passing later keeps firrtl's record
+    reselected = Selection(modules.record_name, modules.dependencies)
+    reselected.record_success(["chisel3"])
+    assert reselect(modules) == {}
+
+
+def test_unidentifiable_module_is_always_selected(modules):
+    modules.dependencies["chisel3"] = ["firrtl", "missing"]
+    modules.record_success(["firrtl", "chisel3"])
+    # nothing identifies what chisel3 was tested with, so nothing is recorded for it
+    assert set(modules.load()) == {"firrtl"}
+    assert reselect(modules) == {"chisel3": "no successful test recorded"}
+
+
+def test_unreadable_record_selects_everything(modules):
+    with open(modules.record_name, "w") as output_file:
+        output_file.write("{not json")
+    assert set(modules.select(["firrtl", "chisel3"])) == {"firrtl", "chisel3"}
+
+
+def test_submodule_sha_of_a_clean_repo_is_its_tree(modules):
+    assert submodule_sha("firrtl") == git("rev-parse", "HEAD^{tree}", cwd="firrtl").strip()
+
+
+def test_parse_dependency_array():
+    text = 'firrtl ""\nchisel3 "firrtl"\ntreadle "firrtl chisel3"\n'
+    assert parse_dependency_array(text) == {"firrtl": [], "chisel3": ["firrtl"], "treadle": ["firrtl", "chisel3"]}
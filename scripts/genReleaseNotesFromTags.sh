@@ -1,3 +1,5 @@
 #!/bin/sh
-# Generate all commits between the last two tags.
-git submodule foreach 'read -a tags <<< $(git tag --sort=-creatordate -l); git log --oneline ${tags[1]}..${tags[0]}'
\ No newline at end of file
+# Generate all commits between the last two release tags (in version order, SNAPSHOTs excluded),
+# the same pair of tags Tools.get_latest_release_tags_command picks.
+versions=$(dirname $(readlink -f $0))/../src/version/Version.py
+git submodule foreach "tags=(\$(python3 $versions --git-tags --releases --latest 2)); git log --oneline \${tags[0]}..\${tags[1]}"
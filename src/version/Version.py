@@ -11,19 +11,20 @@ version.Version -- A class providing a definition of and access to the Chisel no
 @deffield    updated: 2019-10-08
 '''
 
-import copy
 import os
 import re
 import signal
+import subprocess
 import sys
 import traceback
+from array import array
+from functools import lru_cache
 from typing import Tuple
-from dataclasses import dataclass
 
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 
-__all__ = []
+__all__ = ['CNVersion', 'VersionTable']
 __version__ = 0.1
 __date__ = '2019-10-08'
 __updated__ = '2022-01-11'
@@ -42,9 +43,9 @@ class CLIError(Exception):
     def __unicode__(self):
         return self.msg
 
-# CNVersion objects are immutable.
-@dataclass(frozen=True)
+# CNVersion objects are immutable (so they may be shared - see parse()).
 class CNVersion:
+    __slots__ = ('theInts', 'snapshotQualifier', 'releaseQualifier', '_hash', '_sortKey')
     nComponents = 3
     MAJOR_SLICE = slice(2)
     MINOR_SLICE = slice(2, nComponents)
@@ -95,62 +96,130 @@ class CNVersion:
 
     def __init__(self, **kwargs):
         # Initialize defaults
-        object.__setattr__(self, 'snapshotQualifier', None)
-        object.__setattr__(self, 'releaseQualifier', None)
-        object.__setattr__(self, 'theInts', tuple([None] * CNVersion.nComponents))
+        snapshotQualifier = None
+        releaseQualifier = None
+        theInts = (None,) * CNVersion.nComponents
         # Verify that only one of a snapshot or release qualifier is supplied.
-        if 'snapshotQualifier' in kwargs.keys() and 'releaseQualifier' in kwargs.keys():
-            raise 'only one of snapshotQualifier or releaseQualifier should be supplied: %s' % (kwargs.keys())
+        if 'snapshotQualifier' in kwargs and 'releaseQualifier' in kwargs:
+            raise CLIError('only one of snapshotQualifier or releaseQualifier should be supplied: %s' % (list(kwargs.keys())))
 
         aString = kwargs.get('aString', None)
         aVersion = kwargs.get('aVersion', None)
 
         if aString and aVersion:
-            raise 'only one of string or an existing CNVersion should be supplied: %s, %s' % (aString, aVersion)
+            raise CLIError('only one of string or an existing CNVersion should be supplied: %s, %s' % (aString, aVersion))
         if aString:
             vrm = CNVersion.versionRegex.match(aString)
             if vrm:
-                versionDict = vrm.groupdict()
-                if not 'major' in versionDict:
+                major = vrm.group('major')
+                if major is None:
                     raise CLIError('couldn\'t find major version: "%s"' % (aString))
-                major = versionDict.get('major')
                 m = major.split('.')
-                someInts = [None] * CNVersion.nComponents
-                for i in range(CNVersion.nComponents - 1):
-                    someInts[i] = int(m[i])
-                minor = versionDict.get('minor')
-                someInts[2] = int(minor) if minor else None
-                object.__setattr__(self, 'theInts', tuple(someInts))
-                object.__setattr__(self, 'snapshotQualifier', versionDict.get('snapshotQualifier'))
-                object.__setattr__(self, 'releaseQualifier', versionDict.get('releaseQualifier'))
+                minor = vrm.group('minor')
+                theInts = (int(m[0]), int(m[1]), int(minor) if minor else None)
+                snapshotQualifier = vrm.group('snapshotQualifier')
+                releaseQualifier = vrm.group('releaseQualifier')
             else:
                 raise CLIError('couldn\'t parse string as a version: "%s"' % (aString))
         elif aVersion:
-            # Copy any attributes from the provided version that aren't explicitly supplied.
-            for attribute in self.__dict__.keys():
-                val = copy.deepcopy(getattr(aVersion, attribute, None))
-                if isinstance(val, list):
-                    val = tuple(val)
-                if not attribute in kwargs.keys():
-                    object.__setattr__(self, attribute, val)
-
-        for attribute in kwargs.keys():
-            if attribute in self.__dict__.keys():
-                val = copy.deepcopy(kwargs.get(attribute))
-                if isinstance(val, list):
-                    val = tuple(val)
-                # If either a snapshot or release qualifier is supplied, eliminate the other.
-                # We've verified that only one of the two is supplied above.
-                object.__setattr__(self, attribute, val)
-                if attribute == 'snapshotQualifier':
-                    object.__setattr__(self, 'releaseQualifier', None)
-                    theInts = list(self.theInts)
-                    theInts[2] = None
-                    object.__setattr__(self, 'theInts', tuple(theInts))
-                elif attribute == 'releaseQualifier':
-                    object.__setattr__(self, 'snapshotQualifier', None)
-
-        
+            # Copy the attributes from the provided version (those explicitly supplied are replaced below).
+            theInts = aVersion.theInts
+            snapshotQualifier = aVersion.snapshotQualifier
+            releaseQualifier = aVersion.releaseQualifier
+
+        for attribute, val in kwargs.items():
+            if isinstance(val, list):
+                val = tuple(val)
+            # If either a snapshot or release qualifier is supplied, eliminate the other.
+            # We've verified that only one of the two is supplied above.
+            if attribute == 'theInts':
+                if val is not None:
+                    theInts = tuple(val)
+            elif attribute == 'snapshotQualifier':
+                snapshotQualifier = val
+                releaseQualifier = None
+                theInts = theInts[CNVersion.MAJOR_SLICE] + (None,)
+            elif attribute == 'releaseQualifier':
+                releaseQualifier = val
+                snapshotQualifier = None
+
+        object.__setattr__(self, 'theInts', theInts)
+        object.__setattr__(self, 'snapshotQualifier', snapshotQualifier)
+        object.__setattr__(self, 'releaseQualifier', releaseQualifier)
+        object.__setattr__(self, '_hash', hash((theInts, snapshotQualifier, releaseQualifier)))
+        object.__setattr__(self, '_sortKey', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CNVersion objects are immutable: can\'t set %s' % (name))
+
+    def __delattr__(self, name):
+        raise AttributeError('CNVersion objects are immutable: can\'t delete %s' % (name))
+
+    def __copy__(self) -> 'CNVersion':
+        return self
+
+    def __deepcopy__(self, memo) -> 'CNVersion':
+        return self
+
+    def __reduce__(self):
+        # The default (slot by slot) unpickling would trip over __setattr__.
+        return (CNVersion.restore, (self.theInts, self.snapshotQualifier, self.releaseQualifier))
+
+    @staticmethod
+    def restore(theInts: tuple, snapshotQualifier: str, releaseQualifier: str) -> 'CNVersion':
+        if snapshotQualifier is not None:
+            return CNVersion(theInts=theInts[CNVersion.MAJOR_SLICE], snapshotQualifier=snapshotQualifier)
+        return CNVersion(theInts=theInts, releaseQualifier=releaseQualifier)
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def parse(aString: str) -> 'CNVersion':
+        """
+        Return the CNVersion for a version string.
+        Results are cached, so parsing the same string again returns the same (immutable) object.
+        """
+        return CNVersion(aString=aString)
+
+    # Rank of the various kinds of version sharing the same major and minor numbers.
+    QUALIFIER_RANK = {'dated-snapshot': 0, 'snapshot': 1, 'M': 2, 'RC': 3, 'release': 4}
+
+    @staticmethod
+    def classify(patch, releaseQualifier, snapshotQualifier) -> (str, int):
+        """
+        Return the kind of a version (a QUALIFIER_RANK key) and its number within that kind (the date of a dated
+        SNAPSHOT, the M or RC number). A version without a patch number ("3.5") is a SNAPSHOT; one with a patch number
+        and no date is a release, even if it ends in -SNAPSHOT (CNVersion doesn't keep that suffix).
+        CNVersion and VersionTable both classify versions with this, so they agree on precedence.
+        """
+        if snapshotQualifier:
+            return ('dated-snapshot', int(snapshotQualifier))
+        if patch is None:
+            return ('snapshot', 0)
+        if releaseQualifier:
+            kind = releaseQualifier.rstrip('0123456789')
+            return (kind, int(releaseQualifier[len(kind):]))
+        return ('release', 0)
+
+    @staticmethod
+    def keyFor(major: int, minor: int, patch, releaseQualifier, snapshotQualifier) -> tuple:
+        (kind, number) = CNVersion.classify(patch, releaseQualifier, snapshotQualifier)
+        return (major, minor, patch if patch is not None else -1, CNVersion.QUALIFIER_RANK[kind], number)
+
+    def qualifierKind(self) -> str:
+        return CNVersion.classify(self.theInts[2], self.releaseQualifier, self.snapshotQualifier)[0]
+
+    def sortKey(self) -> tuple:
+        """
+        Return a key ordering versions by Chisel's precedence:
+        3.5-20220101-SNAPSHOT < 3.5-SNAPSHOT < 3.5.0-M1 < 3.5.0-RC1 < 3.5.0 < 3.5.1 < 3.10.0
+        """
+        if self._sortKey is None:
+            object.__setattr__(self, '_sortKey', self.computeSortKey())
+        return self._sortKey
+
+    def computeSortKey(self) -> tuple:
+        return CNVersion.keyFor(self.theInts[0], self.theInts[1], self.theInts[2], self.releaseQualifier, self.snapshotQualifier)
+
     def hasMinor(self) -> bool:
         return self.theInts[2] is not None
 
@@ -160,22 +229,36 @@ class CNVersion:
     def __eq__(self, other):
         """Overrides the default implementation"""
         if isinstance(other, CNVersion):
-            equal = True
-            for i in range(CNVersion.nComponents):
-                equal &= self.theInts[i] == other.theInts[i]
-                if not equal:
-                    break
-            if equal:
-                equal &= self.snapshotQualifier == other.snapshotQualifier
-            if equal:
-                equal &= self.releaseQualifier == other.releaseQualifier
-            return equal
+            if self is other:
+                return True
+            return self._hash == other._hash and self.theInts == other.theInts and self.snapshotQualifier == other.snapshotQualifier and self.releaseQualifier == other.releaseQualifier
         else:
             return NotImplemented
 
     def __hash__(self):
         """Overrides the default implementation"""
-        return hash(tuple(sorted(self.__dict__.items())))
+        return self._hash
+
+    # Versions are ordered by Chisel's precedence (see sortKey()).
+    def __lt__(self, other):
+        if isinstance(other, CNVersion):
+            return self.sortKey() < other.sortKey()
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, CNVersion):
+            return self.sortKey() <= other.sortKey()
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, CNVersion):
+            return self.sortKey() > other.sortKey()
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, CNVersion):
+            return self.sortKey() >= other.sortKey()
+        return NotImplemented
 
     def __repr__(self) -> str:
         s = CNVersion.valsToString(self.theInts)
@@ -185,6 +268,134 @@ class CNVersion:
             s += (( '-' + self.snapshotQualifier) if self.snapshotQualifier else '') + '-SNAPSHOT'
         return s
 
+class VersionTable:
+    """
+    A batch of version strings (tags, for example) parsed into columns, for queries over many versions at once.
+    Each column is an array with one entry per version: major ('3' in 3.5.1), minor ('5'), patch ('1', or -1 if there
+    isn't one), kind (the CNVersion.QUALIFIER_RANK of the qualifier), number (the M or RC number) and date (of a
+    dated SNAPSHOT, or 0).
+    Filters return a new table sharing the columns, so they can be chained:
+        VersionTable(tags).releases().series('3.5').latest(2).strings()
+    Strings that aren't versions are skipped (and listed in rejected).
+    """
+    kindNames = sorted(CNVersion.QUALIFIER_RANK.keys(), key=lambda k: CNVersion.QUALIFIER_RANK[k])
+    columnNames = ('major', 'minor', 'patch', 'kind', 'number', 'date')
+
+    def __init__(self, strings=(), prefix: str = 'v'):
+        self.prefix = prefix
+        self.source = []
+        self.columns = {name: array('q') for name in VersionTable.columnNames}
+        self.keys = []
+        self.rejected = []
+        for aString in strings:
+            self.append(aString)
+        self.rows = None
+
+    def append(self, aString: str):
+        text = aString.strip()
+        version = text[len(self.prefix):] if self.prefix and text.startswith(self.prefix) else text
+        vrm = CNVersion.versionRegex.fullmatch(version)
+        if not text or vrm is None:
+            if text:
+                self.rejected.append(text)
+            return
+        (major, minor) = [int(i) for i in vrm.group('major').split('.')]
+        # CNVersion calls 3.5 the major version and 1 (in 3.5.1) the minor version.
+        patch = int(vrm.group('minor')) if vrm.group('minor') else None
+        # The same classification and precedence as CNVersion.sortKey().
+        key = CNVersion.keyFor(major, minor, patch, vrm.group('releaseQualifier'), vrm.group('snapshotQualifier'))
+        (rank, number) = key[3:]
+        date = number if rank == CNVersion.QUALIFIER_RANK['dated-snapshot'] else 0
+        if date:
+            number = 0
+        for (name, value) in zip(VersionTable.columnNames, (major, minor, key[2], rank, number, date)):
+            self.columns[name].append(value)
+        self.keys.append(key)
+        self.source.append(text)
+
+    def view(self, rows) -> 'VersionTable':
+        '''Return a table of the selected rows (indices into the columns) sharing our columns.'''
+        table = VersionTable.__new__(VersionTable)
+        table.prefix = self.prefix
+        table.source = self.source
+        table.columns = self.columns
+        table.keys = self.keys
+        table.rejected = self.rejected
+        table.rows = rows if isinstance(rows, array) else array('q', rows)
+        return table
+
+    def rowIndices(self):
+        return range(len(self.source)) if self.rows is None else self.rows
+
+    def where(self, column: str, predicate) -> 'VersionTable':
+        '''Select the rows whose value in column satisfies predicate.'''
+        values = self.columns[column]
+        return self.view([r for r in self.rowIndices() if predicate(values[r])])
+
+    def releases(self) -> 'VersionTable':
+        '''Versions that aren't SNAPSHOTs (releases, release candidates and milestones).'''
+        return self.where('kind', lambda k: k >= CNVersion.QUALIFIER_RANK['M'])
+
+    def finals(self) -> 'VersionTable':
+        '''Releases without a qualifier.'''
+        return self.where('kind', lambda k: k == CNVersion.QUALIFIER_RANK['release'])
+
+    def snapshots(self) -> 'VersionTable':
+        return self.where('kind', lambda k: k <= CNVersion.QUALIFIER_RANK['snapshot'])
+
+    def kinds(self, *names) -> 'VersionTable':
+        ranks = set([CNVersion.QUALIFIER_RANK[n] for n in names])
+        return self.where('kind', lambda k: k in ranks)
+
+    def series(self, major: str) -> 'VersionTable':
+        '''Versions in a major ("3.5") series.'''
+        (m0, m1) = [int(i) for i in major.split('.')]
+        majors = self.columns['major']
+        minors = self.columns['minor']
+        return self.view([r for r in self.rowIndices() if majors[r] == m0 and minors[r] == m1])
+
+    @staticmethod
+    def boundKey(bound) -> tuple:
+        if bound is None or isinstance(bound, tuple):
+            return bound
+        if not isinstance(bound, CNVersion):
+            bound = CNVersion.parse(str(bound).lstrip('v'))
+        return bound.sortKey()
+
+    def between(self, low=None, high=None) -> 'VersionTable':
+        '''Versions v with low <= v <= high (in Chisel precedence). Either bound may be None, a string or a CNVersion.'''
+        lowKey = VersionTable.boundKey(low)
+        highKey = VersionTable.boundKey(high)
+        keys = self.keys
+        return self.view([r for r in self.rowIndices() if (lowKey is None or keys[r] >= lowKey) and (highKey is None or keys[r] <= highKey)])
+
+    def sorted(self, reverse: bool = False) -> 'VersionTable':
+        '''Order the versions by Chisel precedence (ties are kept in their original order).'''
+        keys = self.keys
+        return self.view(sorted(self.rowIndices(), key=lambda r: keys[r], reverse=reverse))
+
+    def latest(self, n: int = 1) -> 'VersionTable':
+        '''The n latest versions, oldest first.'''
+        rows = self.sorted().rows
+        return self.view(rows[len(rows) - n:] if n > 0 else array('q'))
+
+    def column(self, name: str) -> list:
+        values = self.columns[name]
+        return [values[r] for r in self.rowIndices()]
+
+    def strings(self) -> list:
+        '''The original strings (including any prefix) of the selected versions.'''
+        return [self.source[r] for r in self.rowIndices()]
+
+    def versions(self) -> list:
+        return [CNVersion.parse(s[len(self.prefix):] if self.prefix and s.startswith(self.prefix) else s) for s in self.strings()]
+
+    def __len__(self) -> int:
+        return len(self.source) if self.rows is None else len(self.rows)
+
+    def __iter__(self):
+        return iter(self.strings())
+
 def main(argv=None): # IGNORE:C0111
 
     def sigterm(signum, frame):
@@ -226,13 +437,43 @@ USAGE
         parser.add_argument("-s", "--setString", dest="string", help="version as dotted strinf", metavar="str" )
         parser.add_argument("-i", "--setInts", dest="ints", help="version as list of ints", metavar="str" )
         parser.add_argument('-V', '--version', action='version', version=program_version_message)
+        parser.add_argument("-g", "--git-tags", dest="gitTags", action="store_true", help="select from the tags of the git repository in the current directory")
+        parser.add_argument("-f", "--file", dest="file", action="store", help="select from the versions (one per line) in a file ('-' for stdin)")
+        parser.add_argument("--releases", dest="releases", action="store_true", help="select releases (including release candidates and milestones), not SNAPSHOTs")
+        parser.add_argument("--finals", dest="finals", action="store_true", help="select releases without a qualifier (no RCs or milestones)")
+        parser.add_argument("--series", dest="series", action="store", help="select versions in a major (X.Y) series", metavar="X.Y")
+        parser.add_argument("--from", dest="low", action="store", help="select versions at or after this one", metavar="version")
+        parser.add_argument("--to", dest="high", action="store", help="select versions at or before this one", metavar="version")
+        parser.add_argument("--latest", dest="latest", type=int, action="store", help="select the latest N versions", metavar="N")
  
         # Process arguments
         args = parser.parse_args()
 
         verbose = args.verbose
-        if verbose > 0:
-            print("Verbose mode on")
+        if verbose and verbose > 0:
+            print("Verbose mode on", file=sys.stderr)
+
+        if args.gitTags or args.file:
+            # Select from a batch of versions, printing them (one per line) in version order.
+            strings = []
+            if args.gitTags:
+                strings.extend(subprocess.run(['git', 'tag', '-l'], stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout.split('\n'))
+            if args.file:
+                with (sys.stdin if args.file == '-' else open(args.file, 'r')) as input:
+                    strings.extend(input.read().split('\n'))
+            table = VersionTable(strings)
+            if args.releases:
+                table = table.releases()
+            if args.finals:
+                table = table.finals()
+            if args.series:
+                table = table.series(args.series)
+            if args.low or args.high:
+                table = table.between(args.low, args.high)
+            table = table.latest(args.latest) if args.latest is not None else table.sorted()
+            for aString in table:
+                print(aString)
+            return 0
 
         aString = args.string
         theInts = [int(x) for x in args.ints.split('.', CNVersion.nComponents)] if args.ints else None
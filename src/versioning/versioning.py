@@ -12,21 +12,37 @@ versioning.versioning -- module to support version manipulation.
 '''
 
 import copy
+import hashlib
+import io
 import os
 import re
+import shlex
 import signal
 import subprocess
 import sys
 import traceback
 import yaml
-from pathlib import Path, PurePath
+from pathlib import Path
 from argparse import ArgumentParser, FileType
 from argparse import RawDescriptionHelpFormatter
-from functools import reduce
 from subprocess import PIPE
 
-from version.Version import CNVersion
-from citSupport.monitorRepos import BaseRepo
+from version.Version import CNVersion, CLIError as VersionError
+from versioningSupport.buildFiles import BuildFileIndex
+from versioningSupport.parseCache import ParseCache
+from versioningSupport.gitTags import GitTagIndex
+from versioningSupport.versionHistory import VersionHistoryIndex
+from versioningSupport.orderedPool import orderedMap
+from versioningSupport.scalaLexer import ScalaLexer, StrippedLine
+from versioningSupport.lineScanner import LineScanner
+from versioningSupport.rewriter import applySplices, replaceFile
+from versioningSupport.dependencyGraph import DependencyCycleError, DependencyGraph
+from versioningSupport.makeDeps import stampDurations, writeDepsMk
+from versioningSupport.timings import timings
+from versioningSupport.fingerprint import FileHashCache, moduleFingerprints, writeChecksumFiles
+from versioningSupport.versionRegistry import VersionRegistry
+from versioningSupport.gitObjects import GitObjectReader, expandRevision, shortMergeBase, submoduleBranches
+from versioningSupport import daemon
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
@@ -62,37 +78,22 @@ def sigterm(signum, frame):
         doExit = True
 
 class ScalaText:
-    commentREs = re.compile(r'(?P<line>//)|(?P<begin>/\*)|(?P<end>\*/)')
+    lexer = ScalaLexer()
 
     @staticmethod
-    def decomment(line: str, inComment: bool) -> (str, bool):
-        commentBegin = 0 if inComment else None
-        commentEnd = None
-        comments = []
-        for m in re.finditer(ScalaText.commentREs, line):
-            if m.group('line'):
-                if not inComment:
-                    commentBegin = m.start('line')
-                    break
-            elif m.group('begin'):
-                if not commentBegin:
-                    commentBegin = m.start('begin')
-                inComment = True
-            elif m.group('end'):
-                if inComment:
-                    commentEnd = m.end('end')
-                    comments.append((commentBegin, commentEnd))
-                    commentBegin = None
-                    commentEnd = None
-                    inComment = False
-
-        if commentBegin is not None and commentEnd is None:
-            commentEnd = len(line)
-            comments.append((commentBegin, commentEnd))
-        reversedComments = comments.reverse() if len(comments) > 1 else comments
-        for c in reversedComments:
-            line = line[:c[0]] + line[c[1]:]
-        return((line, inComment))
+    def decomment(line: str, state) -> (StrippedLine, tuple):
+        """
+        Remove comments from a line of Scala.
+        :return: the uncommented text (which can map its offsets back to line) and the lexer state for the next line.
+        """
+        return ScalaText.lexer.lexLine(line, state)
+
+    @staticmethod
+    def advance(line: str, state) -> tuple:
+        """
+        Return the lexer state after a line we don't need the uncommented text of.
+        """
+        return ScalaText.lexer.advance(line, state)
 
 mapRegex = {
     'begin' : re.compile(r'\bval defaultVersions\s*=\s*(Map|Seq)\('),
@@ -101,11 +102,17 @@ mapRegex = {
     'moduleId' : re.compile(r'(?P<prefix>(.*)"(?P<organizationName>([^"]*))"\s*%%\s*"(?P<packageName>([\w-]+))"\s*%\s*")(?P<version>(' + CNVersion.versionRegex.pattern + '))(?P<suffix>("(?P<lineend>(.*))))$'),
     'end' : re.compile(r'\)')
 }
+# Literals every map entry contains.
+mapEntryAnchors = ['->', '%']
 
 versionFiles = {
     'build.sbt' : {
         'decomment' : ScalaText.decomment,
-        'versionTag': r'[^[:alnum:]]version[[:space:]]*:=[[:space:]]*',
+        'advance' : ScalaText.advance,
+        # Literals every line we're interested in (outside a version map) contains.
+        'anchors' : ['version', 'name', 'defaultVersions'],
+        # versionTag is a POSIX (extended) regex for git log -G
+        'versionTag': r'(^|[^[:alnum:]])version[[:space:]]*:=[[:space:]]*',
         'versionLineRegex' : re.compile(r'^(?P<prefix>.*\bversion\s*:=\s*")(?P<version>(' + CNVersion.versionRegex.pattern + r'))(?P<suffix>".*)$'),
         'packageNameRegex' : re.compile(r'^\s*name\s*:=\s*"(?P<packageName>[^"]+)"'),
         'mapBeginRegex' : mapRegex['begin'],
@@ -114,7 +121,9 @@ versionFiles = {
     },
     'build.sc' : {
         'decomment' : ScalaText.decomment,
-        'versionTag': r'[^[:alnum:]]def[[:space:]]+publishVersion[[:space:]]*=[[:space:]]*',
+        'advance' : ScalaText.advance,
+        'anchors' : ['publishVersion', 'artifactName', 'defaultVersions'],
+        'versionTag': r'(^|[^[:alnum:]])def[[:space:]]+publishVersion[[:space:]]*=[[:space:]]*',
         'versionLineRegex' : re.compile(r'^(?P<prefix>.*\bdef publishVersion\s*=\s*")(?P<version>(' + CNVersion.versionRegex.pattern + r'))(?P<suffix>".*)$'),
         'packageNameRegex' : re.compile(r'^\s*override\s+def\s+artifactName\s*=\s*"(?P<packageName>[^"]+)"'),
         'mapBeginRegex' : mapRegex['begin'],
@@ -123,6 +132,14 @@ versionFiles = {
     }
 }
 
+# Combine each kind of build file's line regexes, so a line is matched once (and only if it contains an anchor).
+for fileops in versionFiles.values():
+    fileops['lineScanner'] = LineScanner(fileops['anchors'], [('mapBegin', fileops['mapBeginRegex']), ('packageName', fileops['packageNameRegex']), ('version', fileops['versionLineRegex'])])
+    # Either flavor of map entry may be in use - once we've seen one, we only look for that flavor.
+    entryAlternatives = [('entry%d' % (i), rx) for i, rx in enumerate(fileops['mapEntryRegex'])]
+    fileops['mapEntryScanner'] = LineScanner(mapEntryAnchors, entryAlternatives)
+    fileops['mapEntryScanners'] = {name: LineScanner(mapEntryAnchors, [(name, rx)]) for (name, rx) in entryAlternatives}
+
 commands = {
     'read' : {
         'description' : 'read build files and create/update version config cache',
@@ -190,6 +207,42 @@ commands = {
         'writeConfig' : False,
         'writeFiles' : False
     },
+    'fingerprint' : {
+        'description' : 'print a fingerprint of each module\'s build definition and (transitively) its dependencies\', for build cache keys',
+        'prereqs' : ['maps'],
+        'writeConfig' : False,
+        'writeFiles' : False
+    },
+    'deps-mk' : {
+        'description' : 'generate make prerequisites (deps.mk) from the dependency maps in the build files, longest build chains first',
+        'prereqs' : ['maps'],
+        'writeConfig' : False,
+        'writeFiles' : False
+    },
+    'pins' : {
+        'description' : 'list the build files that pin the specified packages (package or package=version; all packages if none are specified) and the versions they pin them to',
+        'prereqs' : ['paths', 'versions'],
+        'writeConfig' : False,
+        'writeFiles' : False
+    },
+    'matrix' : {
+        'description' : 'print each module\'s version and dependency map at the specified (--ref) revisions, reading them from git without touching the working tree',
+        'prereqs' : None,
+        'writeConfig' : False,
+        'writeFiles' : False
+    },
+    'tag-spec' : {
+        'description' : 'print the git tag arguments (-m "<branch> <merge base>" v<version>) for each module\'s HEAD, one "<module> <arguments>" line per module',
+        'prereqs' : None,
+        'writeConfig' : False,
+        'writeFiles' : False
+    },
+    'serve' : {
+        'description' : 'answer verify, read, dependency-* and deps-mk requests from a resident process (the command line uses it when it\'s running)',
+        'prereqs' : None,
+        'writeConfig' : False,
+        'writeFiles' : False
+    },
     'help' : {
         'description' : 'provide help text',
         'prereqs' : None,
@@ -197,155 +250,206 @@ commands = {
         'writeFiles' : False
     }
 }
+# Commands a resident (serve) process may run on behalf of the command line.
+residentCommands = ['verify', 'read', 'dependency-order', 'dependency-array', 'dependency-cicache', 'deps-mk', 'pins']
+
+def parserSignature() -> str:
+    '''A digest of the build file regexes, used to invalidate cached parse results when the parser changes.'''
+    patterns = []
+    for baseName, fileops in sorted(versionFiles.items()):
+        patterns.append(baseName)
+        for key in ['versionLineRegex', 'packageNameRegex', 'mapBeginRegex', 'mapEndRegex']:
+            patterns.append(fileops[key].pattern)
+        patterns.extend([rx.pattern for rx in fileops['mapEntryRegex']])
+        patterns.extend(fileops['anchors'])
+        patterns.append(fileops['lineScanner'].pattern)
+    # The comment stripping also determines what we extract.
+    patterns.extend([rx.pattern for rx in [ScalaLexer.normalRE, ScalaLexer.stringRE, ScalaLexer.tripleEndRE, ScalaLexer.commentRE, ScalaLexer.charLiteralRE]])
+    return hashlib.sha1('\n'.join(patterns).encode('utf-8')).hexdigest()
+
 def moduleIsAuthoritative(moduleDir: str) -> bool:
     return len(moduleDir.split(os.path.sep)) == 1
 
 class PackageVersion:
-    def __init__(self, name: str, version: CNVersion, map: dict):
+    def __init__(self, name: str, version: CNVersion, map: dict, spans: list = None):
         self.name = name
         self.version = version
         self.map = map
+        # (start, end, packageName) of each version literal in the file - packageName is None for the file's own version.
+        self.spans = spans if spans is not None else []
 
 class WorkContext:
-    def __init__(self, progName: str, args: str, versionConfig: dict, path: str, findMinor: bool):
+    def __init__(self, progName: str, args: str, versionConfig: dict, path: str, findMinor: bool, buildFiles: BuildFileIndex = None, parseCache: ParseCache = None):
         self.progName = progName
         self.args = args
         self.path = path
-        self.repo = BaseRepo(self.path)
+        self._repo = None
         self.versionConfig = versionConfig
         self.versionConfigUpdated = False
         self.files = []
+        # The build file index is normally shared by all the WorkContexts so the tree is only scanned once.
+        self.buildFiles = buildFiles if buildFiles is not None else BuildFileIndex(versionFiles.keys(), args.excludePath)
+        self.parseCache = parseCache
         self.findMinor = findMinor
         self.version = None
         self.moduleVersionMap = None
-        self.recurse = False
+        self.recurse = args.recursive
         self.dryRun = args.dryRun
         self.output = args.output
 
+    @property
+    def repo(self):
+        '''The module's git repository. It's only needed to deduce minor versions, so it's opened on first use.'''
+        if self._repo is None:
+            # GitPython (and github3, imported by monitorRepos) take longer to import than the rest of the program.
+            from citSupport.monitorRepos import BaseRepo
+            self._repo = BaseRepo(self.path)
+        return self._repo
+
     def currentMinorVersionFromGitTags(self, major: str, path: str) -> CNVersion:
-        vt = None
-        proc = subprocess.run(['git', 'tag', '-l'], cwd=path, stdout=PIPE, stderr=PIPE, check=True, universal_newlines=True)
-        if proc.returncode == 0:
-            majorMatch = re.compile(re.escape(major) + r'\.(?P<minor>(\d+))(-|\b)')
-            tags = proc.stdout.split('\n')
-            candidates = sorted(filter(majorMatch.search, tags), reverse=True)
-            for c in candidates:
-                vt = CNVersion(aString=c.strip('v'))
-                if vt and vt.theInts[2] is not None:
-                    break
-        return vt
+        # The tags for each repository are read and sorted (in version order) once.
+        return GitTagIndex.forPath(path).latestForMajor(major)
 
     def currentMinorVersionFromGitChangelog(self, major: str, path: str, baseFileName: str) -> CNVersion:
         vt = None
         regexes = versionFiles[baseFileName]
-        versionTag = regexes['versionTag']
-        versionLineRegex = regexes['versionLineRegex']
-        # Look in the git change log for the first version with a minor revision
-        minorRE = r'\.[0-9]+'
-        minorRevisionRE = versionTag + '"' + re.escape(major) + minorRE
-        proc = subprocess.run(['git', 'log', '-m', '-p', '-G' + minorRevisionRE, 'build.sbt'], cwd=self.path, stdout=PIPE, stderr=PIPE, check=True, universal_newlines=True)
-        if proc.returncode == 0:
-            changes = proc.stdout.split('\n')
-            candidates = filter(versionLineRegex.search, changes)
-            for c in candidates:
-                line = c.rstrip('\n')
-                lm = versionLineRegex.search(line)
-                if lm:
-                    versionString = lm.group('version')
-                    vt = CNVersion(aString=versionString)
-                    if vt and vt.theInts[2] is not None:
-                        break
+        history = VersionHistoryIndex.forPath(path)
+        if history is None:
+            return vt
+        # Look in the (incrementally maintained) version history for the most recent version with a minor revision
+        for (commit, versionString) in history.versions(path, baseFileName, regexes['versionTag'], regexes['versionLineRegex']):
+            v = CNVersion.parse(versionString)
+            if v.hasMinor() and CNVersion.valsToString(v.theInts[CNVersion.MAJOR_SLICE]) == major:
+                vt = v
+                break
         return vt
 
-    # Read lines of a file looking for package and version information.
-    # If provided with an output file and PackageVersion, copy the file updating the PackageVersion
-    def analyzeFileLines(self, inputPath, fileops, input, updatePackageVersion: PackageVersion = None, output = None) -> PackageVersion:
-        versionLineRegex = fileops['versionLineRegex']
-        mapBeginRegex = fileops['mapBeginRegex']
-        mapEntryRegex = None
+    # Read lines of a file looking for package and version information, recording the location of each version literal.
+    # If provided with a PackageVersion, also return the splices (start, end, replacement) needed to update the file to it.
+    def analyzeFileLines(self, inputPath, fileops, input, updatePackageVersion: PackageVersion = None) -> (PackageVersion, list):
+        lineScanner = fileops['lineScanner']
+        mapEntryScanner = fileops['mapEntryScanner']
         mapEndRegex = fileops['mapEndRegex']
+        versionLineRegex = fileops['versionLineRegex']
         decomment = fileops['decomment']
-        packageNameRegex = fileops['packageNameRegex']
+        advance = fileops['advance']
         myVersion = None
-        myPackageName = self.path
-        update = False
-        inComment = False
+        # The package name is None if there isn't one in the file (determineVersion() supplies a default).
+        myPackageName = None
+        splices = []
+        spans = []
+        lineOffset = 0
+        lexState = None
         inMap = False
-        gotInfo = { 'name' : False, 'version' : False, 'map' : False}
-        quitOnAllFound = True if output is None else False
+        gotName = gotVersion = gotMap = False
+        quitOnAllFound = True if updatePackageVersion is None else False
         myPackageVersionMap = {}
         action = '(would set)' if self.dryRun else 'set'
         for l in input:
-            line = l.rstrip('\n')
-            (test, inComment) = decomment(line, inComment)
+            line = l.rstrip('\r\n')
+            lineStart = lineOffset
+            lineOffset += len(l)
+            # Lines without an anchor can't match - we only need to know whether they start (or end) a comment.
+            if not inMap and not lineScanner.isCandidate(line):
+                lexState = advance(line, lexState)
+                continue
+            (test, lexState) = decomment(line, lexState)
             # Do we have a version map in the uncommented line?
-            mm = None
             if not inMap:
-                mm = mapBeginRegex.match(test)
-                if mm:
+                hm = lineScanner.match(test)
+                if hm is None:
+                    continue
+                if hm.name == 'mapBegin':
                     inMap = True
-            if inMap:
-                # Have we determined which flavor of defaultVersions is in use?
-                if mapEntryRegex is None:
-                    entryRegexes = []
-                    if isinstance(fileops['mapEntryRegex'], list):
-                        entryRegexes = fileops['mapEntryRegex']
+                else:
+                    if hm.name == 'packageName':
+                        myPackageName = hm.group('packageName')
+                        gotName = True
+                        # The name may be followed by the version on the same line.
+                        lm = versionLineRegex.match(test)
                     else:
-                        entryRegexes = [fileops['mapEntryRegex']]
-                    for mapEntryrx in entryRegexes:
-                        if mapEntryrx.search(test):
-                            mapEntryRegex = mapEntryrx
-                            break
-                if mapEntryRegex:
-                    mm = mapEntryRegex.search(test)
-                    if mm:
-                        mm = mapEntryRegex.search(line)
-                        if mm:
-                            packageName = mm.group('packageName')
-                            packageVersion = mm.group('version')
-                            myPackageVersionMap[packageName] = packageVersion
-                            if updatePackageVersion and not self.args.onlyroot:
-                                if packageName not in updatePackageVersion.map:
-                                    print("%s - %s:%s not in updatePackageVersion.map (%s)" % (self.progName, self.args.command, packageName, ", ".join(updatePackageVersion.map.keys())), file=sys.stderr)
-                                else:
-                                    newVersion = self.moduleVersionMap[packageName]
-                                    if packageVersion != newVersion:
-                                        prefix = mm.group('prefix')
-                                        suffix = mm.group('suffix')
-                                        line = prefix + newVersion + suffix
-                                        update = True
-                                        print('%s - %s: %s %s %s:%s' % (self.progName, self.args.command, inputPath, action, packageName, newVersion), file=sys.stderr)
-                            test = mm.string[mm.start('lineend'):]
-                mm = mapEndRegex.search(test)
-                if mm:
-                    inMap = False
-                    gotInfo['map'] = True
-            else:
-                pm = packageNameRegex.search(test)
-                if pm:
-                    myPackageName = pm.group('packageName')
-                    gotInfo['name'] = True
-
-                # Do we have a valid version setting in the uncommented line?
-                lm = versionLineRegex.match(test)
-                if lm:
-                    lm = versionLineRegex.match(line)
+                        lm = hm
+                    # Do we have a valid version setting in the uncommented line?
                     if lm:
-                        myVersion = CNVersion(aString=lm.group('version'))
-                        gotInfo['version'] = True
+                        myVersion = CNVersion.parse(lm.group('version'))
+                        gotVersion = True
+                        span = test.originalSpan(lm.start('version'), lm.end('version'))
+                        span = (lineStart + span[0], lineStart + span[1])
+                        spans.append(span + (None,))
                         if updatePackageVersion and myVersion != updatePackageVersion.version:
                             versionStr = str(updatePackageVersion.version)
-                            prefix = lm.group('prefix')
-                            suffix = lm.group('suffix')
-                            line = prefix + versionStr + suffix
-                            update = True
-                            print('%s - %s: %s %s %s:%s' % (self.progName, self.args.command, inputPath, action, myPackageName, versionStr), file=sys.stderr)
+                            splices.append(span + (versionStr,))
+                            print('%s - %s: %s %s %s:%s' % (self.progName, self.args.command, inputPath, action, myPackageName if myPackageName else self.path, versionStr), file=sys.stderr)
+            if inMap:
+                em = mapEntryScanner.search(test) if mapEntryScanner.isCandidate(line) else None
+                if em:
+                    # Stick to the flavor of defaultVersions in use.
+                    mapEntryScanner = fileops['mapEntryScanners'][em.name]
+                    packageName = em.group('packageName')
+                    packageVersion = em.group('version')
+                    myPackageVersionMap[packageName] = packageVersion
+                    span = test.originalSpan(em.start('version'), em.end('version'))
+                    span = (lineStart + span[0], lineStart + span[1])
+                    spans.append(span + (packageName,))
+                    if updatePackageVersion and not self.args.onlyroot:
+                        if packageName not in updatePackageVersion.map:
+                            print("%s - %s:%s not in updatePackageVersion.map (%s)" % (self.progName, self.args.command, packageName, ", ".join(updatePackageVersion.map.keys())), file=sys.stderr)
+                        else:
+                            newVersion = self.moduleVersionMap[packageName]
+                            if packageVersion != newVersion:
+                                splices.append(span + (newVersion,))
+                                print('%s - %s: %s %s %s:%s' % (self.progName, self.args.command, inputPath, action, packageName, newVersion), file=sys.stderr)
+                    test = test[em.start('lineend'):]
+                if mapEndRegex.search(test):
+                    inMap = False
+                    gotMap = True
 
-            if quitOnAllFound and reduce(lambda x, y: x and y, gotInfo.values()):
+            if quitOnAllFound and gotName and gotVersion and gotMap:
                 break
-            if output:
-                print(line, file=output)
-        return (PackageVersion(myPackageName, myVersion, myPackageVersionMap), update)
+        return (PackageVersion(myPackageName, myVersion, myPackageVersionMap, spans), splices)
+
+    def readPackageVersion(self, filePath: str, fileops: dict) -> PackageVersion:
+        '''Extract the package information from a build file, using the parse cache if we have one.'''
+        if self.parseCache is None:
+            with open(filePath, 'r') as input:
+                (myPackageVersion, dummy) = self.analyzeFileLines(filePath, fileops, input)
+            timings.count('files parsed')
+            return myPackageVersion
+
+        with open(filePath, 'rb') as input:
+            content = input.read()
+            fingerprint = ParseCache.fingerprint(os.fstat(input.fileno()), content)
+        entry = self.parseCache.lookup(filePath, fingerprint)
+        if entry is not None:
+            try:
+                version = CNVersion.parse(entry['version']) if entry['version'] else None
+                timings.count('parse cache hits')
+                return PackageVersion(entry['name'], version, dict(entry['map']))
+            except VersionError:
+                self.parseCache.discard(filePath)
+        input = io.StringIO(content.decode('utf-8'), newline=None)
+        (myPackageVersion, dummy) = self.analyzeFileLines(filePath, fileops, input)
+        timings.count('files parsed')
+        version = str(myPackageVersion.version) if myPackageVersion.version else None
+        self.parseCache.store(filePath, fingerprint, myPackageVersion.name, version, myPackageVersion.map)
+        return myPackageVersion
+
+    def getVersionsAtRevision(self, revision: str) -> dict:
+        """
+        Read the module's build files as they are at a git revision, without touching the working tree.
+        :return: a dictionary of the build files that exist at revision, and their PackageVersion.
+        """
+        reader = GitObjectReader.forPath(self.path)
+        versions = {}
+        if reader is None:
+            return versions
+        for baseFilename, fileops in versionFiles.items():
+            filePath = os.path.normpath(os.path.join(self.path, baseFilename))
+            content = reader.readText(revision, reader.relativePath(filePath))
+            if content is not None:
+                input = io.StringIO(content, newline=None)
+                (versions[filePath], dummy) = self.analyzeFileLines('%s:%s' % (revision, filePath), fileops, input)
+        return versions
 
     def getVersions(self) -> dict:
         """
@@ -353,28 +457,21 @@ class WorkContext:
         :return: a dictionary containing module names and versions for any modules found beneath the specified path.
         """
         # If there is a build.sbt or build.sc file, we may be able to extract the version using sbt
-        dir = Path(self.path)
-        dirPrefix = '**/' if self.recurse else ''
-        self.files = [f for f in dir.glob(dirPrefix + 'build.s*') if os.path.basename(f) == 'build.sbt' or os.path.basename(f) == 'build.sc']
+        # The index has already pruned excluded paths, build output and rocket-chip's sbt directory.
+        with timings.phase('file discovery', self.path):
+            self.files = self.buildFiles.files(self.path, self.recurse)
         modules = {}
         for f in self.files:
             baseFilename = os.path.basename(f)
             modulePath = os.path.dirname(f)
-            if modulePath in self.args.excludePath:
-                continue
-            (relRoot, moduleDir) = os.path.split(modulePath)
-            dirComponents = PurePath(relRoot).parts
-            if moduleDir == 'sbt' and 'rocket-chip' in dirComponents:
-                continue
             if not modulePath in modules.keys():
                 modules[modulePath] = {}
                 modules[modulePath]['paths'] = {}
             filePath = os.path.normpath(f)
             modules[modulePath]['paths'][filePath] = {}
             fileops = versionFiles[baseFilename]
-            myPackageVersion = None
-            with open(f, 'r') as input:
-                (myPackageVersion, dummy) = self.analyzeFileLines(filePath, fileops, input)
+            with timings.phase('parse', self.path):
+                myPackageVersion = self.readPackageVersion(filePath, fileops)
             modules[modulePath]['paths'][filePath]['version'] = myPackageVersion.version
             modules[modulePath]['paths'][filePath]['packageName'] = myPackageVersion.name
             modules[modulePath]['paths'][filePath]['map'] = myPackageVersion.map
@@ -422,10 +519,12 @@ class WorkContext:
                     mismatchedVersions = []
                     major = '.'.join([str(i) for i in myVersion.theInts[CNVersion.MAJOR_SLICE]])
                     if self.repo:
-                        vt = self.currentMinorVersionFromGitTags(major, modPath)
+                        with timings.phase('git tags', modPath):
+                            vt = self.currentMinorVersionFromGitTags(major, modPath)
                         if vt:
                             deducedVersions.append(CNVersion(aVersion=myVersion, theInts=vt.theInts))
-                        vt = self.currentMinorVersionFromGitChangelog(major, modPath, baseFilename)
+                        with timings.phase('git changelog', modPath):
+                            vt = self.currentMinorVersionFromGitChangelog(major, modPath, baseFilename)
                         if vt:
                             deducedVersions.append(CNVersion(aVersion=myVersion, theInts=vt.theInts))
                         if len(deducedVersions) == 0:
@@ -490,72 +589,46 @@ class WorkContext:
             baseFilename = os.path.basename(f)
             fileops = versionFiles[baseFilename]
             inputName = str(f)
-            outputName = inputName + '.versioning'
-            w = Path(outputName)
-            update = False
             packageName = module['packageName']
-            myPackageVersion = None
-            with open(f, 'r') as input, open(w, 'w') as output:
-                updatePackageVersion = PackageVersion(packageName, version, self.moduleVersionMap)
-                (myPackageVersion, update) = self.analyzeFileLines(inputName, fileops, input, updatePackageVersion, output)
+            # Read the file as is (without newline translation) so the splice offsets are exact.
+            with open(inputName, 'r', newline='') as input:
+                content = input.read()
+            updatePackageVersion = PackageVersion(packageName, version, self.moduleVersionMap)
+            (myPackageVersion, splices) = self.analyzeFileLines(inputName, fileops, io.StringIO(content, newline=''), updatePackageVersion)
+            update = len(splices) > 0
+            # Files that don't change are never opened for writing.
             if update and not self.dryRun:
-                os.rename(inputName, inputName + '.bak')
-                os.rename(outputName, inputName)
-            else:
-                os.remove(outputName)
+                with timings.phase('file writes', moduleDir):
+                    replaceFile(inputName, applySplices(content, splices), self.args.backups)
+                timings.count('files written', module=moduleDir)
             self.versionConfigUpdated |= update
 
     def determineDependencies(self) -> dict:
-        dependencies = {}
-        dependencies['order'] = []
-        dependencies['module'] = {}
+        """
+        Determine the build order and (transitive) dependencies of the authoritative modules.
+        :return: a dictionary containing the build order ('order' - a list of layers of modules that may be built together),
+         the transitive dependencies of each module ('module' - in build order), and the DependencyGraph ('graph').
+        """
         moduleDependencies = {md: m for md, m in self.versionConfig.items() if moduleIsAuthoritative(md)}
         packageToModuleMap = {m['packageName']: md for md, m in moduleDependencies.items()}
+        graph = DependencyGraph(moduleDependencies.keys())
         # Record the immediate dependencies, skipping those modules that aren't in the packageToModuleMap
-        # We iterate over a copy of the map since we can't modify it during iteration.
-        immediateModuleDependencies = copy.deepcopy(moduleDependencies)
-        for mdir, module in immediateModuleDependencies.items():
-            dependencies['module'][mdir] = set()
+        for mdir, module in moduleDependencies.items():
             for p in module['map'].keys():
                 if p in packageToModuleMap:
-                    dependencies['module'][mdir].update(set([packageToModuleMap[p]]))
+                    graph.addDependency(mdir, packageToModuleMap[p])
                 else:
-                    del moduleDependencies[mdir]['map'][p]
                     print("Skipping un-versioned module %s" % (p), file=sys.stderr)
 
-        modules = list(moduleDependencies.keys())
-        makingProgress = True
-        while len(modules) and makingProgress:
-            d = []
-            updateModuleDependencies = copy.deepcopy(moduleDependencies)
-            for mdir, module in moduleDependencies.items():
-                if len(module['map']) == 0:
-                    d.append(mdir)
-                    del updateModuleDependencies[mdir]
-                    modules.remove(mdir)
-                    packageName = module['packageName']
-                    for dependencyMap in [m['map'] for m in updateModuleDependencies.values()]:
-                        if packageName in dependencyMap.keys():
-                            del dependencyMap[packageName]
-            moduleDependencies = updateModuleDependencies
-            if len(d) > 0:
-                dependencies['order'].append(d)
-            else:
-                makingProgress = False
-        if not makingProgress:
-            raise CLIError("Couldn't determine dependencies for %s" % (", ".join(modules)))
-        # We want a stable dependency order. We could get one by simply sorting dependencies alphabetically,
-        #  but instead, we generate a dictionary keyed by module, with values determined by build order,
-        #  then use this to sort dependencies.
-        order = {}
-        buildOrder = 1
-        # Now walk the dependency list in build order to solve the transitive dependencies
-        for mdir in [dd for d in dependencies['order'] for dd in d]:
-            order[mdir] = buildOrder
-            dependSets = [dependencies['module'][s] for s in dependencies['module'][mdir]]
-            dependencies['module'][mdir] = sorted(dependencies['module'][mdir].union(*dependSets), key=lambda dep: order[dep])
-            buildOrder += 1
-
+        try:
+            order = graph.layers()
+        except DependencyCycleError as e:
+            raise CLIError("Couldn't determine dependencies - %s" % (e))
+        # The dependencies are listed in build order, so the results are stable.
+        dependencies = {}
+        dependencies['order'] = order
+        dependencies['module'] = {md: graph.transitiveDependencies(md) for md in moduleDependencies.keys()}
+        dependencies['graph'] = graph
         return dependencies
 
 
@@ -663,7 +736,7 @@ def loadVersionConfigs(configFilename: str) -> dict:
     for modulePath, versions in versionConfigs['versions'].items():
         internalConfigs[modulePath] = {}
         internalConfigs[modulePath]['packageName'] = versions['packageName']
-        internalConfigs[modulePath]['version'] = CNVersion(aString=versions['version'])
+        internalConfigs[modulePath]['version'] = CNVersion.parse(versions['version'])
 
     return internalConfigs
 
@@ -684,8 +757,10 @@ def dumpVersionConfigs(configFilename: str, versionConfigs: dict):
         os.rename(configFilename, configFilename + '.bak')
     os.rename(outputFilename, configFilename)
 
-def main(argv=None) -> int: # IGNORE:C0111
-    '''Command line options.'''
+def main(argv=None, resident: daemon.ResidentState = None) -> int: # IGNORE:C0111
+    '''Command line options.
+    resident is the state kept by a serve process, when main() is answering a request for it.
+    '''
 
     exitCode = 0
     if argv is None:
@@ -731,6 +806,19 @@ USAGE
         parser.add_argument("-e", "--excludePath", dest="excludePath", action="append", help="exclude a path (add multiple arguments for multiple paths)")
         parser.add_argument("-o", "--output", dest="output", nargs='?', type=FileType('w'), action="store", help="write output to specified file", default=sys.stdout)
         parser.add_argument("--onlyroot", dest="onlyroot", action='store_true', help="only update root versions (not dependencies) [default: %(default)s]")
+        parser.add_argument("-j", "--jobs", dest="jobs", type=int, action="store", help="number of modules to process concurrently (output is kept in module order) [default: %(default)s]", default=1)
+        parser.add_argument("--backups", dest="backups", type=int, action="store", help="number of backup copies (.bak, .bak.1, ...) to keep of updated build files [default: %(default)s]", default=1)
+        parser.add_argument("--no-cache", dest="noCache", action='store_true', help="don't use (or update) the build file parse cache kept next to the config file")
+        parser.add_argument("--stamps", dest="stamps", action="store", help="deps-mk: directory of Makefile build stamps used to weight the build chains [default: %(default)s]", default='stamps')
+        parser.add_argument("--target-suffix", dest="targetSuffix", action="store", help="deps-mk: suffix of the project make targets [default: %(default)s]", default='sbt+publishLocal')
+        parser.add_argument("--ref", dest="refs", action="append", help="matrix: git revision to read the build files at (add multiple arguments for multiple revisions; {branch} is replaced by the submodule's .gitmodules branch, {xbranch} by its .x branch) [default: HEAD]; tag-spec: the branch (origin/<branch>) whose merge base is recorded in the tag message [default: {xbranch}]")
+        parser.add_argument("--checksum-dir", dest="checksumDir", action="store", help="fingerprint, dependency-cicache: write each module's fingerprint to CHECKSUMDIR/<module>.sbtcksum (and, for dependency-cicache, <module>.sbtcksm: the files named in the cache keys)")
+        parser.add_argument("--timings", dest="timings", action="store_true", help="report the wall and CPU time of each phase (overall and per module) and counts of files parsed, subprocesses and cache hits", default=False)
+        parser.add_argument("--timings-format", dest="timingsFormat", choices=['text', 'json'], action="store", help="the format of the --timings report [default: %(default)s]", default='text')
+        parser.add_argument("--timings-output", dest="timingsOutput", type=FileType('w'), action="store", help="write the --timings report to the specified file [default: stderr]")
+        parser.add_argument("--no-daemon", dest="noDaemon", action='store_true', help="don't use a running serve process, even if there is one")
+        parser.add_argument("--watch", dest="watch", choices=['auto', 'inotify', 'poll'], action="store", help="serve: how to detect changes to the tree [default: %(default)s]", default='auto')
+        parser.add_argument("--idle-timeout", dest="idleTimeout", type=float, action="store", help="serve: exit after this many idle seconds (0 to never exit) [default: %(default)s]", default=3600.0)
         parser.add_argument(dest='command', choices=commands.keys())
         parser.add_argument(dest='paths', help='paths to search for files to be manipulated (build.s*)', nargs='*')
 
@@ -742,8 +830,26 @@ USAGE
         if verbose and verbose > 0:
             print("Verbose mode on", file=sys.stderr)
 
-        # Install the signal handler to catch SIGTERM
-        signal.signal(signal.SIGTERM, sigterm)
+        socketPath = daemon.socketPathForConfig(args.config) if args.config else None
+        if resident is not None:
+            if args.command not in residentCommands:
+                raise CLIError("%s can't be run by the serve process" % (args.command))
+        elif args.command == 'serve':
+            return daemon.serve(socketPath, lambda state: main(resident=state), args.watch, args.idleTimeout)
+        elif args.command in residentCommands and not args.noDaemon and socketPath and os.path.exists(socketPath):
+            # A serve process is running for this tree - let it do the work.
+            reply = daemon.request(socketPath, sys.argv[1:], os.getcwd())
+            if reply is not None:
+                sys.stderr.write(reply['stderr'])
+                sys.stdout.write(reply['stdout'])
+                return reply['exitCode']
+
+        # A request answered by the serve process is timed there.
+        timings.enable(args.timings)
+
+        # Install the signal handler to catch SIGTERM (the serve process has its own).
+        if resident is None:
+            signal.signal(signal.SIGTERM, sigterm)
 
         if args.release is not None and args.snapshot is not None:
             raise CLIError("Can't specify both release (-r) and snapshot (-s)")
@@ -757,8 +863,14 @@ USAGE
         versionConfigs = {}
         configUpdated = False
         if configFilename and os.path.exists(configFilename):
-            versionConfigs = loadVersionConfigs(configFilename)
-
+            with timings.phase('config load'):
+                versionConfigs = loadVersionConfigs(configFilename)
+
+        pinQueries = []
+        if args.command == 'pins':
+            # The arguments are the packages to look for, not module paths.
+            pinQueries = args.paths
+            args.paths = []
         modulePaths = []
         if '.' in args.paths and len(args.paths) > 1:
             print('A "." path causes others to be ignored: (%s)' % (", ".join([p for p in args.paths if p != "."])), file=sys.stderr)
@@ -767,11 +879,19 @@ USAGE
             modulePaths = args.paths if len(args.paths) > 0 else list(versionConfigs.keys())
         # If we have an excludePath, use it to modify the modulePaths
         if args.excludePath:
-            # Use set difference to remove the excluded modules from modulePaths
-            modulePaths = set(modulePaths + args.excludePath) - set(args.excludePath)
+            # Remove the excluded modules from modulePaths, keeping the order stable.
+            modulePaths = [p for p in dict.fromkeys(modulePaths) if p not in args.excludePath]
         else:
             # No excludePath - make it an empty list
             args.excludePath = []
+        # A single index of the build files, shared by all the modules.
+        buildFiles = resident.buildFileIndex(versionFiles.keys(), args.excludePath) if resident else BuildFileIndex(versionFiles.keys(), args.excludePath)
+        # Cached results of parsing the build files, kept next to the version config file.
+        parseCache = None
+        if not args.noCache and configFilename:
+            (configDir, configBase) = os.path.split(configFilename)
+            cacheFilename = os.path.join(configDir, '.' + configBase + '.cache')
+            parseCache = resident.parseCache(cacheFilename, parserSignature()) if resident else ParseCache(cacheFilename, parserSignature())
         # Find those modules for which we don't have any version information (currently unlikely)
         needVersions = set([vk for vk, vi in versionConfigs.items() if 'version' not in vi or vi['version'] is None])
         findMinor = args.findMinor
@@ -798,7 +918,8 @@ USAGE
             if 'versions' in commandDesc['prereqs']:
                 missing['versions'] = needVersions
 
-        needVersions = needVersions.union(*[set(m) for m in missing.values() if (m and len(m) > 0)])
+        # Process modules in a stable order so output can be compared between runs.
+        needVersions = sorted(needVersions.union(*[set(m) for m in missing.values() if (m and len(m) > 0)]))
 
         updatedVersions = {}
         if len(needVersions) > 0:
@@ -811,10 +932,15 @@ USAGE
                 suffixes.append('using heuristics')
             suffix = ','.join(suffixes)
             print('%s %s for %s: %s' % (prefix, missingPieces, ', '.join(needVersions), suffix), file=sys.stderr)
-            for path in needVersions:
-                workContext = WorkContext(program_name, args, versionConfigs, path, findMinor)
-                modules = workContext.determineVersion(workContext.getVersions())
+            def resolveModules(path: str) -> dict:
+                workContext = WorkContext(program_name, args, versionConfigs, path, findMinor, buildFiles, parseCache)
+                return workContext.determineVersion(workContext.getVersions())
+
+            for modules in orderedMap(resolveModules, needVersions, args.jobs):
                 for modulePath, module in modules.items():
+                    # Modules found by a recursive search that aren't in the version cache are reported by doWork().
+                    if modulePath not in versionConfigs:
+                        continue
                     newModule = versionConfigs[modulePath]
                     # We update paths and map since these aren't saved in the versions cache.
                     newModule['paths'] = module['paths']
@@ -856,11 +982,28 @@ USAGE
                     configUpdated = True
 
         moduleVersionMap = {c['packageName']:str(c['version']) for md, c in versionConfigs.items() if moduleIsAuthoritative(md)}
-        if args.command == 'dependency-order' or args.command == 'dependency-array' or args.command == 'dependency-cicache':
-            workContext = WorkContext(program_name, args, versionConfigs, '.', findMinor)
+        if args.command in ['dependency-order', 'dependency-array', 'dependency-cicache', 'deps-mk', 'fingerprint']:
+            workContext = WorkContext(program_name, args, versionConfigs, '.', findMinor, buildFiles, parseCache)
             workContext.moduleVersionMap = moduleVersionMap
-            dependencies = workContext.determineDependencies()
+            with timings.phase('dependency solving'):
+                dependencies = workContext.determineDependencies()
             moduleDirs = [dd for d in dependencies['order'] for dd in d]
+            if args.command == 'fingerprint' or (args.command == 'dependency-cicache' and args.checksumDir):
+                # File hashes are cached (by size and mtime) next to the version config file.
+                hashCacheFilename = None
+                if not args.noCache and configFilename:
+                    (configDir, configBase) = os.path.split(configFilename)
+                    hashCacheFilename = os.path.join(configDir, '.' + configBase + '.hashes')
+                hashCache = FileHashCache(hashCacheFilename)
+                with timings.phase('fingerprints'):
+                    fingerprints = moduleFingerprints(dependencies['graph'], hashCache, args.jobs)
+                timings.count('file hash cache hits', hashCache.hits)
+                if args.checksumDir:
+                    writeChecksumFiles(fingerprints, args.checksumDir)
+                    if args.command == 'dependency-cicache':
+                        writeChecksumFiles(fingerprints, args.checksumDir, 'sbtcksm')
+                if not args.dryRun:
+                    hashCache.save()
             if args.command == 'dependency-order':
                 print(" ".join(moduleDirs), file=workContext.output)
             elif args.command == 'dependency-array':
@@ -869,31 +1012,92 @@ USAGE
             elif args.command == 'dependency-cicache':
                 prefix = "v1-dep"
                 sep = "--"
-                moduleDirsReversed = moduleDirs.copy()
-                moduleDirsReversed.reverse()
-                # Generate a set of lists (well, tuples so they have constant hashes) of cache key combinations.
-                moduleCacheKeys = {}
-                for md in moduleDirs:
-                    d = dependencies['module'][md]
-                    moduleCacheKeys[md] = set(tuple(d)).union(*[moduleCacheKeys[dd] for dd in d])
                 # We currently only use first-order dependencies (direct module/package dependencies).
                 # If we were to introduce additional jobs to save module/package combinations,
                 #  (i.e., firrtl-interpreter plus treadle post-build caches), we could add their key combination.
                 for md, d in dependencies['module'].items():
                     print("%s:\n%s%s%s%s{{ checksum \"%s.sbtcksum\" }}" % (md, prefix, sep, md, sep, md), file=workContext.output)
-                    modsubs = [dmd for dmd in moduleDirsReversed if dmd in d]
+                    # The transitive dependencies are in build order - the cache keys are most recent first.
+                    modsubs = list(reversed(d))
+                    # The dependency keys have always named <module>.sbtcksm; keep them, so existing cache keys don't change.
                     modsubkeys = [("%s%s{{ checksum \"%s.sbtcksm\" }}" % (dmd, sep, dmd)) for dmd in modsubs]
                     for m in modsubkeys:
                         print("%s%s%s" % (prefix, sep, m), file=workContext.output)
+            elif args.command == 'fingerprint':
+                for md in moduleDirs:
+                    print("%s %s" % (md, fingerprints[md]), file=workContext.output)
+            elif args.command == 'deps-mk':
+                durations = stampDurations(args.stamps, args.targetSuffix)
+                writeDepsMk(dependencies['graph'], durations, args.targetSuffix, workContext.output, program_name)
             else:
                 print('%s: Unrecognized dependency command: %s' % (program_name, args.command), file=sys.stderr)
                 exitCode = 2
 
+        elif args.command == 'matrix':
+            revisions = args.refs if args.refs else ['HEAD']
+            branches = submoduleBranches()
+            def readModuleRevisions(path: str) -> list:
+                workContext = WorkContext(program_name, args, versionConfigs, path, findMinor, buildFiles, parseCache)
+                rows = []
+                for revision in revisions:
+                    moduleRevision = expandRevision(revision, branches.get(os.path.normpath(path)))
+                    rows.append((moduleRevision, workContext.getVersionsAtRevision(moduleRevision)))
+                return rows
+
+            output = args.output
+            for (path, rows) in zip(modulePaths, orderedMap(readModuleRevisions, modulePaths, args.jobs)):
+                print('%s:' % (path), file=output)
+                width = max([len(r) for (r, versions) in rows])
+                for (revision, versions) in rows:
+                    if not versions:
+                        print('  %-*s  -' % (width, revision), file=output)
+                        exitCode = max(exitCode, 1)
+                    for filePath, packageVersion in versions.items():
+                        dependencies = ' '.join(['%s:%s' % (p, v) for p, v in sorted(packageVersion.map.items())])
+                        line = '  %-*s  %s %s' % (width, revision, packageVersion.name, packageVersion.version)
+                        if len(versions) > 1:
+                            line += ' (%s)' % (os.path.basename(filePath))
+                        print(line + (' ' + dependencies if dependencies else ''), file=output)
+            GitObjectReader.closeAll()
+
+        elif args.command == 'pins':
+            registry = VersionRegistry.fromVersionConfigs(versionConfigs, modulePaths)
+            for query in pinQueries if pinQueries else sorted(registry.pins.keys()):
+                (dependency, sep, version) = query.partition('=')
+                for buildFile, pinned in registry.pinnedBy(dependency, version if sep else None).items():
+                    print("%s %s %s" % (buildFile, dependency, pinned), file=args.output)
+
+        elif args.command == 'tag-spec':
+            # This replaces scripts/genTag.sh (and getVersion.sh's sbt run) for every submodule at once.
+            revision = args.refs[0] if args.refs else '{xbranch}'
+            branches = submoduleBranches()
+            def moduleTagSpec(path: str) -> str:
+                workContext = WorkContext(program_name, args, versionConfigs, path, findMinor, buildFiles, parseCache)
+                versions = [v.version for v in workContext.getVersionsAtRevision('HEAD').values() if v.version]
+                if not versions:
+                    print("%s - %s: couldn't determine module version for %s" % (program_name, args.command, path), file=sys.stderr)
+                    return None
+                branch = expandRevision(revision, branches.get(os.path.normpath(path)))
+                mergeBase = shortMergeBase(path, 'origin/' + branch)
+                if mergeBase is None:
+                    print("%s - %s: couldn't determine the merge base of origin/%s and HEAD for %s" % (program_name, args.command, branch, path), file=sys.stderr)
+                    return None
+                return '%s -m %s %s' % (shlex.quote(path), shlex.quote('%s %s' % (branch, mergeBase)), shlex.quote('v%s' % (versions[0])))
+
+            for spec in orderedMap(moduleTagSpec, modulePaths, args.jobs):
+                if spec is None:
+                    exitCode = 1
+                else:
+                    print(spec, file=args.output)
+            GitObjectReader.closeAll()
+
         else:
-            for path in modulePaths:
-                workContext = WorkContext(program_name, args, versionConfigs, path, findMinor)
+            def doModuleWork(path: str) -> (WorkContext, int):
+                workContext = WorkContext(program_name, args, versionConfigs, path, findMinor, buildFiles, parseCache)
                 workContext.moduleVersionMap = moduleVersionMap
-                result = doWork(workContext, authoritativeModules)
+                return (workContext, doWork(workContext, authoritativeModules))
+
+            for (workContext, result) in orderedMap(doModuleWork, modulePaths, args.jobs):
                 if result == 0:
                     configUpdated |= workContext.versionConfigUpdated
                 exitCode = max(exitCode, result)
@@ -901,17 +1105,15 @@ USAGE
             # Do we have paths as a prerequisite?
             # If so, check for consistency
             if commandDesc['prereqs'] and 'paths' in commandDesc['prereqs']:
-                modules = versionConfigs
-                moduleNames = set([m['packageName'] for md, m in modules.items() if md in modulePaths])
-                for mName in moduleNames:
-                    vl = [v['version'] for v in [d for dl in [list(pl.values()) for pl in [m['paths'] for md, m in modules.items() if md in modulePaths and m['packageName'] == mName]] for d in dl]]
-                    possibleVersions = set(vl)
-                    if len(possibleVersions) > 1:
-                        ambiguousModuleDirs = [(md, v['version'], f) for md, m in modules.items() if md in modulePaths and m['packageName'] == mName for f, v in list(m['paths'].items()) if v['version'] in possibleVersions]
-                        print("%s; Ambigous versions for %s: %s" % (program_name, mName, ', '.join([("%s: %s - %s" % (a[0], a[1], a[2])) for a in ambiguousModuleDirs])), file=sys.stderr)
+                registry = VersionRegistry.fromVersionConfigs(versionConfigs, modulePaths)
+                for mName, ambiguousModuleDirs in registry.ambiguous().items():
+                    print("%s; Ambigous versions for %s: %s" % (program_name, mName, ', '.join([("%s: %s - %s" % (a[0], a[1], a[2])) for a in ambiguousModuleDirs])), file=sys.stderr)
 
             if not args.dryRun and configUpdated:
-                dumpVersionConfigs(configFilename, versionConfigs)
+                with timings.phase('config dump'):
+                    dumpVersionConfigs(configFilename, versionConfigs)
+        if parseCache and not args.dryRun:
+            parseCache.save()
         return exitCode
 
     except KeyboardInterrupt:
@@ -928,6 +1130,10 @@ USAGE
             sys.stderr.write(program_name + ": " + repr(e) + "\n")
             sys.stderr.write(indent + "  for help use --help")
         sys.exit(2)
+    finally:
+        if timings.enabled:
+            timings.write(args.timingsOutput if args.timingsOutput else sys.stderr, args.timingsFormat)
+            timings.enable(False)
 
 if __name__ == "__main__":
     if DEBUG:
@@ -0,0 +1,339 @@
+'''
+versioningSupport.benchmark -- benchmarks for the versioning engine.
+
+Run with PYTHONPATH pointing at the src directory, for example:
+  python3 src/versioningSupport/benchmark.py lexer
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import copy
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from functools import reduce
+
+from versioningSupport.scalaLexer import ScalaLexer
+from versioningSupport.dependencyGraph import DependencyGraph
+from versioningSupport.releaseTree import generateReleaseTree
+
+__all__ = ['runMeasured', 'syntheticBuildSbtLines', 'syntheticDependencyMaps', 'timeIt', 'writeFixtureTree']
+
+srcDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+versioningScript = os.path.join(srcDir, 'versioning', 'versioning.py')
+
+def syntheticBuildSbtLines(nProjects: int) -> list:
+    '''Generate the lines of a large multi-project build.sbt, exercising the awkward lexical cases.'''
+    lines = [
+        '// See LICENSE for license details.',
+        '/* A block comment /* with a nested comment */ spanning',
+        '   several lines */',
+        'val defaultVersions = Map(',
+        '  "chisel3" -> "3.5-SNAPSHOT", // trailing comment',
+        '  "treadle" -> "1.5-SNAPSHOT"',
+        ')',
+    ]
+    for i in range(nProjects):
+        lines.extend([
+            'lazy val project%d = (project in file("project%d"))' % (i, i),
+            '  .settings(',
+            '    name := "project%d", /* inline */ version := "3.5-SNAPSHOT",' % (i),
+            '    resolvers += "sonatype" at "https://oss.sonatype.org/content/repositories/snapshots", // a URL',
+            '    scalacOptions ++= Seq("-deprecation", "-feature"),',
+            '    description := """A triple-quoted description // not a comment',
+            '      that continues /* still not a comment */ here""",',
+            '    libraryDependencies += "edu.berkeley.cs" %% "chisel3" % "3.5-SNAPSHOT",',
+            "    initialCommands := 'q' + \"\\\"escaped\\\" // quotes\"",
+            '  )',
+        ])
+    return lines
+
+def timeIt(function, repeat: int = 3) -> float:
+    '''Return the best wall time (seconds) of repeat calls to function.'''
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+def benchmarkLexer(sizes: list, repeat: int, output) -> int:
+    '''Time the Scala lexer on synthetic build files of increasing size. The time per line should be flat.'''
+    lexer = ScalaLexer()
+    print('%10s %10s %12s %14s %12s' % ('projects', 'lines', 'seconds', 'lines/second', 'usec/line'), file=output)
+    for nProjects in sizes:
+        lines = syntheticBuildSbtLines(nProjects)
+        elapsed = timeIt(lambda: sum(1 for l in lexer.lexLines(lines)), repeat)
+        print('%10d %10d %12.4f %14.0f %12.2f' % (nProjects, len(lines), elapsed, len(lines) / elapsed, 1e6 * elapsed / len(lines)), file=output)
+    return 0
+
+def referenceAnalyzeLines(fileops: dict, lines: list) -> (str, str, dict):
+    '''The original analyzeFileLines loop (for comparison): every line is uncommented and matched against
+    every regex, and matches are repeated against the raw line. Like a write, it reads the whole file.
+    '''
+    decomment = fileops['decomment']
+    mapEntryRegex = None
+    name = version = None
+    versionMap = {}
+    lexState = None
+    inMap = False
+    gotInfo = {'name' : False, 'version' : False, 'map' : False}
+    for line in lines:
+        (test, lexState) = decomment(line, lexState)
+        if not inMap and fileops['mapBeginRegex'].match(test):
+            inMap = True
+        if inMap:
+            if mapEntryRegex is None:
+                for rx in fileops['mapEntryRegex']:
+                    if rx.search(test):
+                        mapEntryRegex = rx
+                        break
+            if mapEntryRegex and mapEntryRegex.search(test):
+                mm = mapEntryRegex.search(line)
+                if mm:
+                    versionMap[mm.group('packageName')] = mm.group('version')
+                    test = mm.string[mm.start('lineend'):]
+            if fileops['mapEndRegex'].search(test):
+                inMap = False
+                gotInfo['map'] = True
+        else:
+            pm = fileops['packageNameRegex'].search(test)
+            if pm:
+                name = pm.group('packageName')
+                gotInfo['name'] = True
+            if fileops['versionLineRegex'].match(test):
+                lm = fileops['versionLineRegex'].match(line)
+                if lm:
+                    version = lm.group('version')
+                    gotInfo['version'] = True
+        reduce(lambda x, y: x and y, gotInfo.values())
+    return (name, version, versionMap)
+
+def benchmarkAnalyzer(sizes: list, repeat: int, output) -> int:
+    '''Compare analyzeFileLines (anchor prefilter and combined regexes) with the original loop on large multi-project build.sbt files.'''
+    from versioning.versioning import PackageVersion, WorkContext, versionFiles
+    fileops = versionFiles['build.sbt']
+    args = Namespace(excludePath=[], recursive=False, dryRun=True, output=output, onlyroot=False, command='write')
+    workContext = WorkContext('benchmark', args, {}, '.', False)
+    print('%10s %10s %14s %14s %10s' % ('projects', 'lines', 'original (s)', 'scanner (s)', 'speedup'), file=output)
+    exitCode = 0
+    for nProjects in sizes:
+        lines = syntheticBuildSbtLines(nProjects)
+        content = ''.join([l + '\n' for l in lines])
+        (packageVersion, splices) = workContext.analyzeFileLines('build.sbt', fileops, io.StringIO(content))
+        # Updating the file to the versions it already has makes analyzeFileLines read all of it, without changing anything.
+        workContext.moduleVersionMap = dict(packageVersion.map)
+        update = PackageVersion(packageVersion.name, packageVersion.version, packageVersion.map)
+        (packageVersion, splices) = workContext.analyzeFileLines('build.sbt', fileops, io.StringIO(content), update)
+        (name, version, versionMap) = referenceAnalyzeLines(fileops, lines)
+        if (name, version, versionMap) != (packageVersion.name, str(packageVersion.version), packageVersion.map) or splices:
+            print('%10d: results differ' % (nProjects), file=output)
+            exitCode = 1
+        original = timeIt(lambda: referenceAnalyzeLines(fileops, lines), repeat)
+        scanner = timeIt(lambda: workContext.analyzeFileLines('build.sbt', fileops, io.StringIO(content), update), repeat)
+        print('%10d %10d %14.4f %14.4f %10.1f' % (nProjects, len(lines), original, scanner, original / scanner), file=output)
+    return exitCode
+
+def syntheticDependencyMaps(nModules: int, maxDependencies: int = 6, seed: int = 1) -> dict:
+    '''Generate version config style entries for nModules modules, each depending on a few earlier modules.'''
+    rng = random.Random(seed)
+    modules = {}
+    for i in range(nModules):
+        dependencies = rng.sample(range(i), min(i, rng.randint(0, maxDependencies)))
+        modules['module%d' % (i)] = {
+            'packageName' : 'package%d' % (i),
+            'map' : {('package%d' % (d)) : '1.0-SNAPSHOT' for d in dependencies}
+        }
+    # Present the modules in a scrambled order, as a real version config might.
+    names = list(modules.keys())
+    rng.shuffle(names)
+    return {n: modules[n] for n in names}
+
+def peelingDependencies(moduleDependencies: dict) -> dict:
+    '''The original algorithm: repeatedly peel off the modules with no remaining dependencies (for comparison).'''
+    moduleDependencies = copy.deepcopy(moduleDependencies)
+    packageToModuleMap = {m['packageName']: md for md, m in moduleDependencies.items()}
+    dependencies = {'order' : [], 'module' : {md: set([packageToModuleMap[p] for p in m['map']]) for md, m in moduleDependencies.items()}}
+    modules = list(moduleDependencies.keys())
+    while len(modules):
+        d = []
+        updateModuleDependencies = copy.deepcopy(moduleDependencies)
+        for mdir, module in moduleDependencies.items():
+            if len(module['map']) == 0:
+                d.append(mdir)
+                del updateModuleDependencies[mdir]
+                modules.remove(mdir)
+                for dependencyMap in [m['map'] for m in updateModuleDependencies.values()]:
+                    dependencyMap.pop(module['packageName'], None)
+        moduleDependencies = updateModuleDependencies
+        dependencies['order'].append(d)
+    order = {}
+    for mdir in [dd for d in dependencies['order'] for dd in d]:
+        order[mdir] = len(order)
+        dependSets = [dependencies['module'][s] for s in dependencies['module'][mdir]]
+        dependencies['module'][mdir] = sorted(dependencies['module'][mdir].union(*dependSets), key=lambda dep: order[dep])
+    return dependencies
+
+def graphDependencies(moduleDependencies: dict) -> dict:
+    packageToModuleMap = {m['packageName']: md for md, m in moduleDependencies.items()}
+    graph = DependencyGraph(moduleDependencies.keys())
+    for mdir, module in moduleDependencies.items():
+        for p in module['map'].keys():
+            graph.addDependency(mdir, packageToModuleMap[p])
+    return {'order' : graph.layers(), 'module' : {md: graph.transitiveDependencies(md) for md in moduleDependencies.keys()}}
+
+def benchmarkDependencies(sizes: list, repeat: int, output) -> int:
+    '''Compare the DependencyGraph with the original peeling algorithm on synthetic module graphs.'''
+    print('%10s %10s %14s %14s %10s' % ('modules', 'edges', 'peeling (s)', 'graph (s)', 'speedup'), file=output)
+    exitCode = 0
+    for nModules in sizes:
+        moduleDependencies = syntheticDependencyMaps(nModules)
+        nEdges = sum([len(m['map']) for m in moduleDependencies.values()])
+        if peelingDependencies(moduleDependencies) != graphDependencies(moduleDependencies):
+            print('%10d: results differ' % (nModules), file=output)
+            exitCode = 1
+        peeling = timeIt(lambda: peelingDependencies(moduleDependencies), repeat)
+        graph = timeIt(lambda: graphDependencies(moduleDependencies), repeat)
+        print('%10d %10d %14.4f %14.4f %10.1f' % (nModules, nEdges, peeling, graph, peeling / graph), file=output)
+    return exitCode
+
+def writeFixtureTree(root: str, nModules: int):
+    '''Write a release tree of nModules modules (a chain of dependencies) with a version.yml.'''
+    versions = ['versions:']
+    for i in range(nModules):
+        name = 'module%d' % (i)
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+        lines = [
+            '// See LICENSE for license details.',
+            'name := "%s"' % (name),
+            'version := "1.%d-SNAPSHOT"' % (i),
+            'val defaultVersions = Map(',
+        ]
+        if i > 0:
+            lines.append('  "module%d" -> "1.%d-SNAPSHOT"' % (i - 1, i - 1))
+        lines.append(')')
+        with open(os.path.join(root, name, 'build.sbt'), 'w') as output:
+            output.write('\n'.join(lines) + '\n')
+        versions.append('  %s: {packageName: %s, version: 1.%d-SNAPSHOT}' % (name, name, i))
+    with open(os.path.join(root, 'version.yml'), 'w') as output:
+        output.write('\n'.join(versions) + '\n')
+
+# Modules a command that doesn't need git or the network shouldn't import.
+heavyModules = ['git', 'github3', 'citSupport.monitorRepos']
+
+def runVersioning(root: str, arguments: list) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = srcDir + (os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else '')
+    return subprocess.run([sys.executable, '-X', 'importtime', versioningScript, '--no-daemon'] + arguments, cwd=root, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+def importedModules(importTimes: str) -> set:
+    '''Extract the names of the imported modules from python -X importtime output.'''
+    return set([l.split('|')[-1].strip() for l in importTimes.split('\n') if l.startswith('import time:')])
+
+def benchmarkStartup(nModules: int, repeat: int, threshold: float, output) -> int:
+    '''Time versioning.py help and verify on a fixture tree.
+    Fail if the best time exceeds threshold seconds, or a command imports the modules needed for git or GitHub access.
+    '''
+    exitCode = 0
+    print('%-18s %10s %10s  %s' % ('command', 'best (s)', 'threshold', 'heavy imports'), file=output)
+    with tempfile.TemporaryDirectory(prefix='versioning-startup') as root:
+        writeFixtureTree(root, nModules)
+        for command in [['help'], ['verify'], ['dependency-order']]:
+            heavy = set()
+            def run():
+                proc = runVersioning(root, command)
+                heavy.update(importedModules(proc.stderr).intersection(heavyModules))
+            best = timeIt(run, repeat)
+            regressed = best > threshold or len(heavy) > 0
+            print('%-18s %10.3f %10.3f  %s%s' % (' '.join(command), best, threshold, ', '.join(sorted(heavy)) if heavy else '-', '  REGRESSION' if regressed else ''), file=output)
+            exitCode = max(exitCode, 1 if regressed else 0)
+    return exitCode
+
+def runMeasured(root: str, arguments: list) -> (float, int, int):
+    '''Run versioning.py in root, returning its wall time (seconds), peak resident memory (KiB) and exit code.'''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = srcDir + (os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else '')
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, versioningScript, '--no-daemon', '--no-cache'] + arguments, cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # wait4 reports the resource usage of this child alone.
+    (pid, status, usage) = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return (elapsed, usage.ru_maxrss, proc.returncode)
+
+# The commands benchmarked on release trees, in the order they're run (bump-min and write update the tree).
+treeCommands = [['read'], ['verify', '-m'], ['dependency-order'], ['dependency-array'], ['dependency-cicache'], ['bump-min'], ['write']]
+
+def benchmarkCommands(sizes: list, repeat: int, nCommits: int, nTags: int, output) -> int:
+    '''Time versioning.py commands on synthetic release trees of increasing size (without the parse cache or a serve process).'''
+    print('%8s %-20s %10s %12s %5s' % ('modules', 'command', 'best (s)', 'peak (MiB)', 'exit'), file=output)
+    for nModules in sizes:
+        with tempfile.TemporaryDirectory(prefix='versioning-tree') as root:
+            generateReleaseTree(root, nModules, nCommits, nTags)
+            for command in treeCommands:
+                best = None
+                peak = 0
+                for i in range(repeat):
+                    (elapsed, maxrss, exitCode) = runMeasured(root, command)
+                    best = elapsed if best is None or elapsed < best else best
+                    peak = max(peak, maxrss)
+                print('%8d %-20s %10.3f %12.1f %5d' % (nModules, ' '.join(command), best, peak / 1024.0, exitCode), file=output)
+    return 0
+
+benchmarks = {
+    'lexer' : {
+        'description' : 'strip comments from large synthetic build.sbt files',
+        'function' : lambda args: benchmarkLexer(args.sizes if args.sizes else [100, 1000, 10000], args.repeat, args.output),
+    },
+    'analyzer' : {
+        'description' : 'analyzeFileLines on large synthetic build.sbt files, compared with the original per-line regex loop',
+        'function' : lambda args: benchmarkAnalyzer(args.sizes if args.sizes else [100, 1000, 10000], args.repeat, args.output),
+    },
+    'dependencies' : {
+        'description' : 'build order and transitive dependencies of synthetic module graphs',
+        'function' : lambda args: benchmarkDependencies(args.sizes if args.sizes else [50, 200, 500], args.repeat, args.output),
+    },
+    'commands' : {
+        'description' : 'read, verify -m, dependency-*, bump-min and write on synthetic release trees (-s modules, --commits, --tags)',
+        'function' : lambda args: benchmarkCommands(args.sizes if args.sizes else [5, 20, 50], args.repeat, args.commits, args.tags, args.output),
+    },
+    'startup' : {
+        'description' : 'versioning.py help and verify start up time (fails over the --threshold, or if git/GitHub support is imported)',
+        'function' : lambda args: benchmarkStartup(args.sizes[0] if args.sizes else 10, args.repeat, args.threshold, args.output),
+    },
+}
+
+def main(argv=None) -> int:
+    program_name = os.path.basename(sys.argv[0])
+    maxNameLength = max([len(b) for b in benchmarks.keys()])
+    descriptions = '\n'.join(['%s%s: %s' % (b, ' '*(maxNameLength - len(b)), i['description']) for b, i in benchmarks.items()])
+    parser = ArgumentParser(prog=program_name, epilog=descriptions)
+    parser.add_argument('-n', '--repeat', dest='repeat', type=int, action='store', help='number of repetitions (the best is reported) [default: %(default)s]', default=3)
+    parser.add_argument('-s', '--size', dest='sizes', type=int, action='append', help='problem size (add multiple arguments for multiple sizes)')
+    parser.add_argument('-t', '--threshold', dest='threshold', type=float, action='store', help='startup: maximum acceptable time (seconds) for a command [default: %(default)s]', default=0.3)
+    parser.add_argument('--commits', dest='commits', type=int, action='store', help='commands: commits in each module\'s history [default: %(default)s]', default=200)
+    parser.add_argument('--tags', dest='tags', type=int, action='store', help='commands: tags in each module [default: %(default)s]', default=1000)
+    parser.add_argument(dest='benchmarks', choices=benchmarks.keys(), nargs='+', help='benchmarks to run')
+    args = parser.parse_args(argv)
+    args.output = sys.stdout
+    exitCode = 0
+    for b in args.benchmarks:
+        print('== %s: %s' % (b, benchmarks[b]['description']), file=args.output)
+        exitCode = max(exitCode, benchmarks[b]['function'](args))
+    return exitCode
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+'''
+versioningSupport.buildFiles -- locate the build files (build.sbt, build.sc) in a release tree.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import os
+import threading
+from pathlib import PurePath
+
+__all__ = ['BuildFileIndex']
+
+class BuildFileIndex:
+    ''' An index of the build files beneath a directory.
+    Directories are read (with os.scandir) at most once, no matter how many
+    modules ask for their build files, and build output and VCS directories
+    are never entered.
+    '''
+    # Directories that never contain build files we're interested in.
+    pruneNames = frozenset(['.git', '.bsp', '.bloop', '.idea', '.metals', 'node_modules', 'target', 'test_run_dir'])
+
+    def __init__(self, baseNames, excludePaths=None):
+        self.baseNames = frozenset(baseNames)
+        self.excludePaths = set([BuildFileIndex.normalize(p) for p in excludePaths]) if excludePaths else set()
+        # Directory -> build files in that directory
+        self.dirFiles = {}
+        # Directory -> (unpruned) sub-directories
+        self.subDirs = {}
+        # Directory -> its modification time (ns) when it was read, so changes can be detected
+        self.dirStamps = {}
+        # The index may be shared by WorkContexts running on different threads.
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        return str(PurePath(path))
+
+    def isPruned(self, dirPath: str, name: str) -> bool:
+        if name in BuildFileIndex.pruneNames:
+            return True
+        # rocket-chip's sbt directory contains (unversioned) build files for its tools.
+        if name == 'sbt' and 'rocket-chip' in PurePath(dirPath).parts:
+            return True
+        return False
+
+    def scanDir(self, dirPath: str):
+        '''Read a directory (once), recording its build files and sub-directories.'''
+        if dirPath in self.dirFiles:
+            return
+        files = []
+        subDirs = []
+        if dirPath not in self.excludePaths:
+            try:
+                # Record the modification time before reading, so a change made while we're reading is noticed.
+                self.dirStamps[dirPath] = os.stat(dirPath).st_mtime_ns
+                with os.scandir(dirPath) as it:
+                    for entry in it:
+                        if entry.name in self.baseNames:
+                            if entry.is_file():
+                                files.append(str(PurePath(dirPath, entry.name)))
+                        elif entry.is_dir(follow_symlinks=False) and not self.isPruned(dirPath, entry.name):
+                            subDir = str(PurePath(dirPath, entry.name))
+                            if subDir not in self.excludePaths:
+                                subDirs.append(subDir)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                pass
+        self.dirFiles[dirPath] = sorted(files)
+        self.subDirs[dirPath] = sorted(subDirs)
+
+    def invalidate(self, dirPath: str):
+        '''Forget what we know about a directory that has changed, so it's read again when it's needed.'''
+        with self.lock:
+            self.dirFiles.pop(dirPath, None)
+            self.subDirs.pop(dirPath, None)
+            self.dirStamps.pop(dirPath, None)
+
+    def stamps(self) -> dict:
+        '''Return the modification time (ns) of each directory we've read.'''
+        with self.lock:
+            return dict(self.dirStamps)
+
+    def files(self, path: str, recurse: bool = False) -> list:
+        '''Return the build files in path (and its sub-directories if recurse is True).'''
+        path = BuildFileIndex.normalize(path)
+        with self.lock:
+            self.scanDir(path)
+            result = list(self.dirFiles[path])
+            if recurse:
+                pending = list(reversed(self.subDirs[path]))
+                while pending:
+                    dirPath = pending.pop()
+                    self.scanDir(dirPath)
+                    result.extend(self.dirFiles[dirPath])
+                    pending.extend(reversed(self.subDirs[dirPath]))
+        return result
@@ -0,0 +1,305 @@
+'''
+versioningSupport.daemon -- a resident versioning process that answers requests over a Unix socket.
+
+The daemon keeps the directory index and the build file parse cache in memory between requests,
+and uses inotify (or, where that isn't available, directory modification times) to discard
+what has changed.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import io
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+from .buildFiles import BuildFileIndex
+from .parseCache import ParseCache
+from .gitTags import GitTagIndex
+
+__all__ = ['ResidentState', 'request', 'serve', 'socketPathForConfig']
+
+def socketPathForConfig(configFilename: str) -> str:
+    '''The daemon's socket lives next to the version config file (like the parse cache).'''
+    (configDir, configBase) = os.path.split(configFilename)
+    return os.path.join(configDir, '.' + configBase + '.sock')
+
+class PollingWatcher:
+    ''' Detect changes to directories by comparing their modification times with those recorded when they were read. '''
+    name = 'poll'
+
+    def __init__(self):
+        self.watched = {}
+
+    def watch(self, dirPath: str, stamp: int):
+        self.watched[dirPath] = stamp
+
+    def changes(self) -> set:
+        '''Return the watched directories that have changed (they're no longer watched).'''
+        changed = set()
+        for dirPath, stamp in self.watched.items():
+            try:
+                if os.stat(dirPath).st_mtime_ns != stamp:
+                    changed.add(dirPath)
+            except OSError:
+                changed.add(dirPath)
+        for dirPath in changed:
+            del self.watched[dirPath]
+        return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    ''' Detect changes to directories with Linux inotify (through libc, so there's no additional dependency). '''
+    name = 'inotify'
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ONLYDIR = 0x01000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+    # Only changes to a directory's entries (not to the contents of its files) matter.
+    mask = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    eventHeader = struct.Struct('iIII')
+
+    def __init__(self):
+        # ctypes is only needed by the serve process.
+        import ctypes
+        import ctypes.util
+        libcName = ctypes.util.find_library('c')
+        if not libcName or not sys.platform.startswith('linux'):
+            raise OSError('inotify is not available')
+        self.libc = ctypes.CDLL(libcName, use_errno=True)
+        self.fd = self.libc.inotify_init1(InotifyWatcher.IN_NONBLOCK | InotifyWatcher.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.paths = {}
+        self.watched = {}
+
+    def watch(self, dirPath: str, stamp: int):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirPath), InotifyWatcher.mask)
+        if wd < 0:
+            # Treat a directory we can't watch as changed, so it's read again next time.
+            self.watched[dirPath] = None
+            return
+        self.paths[wd] = dirPath
+        self.watched[dirPath] = wd
+        # The directory may have changed between being read and being watched.
+        try:
+            if os.stat(dirPath).st_mtime_ns != stamp:
+                self.watched[dirPath] = None
+        except OSError:
+            self.watched[dirPath] = None
+
+    def changes(self) -> set:
+        '''Return the watched directories that have changed (they're no longer watched), or None if events were lost.'''
+        changed = set([d for d, wd in self.watched.items() if wd is None])
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                (wd, mask, cookie, length) = InotifyWatcher.eventHeader.unpack_from(data, offset)
+                offset += InotifyWatcher.eventHeader.size + length
+                if mask & InotifyWatcher.IN_Q_OVERFLOW:
+                    overflow = True
+                elif wd in self.paths:
+                    changed.add(self.paths[wd])
+        if overflow:
+            changed = set(self.watched.keys())
+        for dirPath in changed:
+            wd = self.watched.pop(dirPath, None)
+            if wd is not None:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.paths.pop(wd, None)
+        return None if overflow else changed
+
+    def close(self):
+        os.close(self.fd)
+
+def makeWatcher(kind: str = 'auto'):
+    if kind in ['auto', 'inotify']:
+        try:
+            return InotifyWatcher()
+        except OSError:
+            if kind == 'inotify':
+                raise
+    return PollingWatcher()
+
+class ResidentState:
+    ''' The state a daemon keeps between requests: directory indexes and parse caches.
+    refresh() discards the directories that have changed since the last request.
+    '''
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.buildFileIndexes = {}
+        self.parseCaches = {}
+        self.requests = 0
+
+    def buildFileIndex(self, baseNames, excludePaths) -> BuildFileIndex:
+        key = (frozenset(baseNames), frozenset([BuildFileIndex.normalize(p) for p in excludePaths] if excludePaths else []))
+        index = self.buildFileIndexes.get(key)
+        if index is None:
+            index = BuildFileIndex(baseNames, excludePaths)
+            self.buildFileIndexes[key] = index
+        return index
+
+    def parseCache(self, filename: str, signature: str) -> ParseCache:
+        cache = self.parseCaches.get(filename)
+        if cache is None or cache.signature != signature:
+            cache = ParseCache(filename, signature)
+            self.parseCaches[filename] = cache
+        return cache
+
+    def refresh(self):
+        '''Discard the information about anything that's changed since the last request.'''
+        changed = self.watcher.changes()
+        if changed is None:
+            self.buildFileIndexes = {}
+        else:
+            for index in self.buildFileIndexes.values():
+                for dirPath in changed:
+                    index.invalidate(dirPath)
+        # Tags are cheap to re-read, and only needed when minor versions are being determined.
+        GitTagIndex.invalidate()
+
+    def watchNew(self):
+        '''Start watching the directories read while answering the last request.'''
+        watched = self.watcher.watched
+        for index in self.buildFileIndexes.values():
+            for dirPath, stamp in index.stamps().items():
+                if dirPath not in watched:
+                    self.watcher.watch(dirPath, stamp)
+
+    def run(self, entryPoint, argv: list) -> dict:
+        '''Run entryPoint (a command line main()) with argv, capturing its exit code and output.'''
+        self.refresh()
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        savedArgv = sys.argv
+        sys.argv = [savedArgv[0]] + list(argv)
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    exitCode = entryPoint(self)
+                except SystemExit as e:
+                    exitCode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception as e:
+                    print('%s: %s' % (os.path.basename(savedArgv[0]), repr(e)), file=sys.stderr)
+                    exitCode = 2
+        finally:
+            sys.argv = savedArgv
+            self.watchNew()
+            self.requests += 1
+        return {'exitCode' : exitCode if exitCode is not None else 0, 'stdout' : stdout.getvalue(), 'stderr' : stderr.getvalue()}
+
+def receive(connection) -> dict:
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+def exchange(socketPath: str, message: dict, timeout: float) -> dict:
+    '''Send a message to the daemon and return its reply (None if there's no daemon, or it didn't answer).'''
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(socketPath)
+            connection.sendall(json.dumps(message).encode('utf-8'))
+            connection.shutdown(socket.SHUT_WR)
+            reply = receive(connection)
+    except (OSError, ValueError):
+        return None
+    return reply if isinstance(reply, dict) else None
+
+def request(socketPath: str, argv: list, cwd: str, timeout: float = 300.0) -> dict:
+    '''Ask a running daemon to execute argv. Return its reply ({exitCode, stdout, stderr}), or None if it can't.'''
+    reply = exchange(socketPath, {'argv' : argv, 'cwd' : cwd}, timeout)
+    if reply is None or 'exitCode' not in reply:
+        return None
+    return reply
+
+def serve(socketPath: str, entryPoint, watch: str = 'auto', idleTimeout: float = 3600.0) -> int:
+    '''Answer requests on socketPath until we're signalled or idle for idleTimeout seconds.
+    Requests are answered one at a time, and only for clients working in the directory
+    the daemon was started in (others are refused, and run the command themselves).
+    entryPoint is called with the ResidentState and should refuse commands it can't run resident.
+    '''
+    if os.path.exists(socketPath):
+        if exchange(socketPath, {'ping' : True}, 5.0) is not None:
+            print('%s: a daemon is already answering on %s' % (os.path.basename(sys.argv[0]), socketPath), file=sys.stderr)
+            return 1
+        # A stale socket from a daemon that didn't exit cleanly.
+        os.remove(socketPath)
+    cwd = os.path.realpath(os.getcwd())
+    watcher = makeWatcher(watch)
+    state = ResidentState(watcher)
+    stopping = []
+    def stop(signum, frame):
+        stopping.append(signum)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, stop)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socketPath)
+    server.listen(16)
+    server.settimeout(1.0)
+    print('%s: serving %s on %s (watching with %s)' % (os.path.basename(sys.argv[0]), cwd, socketPath, watcher.name), file=sys.stderr)
+    lastRequest = time.monotonic()
+    try:
+        while not stopping and (idleTimeout <= 0 or time.monotonic() - lastRequest < idleTimeout):
+            try:
+                (connection, address) = server.accept()
+            except socket.timeout:
+                continue
+            except InterruptedError:
+                continue
+            with connection:
+                connection.settimeout(None)
+                try:
+                    message = receive(connection)
+                    if message.get('ping'):
+                        argv = None
+                    else:
+                        argv = [str(a) for a in message['argv']]
+                except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                    continue
+                if argv is None:
+                    reply = {'cwd' : cwd, 'requests' : state.requests}
+                elif os.path.realpath(str(message.get('cwd', ''))) != cwd:
+                    reply = {'refused' : 'the daemon is serving %s' % (cwd)}
+                else:
+                    reply = state.run(entryPoint, argv)
+                try:
+                    connection.sendall(json.dumps(reply).encode('utf-8'))
+                except OSError:
+                    pass
+                lastRequest = time.monotonic()
+    finally:
+        server.close()
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+        watcher.close()
+    return 0
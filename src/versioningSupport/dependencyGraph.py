@@ -0,0 +1,160 @@
+'''
+versioningSupport.dependencyGraph -- a module dependency graph with build ordering and transitive closure.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+__all__ = ['DependencyCycleError', 'DependencyGraph']
+
+class DependencyCycleError(Exception):
+    '''Raised when the dependencies contain a cycle. cycle is the path, starting and ending with the same node.'''
+    def __init__(self, cycle: list):
+        super(DependencyCycleError).__init__(type(self))
+        self.cycle = cycle
+        self.msg = "dependency cycle: %s" % (" -> ".join(cycle))
+    def __str__(self):
+        return self.msg
+
+class DependencyGraph:
+    ''' A directed graph of nodes (modules) and their dependencies.
+    Nodes are numbered in the order they're added, and that order is used to break ties,
+    so the results are stable. Everything is computed in O(V+E) (the transitive closure
+    uses one integer bitset per node).
+    '''
+    def __init__(self, nodes=None):
+        self.nodes = []
+        self.index = {}
+        # dependencies[i] - the nodes i depends on; dependents[i] - the nodes that depend on i.
+        self.dependencies = []
+        self.dependents = []
+        self.edges = set()
+        self._layers = None
+        self._order = None
+        self._closure = None
+        if nodes:
+            for node in nodes:
+                self.addNode(node)
+
+    def addNode(self, node: str) -> int:
+        i = self.index.get(node)
+        if i is None:
+            i = len(self.nodes)
+            self.index[node] = i
+            self.nodes.append(node)
+            self.dependencies.append([])
+            self.dependents.append([])
+            self._layers = None
+            self._closure = None
+        return i
+
+    def addDependency(self, node: str, dependency: str):
+        '''Record that node depends on dependency (adding either node if necessary).'''
+        i = self.addNode(node)
+        d = self.addNode(dependency)
+        if (i, d) not in self.edges:
+            self.edges.add((i, d))
+            self.dependencies[i].append(d)
+            self.dependents[d].append(i)
+            self._layers = None
+            self._closure = None
+
+    def layerIndices(self) -> list:
+        '''Kahn's algorithm: each layer contains the nodes whose dependencies are all in earlier layers.'''
+        if self._layers is not None:
+            return self._layers
+        inDegree = [len(d) for d in self.dependencies]
+        layer = [i for i, n in enumerate(inDegree) if n == 0]
+        layers = []
+        placed = 0
+        while layer:
+            layers.append(layer)
+            placed += len(layer)
+            nextLayer = []
+            for i in layer:
+                for j in self.dependents[i]:
+                    inDegree[j] -= 1
+                    if inDegree[j] == 0:
+                        nextLayer.append(j)
+            layer = sorted(nextLayer)
+        if placed != len(self.nodes):
+            raise DependencyCycleError(self.findCycle([i for i, n in enumerate(inDegree) if n > 0]))
+        self._layers = layers
+        self._order = [self.nodes[i] for layer in layers for i in layer]
+        return layers
+
+    def layers(self) -> list:
+        '''Return the build order as a list of layers (lists of nodes that may be built concurrently).'''
+        return [[self.nodes[i] for i in layer] for layer in self.layerIndices()]
+
+    def order(self) -> list:
+        '''Return the nodes in build order.'''
+        self.layerIndices()
+        return list(self._order)
+
+    def findCycle(self, candidates: list) -> list:
+        '''Return a cycle (as a path of nodes) among the candidates (nodes that Kahn's algorithm couldn't place).'''
+        remaining = set(candidates)
+        # Every unplaced node has an unplaced dependency, so walking unplaced dependencies must revisit a node.
+        start = min(remaining)
+        path = []
+        position = {}
+        i = start
+        while i not in position:
+            position[i] = len(path)
+            path.append(i)
+            i = min([d for d in self.dependencies[i] if d in remaining])
+        cycle = path[position[i]:] + [i]
+        return [self.nodes[c] for c in cycle]
+
+    def closureBits(self) -> list:
+        '''Return, for each node, a bitset of its transitive dependencies. Bit n is the n'th node in build order.'''
+        if self._closure is not None:
+            return self._closure
+        layers = self.layerIndices()
+        position = [0] * len(self.nodes)
+        closure = [0] * len(self.nodes)
+        p = 0
+        for layer in layers:
+            for i in layer:
+                position[i] = p
+                p += 1
+        for layer in layers:
+            for i in layer:
+                bits = 0
+                for d in self.dependencies[i]:
+                    bits |= closure[d] | (1 << position[d])
+                closure[i] = bits
+        self._closure = closure
+        return closure
+
+    def transitiveDependencies(self, node: str) -> list:
+        '''Return all the nodes node depends on (directly or indirectly), in build order.'''
+        bits = self.closureBits()[self.index[node]]
+        order = self._order
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(order[low.bit_length() - 1])
+            bits ^= low
+        return result
+
+    def directDependencies(self, node: str) -> list:
+        return [self.nodes[d] for d in self.dependencies[self.index[node]]]
+
+    def criticalPaths(self, weights: dict, defaultWeight: float = 1.0) -> dict:
+        '''Return, for each node, the weight of the heaviest chain starting with it (the node and the nodes that depend on it).
+        Starting the nodes with the heaviest chains first shortens a parallel build.
+        '''
+        length = [0.0] * len(self.nodes)
+        for layer in reversed(self.layerIndices()):
+            for i in layer:
+                longest = max([length[j] for j in self.dependents[i]], default=0.0)
+                length[i] = weights.get(self.nodes[i], defaultWeight) + longest
+        return {self.nodes[i]: length[i] for i in range(len(self.nodes))}
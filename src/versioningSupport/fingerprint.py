@@ -0,0 +1,134 @@
+'''
+versioningSupport.fingerprint -- Merkle fingerprints of module build definitions, for build cache keys.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import glob
+import hashlib
+import json
+import os
+import threading
+
+from .orderedPool import orderedMap
+
+__all__ = ['FileHashCache', 'buildDefinitionFiles', 'moduleFingerprints', 'writeChecksumFiles']
+
+# The files (relative to a module directory) that define how the module is built.
+buildDefinitionPatterns = ['build.sbt', 'build.sc', os.path.join('project', '*.scala'), os.path.join('project', '*.sbt'), os.path.join('project', 'build.properties')]
+
+class FileHashCache:
+    ''' Map a file's path to its content hash, reusing the hash as long as the file's size and mtime_ns don't change.
+    Like the parse cache, it's kept next to the version config file and is simply rebuilt if it can't be read.
+    '''
+    formatVersion = 1
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as input:
+                data = json.load(input)
+        except (OSError, ValueError):
+            self.dirty = True
+            return
+        if not isinstance(data, dict) or data.get('format') != FileHashCache.formatVersion or not isinstance(data.get('files'), dict):
+            self.dirty = True
+            return
+        self.entries = data['files']
+
+    def hash(self, path: str) -> str:
+        '''Return the sha256 digest of path's contents.'''
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if isinstance(entry, list) and len(entry) == 3 and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        digest = hashlib.sha256()
+        with open(path, 'rb') as input:
+            for chunk in iter(lambda: input.read(1 << 20), b''):
+                digest.update(chunk)
+        result = digest.hexdigest()
+        with self.lock:
+            self.entries[path] = [stat.st_size, stat.st_mtime_ns, result]
+            self.dirty = True
+        return result
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or not self.filename:
+                return
+            outputFilename = self.filename + '.versioning'
+            try:
+                with open(outputFilename, 'w', encoding='utf-8') as output:
+                    json.dump({'format' : FileHashCache.formatVersion, 'files' : self.entries}, output, sort_keys=True)
+                os.replace(outputFilename, self.filename)
+                self.dirty = False
+            except OSError:
+                if os.path.exists(outputFilename):
+                    os.remove(outputFilename)
+
+def buildDefinitionFiles(moduleDir: str) -> list:
+    '''Return the build definition files of the module in moduleDir, sorted, relative to moduleDir.'''
+    files = set()
+    for pattern in buildDefinitionPatterns:
+        for path in glob.glob(os.path.join(glob.escape(moduleDir), pattern)):
+            if os.path.isfile(path):
+                files.add(os.path.relpath(path, moduleDir))
+    return sorted(files)
+
+def moduleFingerprints(graph, hashCache: FileHashCache, jobs: int = 1) -> dict:
+    '''
+    Return the fingerprint of each module (node) in the DependencyGraph.
+    A module's fingerprint is the hash of its build definition files' hashes and the fingerprints
+    of its direct dependencies, so it changes whenever anything it (transitively) depends on does.
+    The files are hashed concurrently.
+    '''
+    order = graph.order()
+    moduleFiles = {md: buildDefinitionFiles(md) for md in order}
+    paths = [os.path.join(md, f) for md in order for f in moduleFiles[md]]
+    fileHashes = dict(zip(paths, orderedMap(hashCache.hash, paths, jobs)))
+    fingerprints = {}
+    for md in order:
+        node = hashlib.sha256()
+        node.update(b'versioning-fingerprint 1\n')
+        for f in moduleFiles[md]:
+            node.update(('file %s %s\n' % (f.replace(os.sep, '/'), fileHashes[os.path.join(md, f)])).encode('utf-8'))
+        for d in sorted(graph.directDependencies(md)):
+            node.update(('dependency %s %s\n' % (d, fingerprints[d])).encode('utf-8'))
+        fingerprints[md] = node.hexdigest()
+    return fingerprints
+
+def writeChecksumFiles(fingerprints: dict, directory: str, suffix: str = 'sbtcksum'):
+    '''Write each module's fingerprint to directory/<module>.<suffix>, leaving files that are already up to date untouched.'''
+    os.makedirs(directory, exist_ok=True)
+    for md, fingerprint in fingerprints.items():
+        path = os.path.join(directory, '%s.%s' % (md.replace(os.sep, '_'), suffix))
+        content = fingerprint + '\n'
+        try:
+            with open(path, 'r') as input:
+                if input.read() == content:
+                    continue
+        except OSError:
+            pass
+        with open(path + '.versioning', 'w') as output:
+            output.write(content)
+        os.replace(path + '.versioning', path)
@@ -0,0 +1,139 @@
+'''
+versioningSupport.gitObjects -- read files at any revision through a long-lived git cat-file --batch process.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import atexit
+import os
+import subprocess
+import threading
+from subprocess import PIPE
+
+from .gitTags import repositoryRoot
+
+__all__ = ['GitObjectReader', 'expandRevision', 'shortMergeBase', 'submoduleBranches']
+
+def submoduleBranches(root: str = '.') -> dict:
+    '''Return the branch each submodule tracks (from root's .gitmodules), keyed by submodule path.'''
+    gitmodules = os.path.join(root, '.gitmodules')
+    if not os.path.exists(gitmodules):
+        return {}
+    result = subprocess.run(['git', 'config', '-f', gitmodules, '--get-regexp', r'^submodule\..*\.(path|branch)$'], stdout=PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    paths = {}
+    branches = {}
+    for line in result.stdout.splitlines():
+        (key, sep, value) = line.partition(' ')
+        (name, dot, setting) = key[len('submodule.'):].rpartition('.')
+        if setting == 'path':
+            paths[name] = os.path.normpath(value)
+        else:
+            branches[name] = value
+    return {path: branches.get(name) for name, path in paths.items()}
+
+def expandRevision(revision: str, branch: str) -> str:
+    '''Replace {branch} in revision with the submodule's branch, and {xbranch} with its .x development branch
+    (the -release branch name with -release replaced by .x). A submodule without a branch uses master.
+    '''
+    if not branch:
+        branch = 'master'
+    return revision.replace('{branch}', branch).replace('{xbranch}', branch.replace('-release', '.x', 1))
+
+def shortMergeBase(path: str, revision: str, other: str = 'HEAD') -> str:
+    '''Return the abbreviated hash of the merge base of revision and other in the repository containing path, or None if there isn't one.'''
+    result = subprocess.run(['git', 'merge-base', revision, other], cwd=path, stdout=PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    if result.returncode != 0:
+        return None
+    result = subprocess.run(['git', 'rev-parse', '--short', result.stdout.strip()], cwd=path, stdout=PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+class GitObjectReader:
+    ''' Read the contents of files at a revision (for example 'origin/3.5.x:build.sbt') without
+    touching the working tree. Each repository has a single git cat-file --batch process,
+    started on first use and shared by all the requests for that repository.
+    '''
+    # Readers we've already started, keyed by repository root.
+    readers = {}
+    readersLock = threading.Lock()
+
+    def __init__(self, root: str):
+        self.root = root
+        self.process = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def forPath(path: str) -> 'GitObjectReader':
+        '''Return the (shared) reader for the repository containing path, or None if it isn't in a repository.'''
+        root = repositoryRoot(path)
+        if root is None:
+            return None
+        with GitObjectReader.readersLock:
+            reader = GitObjectReader.readers.get(root)
+            if reader is None:
+                reader = GitObjectReader(root)
+                GitObjectReader.readers[root] = reader
+        return reader
+
+    @staticmethod
+    def closeAll():
+        with GitObjectReader.readersLock:
+            readers = list(GitObjectReader.readers.values())
+            GitObjectReader.readers.clear()
+        for reader in readers:
+            reader.close()
+
+    def relativePath(self, path: str) -> str:
+        '''Return path relative to the repository root, in the form git expects.'''
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def start(self):
+        self.process = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=self.root, stdin=PIPE, stdout=PIPE, stderr=subprocess.DEVNULL)
+
+    def read(self, revision: str, path: str) -> bytes:
+        '''Return the contents of path (relative to the repository root) at revision, or None if it doesn't exist there.'''
+        # cat-file reads object names a line at a time.
+        if '\n' in revision or '\n' in path:
+            return None
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self.start()
+            self.process.stdin.write(('%s:%s\n' % (revision, path)).encode('utf-8'))
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().decode('utf-8').rstrip('\n')
+            if not header:
+                # The process died - start a new one next time.
+                self.close()
+                return None
+            fields = header.split(' ')
+            # "<sha> <type> <size>", or "<name> missing" (or "ambiguous")
+            if len(fields) != 3 or fields[1] in ['missing', 'ambiguous']:
+                return None
+            size = int(fields[2])
+            content = self.process.stdout.read(size)
+            # Each object is followed by a newline.
+            self.process.stdout.read(1)
+            return content if fields[1] == 'blob' else None
+
+    def readText(self, revision: str, path: str) -> str:
+        content = self.read(revision, path)
+        return content.decode('utf-8') if content is not None else None
+
+    def close(self):
+        process = self.process
+        self.process = None
+        if process is not None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+            process.stdout.close()
+
+atexit.register(GitObjectReader.closeAll)
@@ -0,0 +1,106 @@
+'''
+versioningSupport.gitTags -- an in-process index of the version tags in a git repository.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import os
+import subprocess
+import threading
+from bisect import bisect_left
+from subprocess import PIPE
+
+from version.Version import CNVersion, CLIError
+
+__all__ = ['GitTagIndex', 'repositoryRoot']
+
+def repositoryRoot(path: str) -> str:
+    '''Return the top level of the git repository (or submodule) containing path, or None.'''
+    dirPath = os.path.abspath(path)
+    while True:
+        # Submodules have a .git file rather than a directory.
+        if os.path.exists(os.path.join(dirPath, '.git')):
+            return dirPath
+        parent = os.path.dirname(dirPath)
+        if parent == dirPath:
+            return None
+        dirPath = parent
+
+class GitTagIndex:
+    ''' The version tags of a repository, parsed once into CNVersions and kept in
+    Chisel version order (see CNVersion.sortKey()), so finding the latest tag for a
+    major version is a bisection rather than a scan.
+    '''
+    # Indexes we've already built, keyed by repository root.
+    indexes = {}
+    indexesLock = threading.Lock()
+
+    def __init__(self, tags):
+        entries = []
+        for tag in tags:
+            version = GitTagIndex.parseTag(tag)
+            if version is not None:
+                entries.append((version.sortKey(), tag, version))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.keys = [e[0] for e in entries]
+        self.tags = [e[1] for e in entries]
+        self.versions = [e[2] for e in entries]
+
+    @staticmethod
+    def parseTag(tag: str) -> CNVersion:
+        tag = tag.strip()
+        if not tag:
+            return None
+        try:
+            return CNVersion.parse(tag.strip('v'))
+        except CLIError:
+            return None
+
+    @staticmethod
+    def readTags(path: str) -> list:
+        '''Read all the tag names in the repository containing path with a single git command.'''
+        proc = subprocess.run(['git', 'for-each-ref', '--format=%(refname:strip=2)', 'refs/tags'], cwd=path, stdout=PIPE, stderr=PIPE, check=True, universal_newlines=True)
+        return proc.stdout.split('\n')
+
+    @staticmethod
+    def forPath(path: str) -> 'GitTagIndex':
+        '''Return the (shared) tag index for the repository containing path.'''
+        root = repositoryRoot(path)
+        key = root if root else os.path.abspath(path)
+        with GitTagIndex.indexesLock:
+            index = GitTagIndex.indexes.get(key)
+        if index is None:
+            index = GitTagIndex(GitTagIndex.readTags(path))
+            with GitTagIndex.indexesLock:
+                index = GitTagIndex.indexes.setdefault(key, index)
+        return index
+
+    @staticmethod
+    def invalidate():
+        '''Forget the indexes we've built (a long running process calls this when the tags may have changed).'''
+        with GitTagIndex.indexesLock:
+            GitTagIndex.indexes.clear()
+
+    def range(self, major: str) -> (int, int):
+        '''Return the (start, end) indices of the tags for a major ("X.Y") version.'''
+        (m0, m1) = [int(i) for i in major.split('.')]
+        return (bisect_left(self.keys, (m0, m1)), bisect_left(self.keys, (m0, m1 + 1)))
+
+    def latestForMajor(self, major: str) -> CNVersion:
+        '''Return the latest tagged version with a minor number for a major ("X.Y") version.'''
+        (start, end) = self.range(major)
+        # Versions without a minor number (SNAPSHOTs) sort first, so we'll usually stop on the first try.
+        for i in range(end - 1, start - 1, -1):
+            if self.versions[i].hasMinor():
+                return self.versions[i]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.tags)
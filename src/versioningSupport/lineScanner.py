@@ -0,0 +1,77 @@
+'''
+versioningSupport.lineScanner -- match lines against several regexes at once, after a cheap literal prefilter.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import re
+
+__all__ = ['LineMatch', 'LineScanner']
+
+groupNameRE = re.compile(r'\(\?P([<=])(\w+)')
+
+class LineMatch:
+    ''' The match of one alternative of a LineScanner, presenting the alternative's groups under their own names. '''
+    __slots__ = ['match', 'name', 'prefix']
+
+    def __init__(self, match, name: str):
+        self.match = match
+        self.name = name
+        self.prefix = name + '__'
+
+    def group(self, name: str) -> str:
+        return self.match.group(self.prefix + name)
+
+    def start(self, name: str) -> int:
+        return self.match.start(self.prefix + name)
+
+    def end(self, name: str) -> int:
+        return self.match.end(self.prefix + name)
+
+    @property
+    def string(self) -> str:
+        return self.match.string
+
+class LineScanner:
+    ''' Look for any of several (name, regex) alternatives in a line.
+    A line is only matched against the (combined) regex if it contains one of the anchors - literal
+    strings that every match must contain - so most lines are rejected with a single, simple search.
+    The alternatives are tried in order at each position, as a regex alternation is.
+    '''
+    def __init__(self, anchors: list, alternatives: list):
+        self.names = [name for (name, regex) in alternatives]
+        self.anchorRE = re.compile('|'.join([re.escape(a) for a in anchors]))
+        pieces = []
+        for (name, regex) in alternatives:
+            pattern = regex.pattern if hasattr(regex, 'pattern') else regex
+            # Qualify the alternative's group names (and references to them) so they're unique.
+            pattern = groupNameRE.sub(lambda m: '(?P%s%s__%s' % (m.group(1), name, m.group(2)), pattern)
+            pieces.append('(?P<%s>%s)' % (name, pattern))
+        self.regex = re.compile('|'.join(pieces))
+
+    @property
+    def pattern(self) -> str:
+        return self.regex.pattern
+
+    def isCandidate(self, line: str) -> bool:
+        '''Could line match (does it contain an anchor)?'''
+        return self.anchorRE.search(line) is not None
+
+    def wrap(self, m) -> LineMatch:
+        # The alternative's own group is the outermost, so it closes last.
+        return LineMatch(m, m.lastgroup) if m else None
+
+    def match(self, text: str) -> LineMatch:
+        '''Match the alternatives at the start of text.'''
+        return self.wrap(self.regex.match(text))
+
+    def search(self, text: str) -> LineMatch:
+        '''Find the first position in text where an alternative matches.'''
+        return self.wrap(self.regex.search(text))
@@ -0,0 +1,56 @@
+'''
+versioningSupport.makeDeps -- generate the make prerequisites (deps.mk) for a parallel release build.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import os
+
+from .dependencyGraph import DependencyGraph
+
+__all__ = ['stampDurations', 'writeDepsMk']
+
+def stampDurations(stampsDir: str, suffix: str) -> dict:
+    '''Return the duration (seconds) of the last build of each project, from the Makefile's stamps/<project>.<suffix>.begin and .end files.'''
+    durations = {}
+    if not stampsDir or not os.path.isdir(stampsDir):
+        return durations
+    endSuffix = '.' + suffix + '.end'
+    for name in os.listdir(stampsDir):
+        if not name.endswith(endSuffix):
+            continue
+        project = name[:-len(endSuffix)]
+        try:
+            end = os.stat(os.path.join(stampsDir, name)).st_mtime
+            begin = os.stat(os.path.join(stampsDir, project + '.' + suffix + '.begin')).st_mtime
+        except OSError:
+            continue
+        # A begin stamp newer than the end stamp is a build that failed or is in progress.
+        if end >= begin:
+            durations[project] = end - begin
+    return durations
+
+def writeDepsMk(graph: DependencyGraph, durations: dict, suffix: str, output, programName: str = 'versioning.py'):
+    '''Write the prerequisite rules for each project's suffix target, longest (critical path) chains first.
+    Projects without a recorded duration are given the mean of the known durations.
+    '''
+    defaultWeight = sum(durations.values()) / len(durations) if durations else 1.0
+    critical = graph.criticalPaths(durations, defaultWeight)
+    buildOrder = {md: i for i, md in enumerate(graph.order())}
+    # Heaviest chains first, ties broken by build order so the output is stable.
+    byCriticalPath = sorted(graph.nodes, key=lambda md: (-critical[md], buildOrder[md]))
+    print('# Generated by %s deps-mk - do not edit.' % (programName), file=output)
+    print('# Projects are listed longest chain first (critical path %s).' % ('seconds, from the build stamps' if durations else 'length - there are no build stamps'), file=output)
+    for md in byCriticalPath:
+        print('#  %s: %.0f' % (md, critical[md]), file=output)
+    print('CRITICAL_PATH_ORDER := %s' % (' '.join(byCriticalPath)), file=output)
+    for md in byCriticalPath:
+        prerequisites = sorted(graph.transitiveDependencies(md), key=lambda d: (-critical[d], buildOrder[d]))
+        print('%s.%s:\t%s' % (md, suffix, ' '.join(['%s.%s' % (d, suffix) for d in prerequisites])), file=output)
@@ -0,0 +1,84 @@
+'''
+versioningSupport.orderedPool -- run tasks concurrently while keeping their output in serial order.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ['orderedMap']
+
+class ThreadLocalStream:
+    ''' A stand-in for sys.stdout/sys.stderr that collects the output of pool threads
+    (so it can be replayed in order) and passes everything else straight through.
+    '''
+    def __init__(self, stream, local, name: str):
+        self.stream = stream
+        self.local = local
+        self.name = name
+
+    def write(self, text: str) -> int:
+        chunks = getattr(self.local, 'chunks', None)
+        if chunks is None:
+            return self.stream.write(text)
+        chunks.append((self.name, text))
+        return len(text)
+
+    def flush(self):
+        if getattr(self.local, 'chunks', None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def orderedMap(function, items, jobs: int = 1):
+    '''
+    Generate function(item) for each item, evaluating up to jobs of them concurrently.
+    Results, and anything the function writes to stdout or stderr, are delivered in the
+    order of items, exactly as they would be if the items were processed serially.
+    If a call raises an exception, the output of the preceding calls is delivered
+    and the exception is re-raised; calls that haven't started are cancelled.
+    '''
+    items = list(items)
+    if jobs is None or jobs <= 1 or len(items) <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    local = threading.local()
+    realStreams = {'stdout' : sys.stdout, 'stderr' : sys.stderr}
+
+    def task(item):
+        local.chunks = []
+        try:
+            return (function(item), None, local.chunks)
+        except BaseException as e:
+            return (None, e, local.chunks)
+        finally:
+            local.chunks = None
+
+    sys.stdout = ThreadLocalStream(realStreams['stdout'], local, 'stdout')
+    sys.stderr = ThreadLocalStream(realStreams['stderr'], local, 'stderr')
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        futures = [pool.submit(task, item) for item in items]
+        for future in futures:
+            (result, error, chunks) = future.result()
+            for (name, text) in chunks:
+                realStreams[name].write(text)
+            if error is not None:
+                raise error
+            yield result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        sys.stdout = realStreams['stdout']
+        sys.stderr = realStreams['stderr']
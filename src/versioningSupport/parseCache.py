@@ -0,0 +1,124 @@
+'''
+versioningSupport.parseCache -- persistent cache of the package information extracted from build files.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import hashlib
+import json
+import os
+import threading
+
+__all__ = ['ParseCache']
+
+class ParseCache:
+    ''' Map a build file's fingerprint (path, size, mtime_ns, content hash) to the
+    package name, version and dependency map extracted from it.
+    Entries that don't match the file's current fingerprint, or that are malformed,
+    are discarded. The whole cache is discarded if it was written by a different
+    parser (signature) or cache format.
+    '''
+    formatVersion = 1
+
+    def __init__(self, filename: str, signature: str):
+        self.filename = filename
+        self.signature = signature
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        # The cache may be shared by WorkContexts running on different threads.
+        self.lock = threading.RLock()
+        self.load()
+
+    @staticmethod
+    def fingerprint(stat: os.stat_result, content: bytes) -> dict:
+        return {
+            'size' : stat.st_size,
+            'mtime_ns' : stat.st_mtime_ns,
+            'digest' : hashlib.sha1(content).hexdigest()
+        }
+
+    @staticmethod
+    def isValidEntry(entry) -> bool:
+        if not isinstance(entry, dict):
+            return False
+        if not isinstance(entry.get('size'), int) or not isinstance(entry.get('mtime_ns'), int) or not isinstance(entry.get('digest'), str):
+            return False
+        for key in ['name', 'version']:
+            if entry.get(key) is not None and not isinstance(entry.get(key), str):
+                return False
+        dependencyMap = entry.get('map')
+        if not isinstance(dependencyMap, dict):
+            return False
+        return all(isinstance(k, str) and isinstance(v, str) for k, v in dependencyMap.items())
+
+    def load(self):
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as input:
+                data = json.load(input)
+        except (OSError, ValueError):
+            # An unreadable cache is simply rebuilt.
+            self.dirty = True
+            return
+        if not isinstance(data, dict) or data.get('format') != ParseCache.formatVersion or data.get('signature') != self.signature or not isinstance(data.get('files'), dict):
+            self.dirty = True
+            return
+        self.entries = data['files']
+
+    def lookup(self, path: str, fingerprint: dict) -> dict:
+        '''Return the cached information for path if it matches fingerprint, otherwise None.'''
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                if ParseCache.isValidEntry(entry) and all(entry[k] == v for k, v in fingerprint.items()):
+                    self.hits += 1
+                    return entry
+                # Stale or damaged - throw it away.
+                self.discard(path)
+            self.misses += 1
+            return None
+
+    def discard(self, path: str):
+        with self.lock:
+            if path in self.entries:
+                del self.entries[path]
+                self.dirty = True
+
+    def store(self, path: str, fingerprint: dict, name: str, version: str, dependencyMap: dict):
+        entry = dict(fingerprint)
+        entry['name'] = name
+        entry['version'] = version
+        entry['map'] = dict(dependencyMap)
+        with self.lock:
+            self.entries[path] = entry
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or not self.filename:
+                return
+            data = {
+                'format' : ParseCache.formatVersion,
+                'signature' : self.signature,
+                'files' : self.entries
+            }
+            outputFilename = self.filename + '.versioning'
+            try:
+                with open(outputFilename, 'w', encoding='utf-8') as output:
+                    json.dump(data, output, indent=1, sort_keys=True)
+                os.replace(outputFilename, self.filename)
+                self.dirty = False
+            except OSError:
+                # The cache is an optimization; failing to save it isn't fatal.
+                if os.path.exists(outputFilename):
+                    os.remove(outputFilename)
@@ -0,0 +1,201 @@
+'''
+versioningSupport.releaseTree -- generate a synthetic chisel-release style tree for benchmarks.
+
+The tree has a top level git repository with a version.yml and .gitmodules, and a git repository
+for each module, with a build.sbt or build.sc, a defaultVersions map (in both the "package" -> "version"
+and ModuleID styles), a long history of version bumps and many tags. Histories are written with
+git fast-import, so even large trees take seconds to generate.
+
+For example:
+  python3 src/versioningSupport/releaseTree.py -n 20 --commits 500 --tags 2000 /tmp/release
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import os
+import random
+import subprocess
+import sys
+from argparse import ArgumentParser
+from subprocess import PIPE
+
+__all__ = ['ModuleSpec', 'generateReleaseTree']
+
+organization = 'edu.berkeley.cs'
+branch = 'main'
+# The release tools expect the modules to be GitHub clones (they never contact the remote here).
+remoteUrl = 'https://github.com/synthetic-release/%s.git'
+# Keep the generated history independent of the time it was generated.
+epoch = 1570000000
+
+class ModuleSpec:
+    ''' The shape of one synthetic module: its build file flavor, dependency map style and dependencies. '''
+    def __init__(self, index: int, dependencies: list):
+        self.index = index
+        self.name = 'module%d' % (index)
+        self.buildFile = 'build.sc' if index % 4 == 3 else 'build.sbt'
+        self.moduleIdMap = index % 2 == 1
+        self.dependencies = dependencies
+        self.major = 1 + index % 3
+        self.firstMinor = index % 7
+
+    def snapshotVersion(self, series: int) -> str:
+        return '%d.%d-SNAPSHOT' % (self.major, self.firstMinor + series)
+
+    def releaseVersion(self, series: int, patch: int) -> str:
+        return '%d.%d.%d' % (self.major, self.firstMinor + series, patch)
+
+def mapLines(spec: ModuleSpec, dependencyVersions: dict) -> list:
+    if spec.moduleIdMap:
+        lines = ['val defaultVersions = Seq(']
+        entries = ['  "%s" %%%% "%s" %% "%s"' % (organization, d, v) for d, v in dependencyVersions.items()]
+    else:
+        lines = ['val defaultVersions = Map(']
+        entries = ['  "%s" -> "%s"' % (d, v) for d, v in dependencyVersions.items()]
+    if entries:
+        lines.append(',\n'.join(entries))
+    lines.append(')')
+    return lines
+
+def buildFileContent(spec: ModuleSpec, version: str, dependencyVersions: dict) -> str:
+    '''The contents of a module's build file, setting version, with the specified dependency map.'''
+    if spec.buildFile == 'build.sc':
+        lines = [
+            '// See LICENSE for license details.',
+            'import mill._',
+            'import mill.scalalib._',
+            '/* The dependency versions are maintained by the release tools. */',
+        ] + mapLines(spec, dependencyVersions) + [
+            'object %s extends ScalaModule with PublishModule {' % (spec.name),
+            '  override def artifactName = "%s"' % (spec.name),
+            '  def publishVersion = "%s"' % (version),
+            '  def scalaVersion = "2.12.13" // not a version we manage',
+            '}',
+        ]
+    else:
+        lines = [
+            '// See LICENSE for license details.',
+            'enablePlugins(BuildInfoPlugin)',
+            'organization := "%s"' % (organization),
+            'name := "%s"' % (spec.name),
+            'version := "%s"' % (version),
+            'resolvers ++= Seq(Resolver.sonatypeRepo("snapshots"), Resolver.sonatypeRepo("releases")) // https://oss.sonatype.org',
+            'scalaVersion := "2.12.13"',
+        ] + mapLines(spec, dependencyVersions) + [
+            'libraryDependencies ++= defaultVersions.map { case (dep, ver) => "%s" %%%% dep %% sys.props.getOrElse(dep + "Version", ver) }' % (organization),
+            'lazy val %s = (project in file("."))' % (spec.name),
+        ]
+    return '\n'.join(lines) + '\n'
+
+def fastImportData(stream: list, text: str):
+    data = text.encode('utf-8')
+    stream.append(b'data %d\n' % (len(data)))
+    stream.append(data)
+    stream.append(b'\n')
+
+def historyStream(spec: ModuleSpec, specs: list, nCommits: int, nTags: int) -> (bytes, str):
+    '''Return a git fast-import stream for the module's history, and the version at its head.
+    The history is divided into series (minor versions); each series has release commits (1.2.0, 1.2.1, ...)
+    between snapshot commits. The releases are tagged (the most recent first), and any remaining tags are
+    release candidates (v1.2.1-RC1, ...) on the commits before the releases, so the latest release is the
+    same according to both the tags and the history.
+    '''
+    nSeries = max(1, nCommits // 50)
+    stream = []
+    releases = []
+    version = None
+    for j in range(nCommits):
+        series = j * nSeries // nCommits
+        # The position of the commit in its series (the first commit of the series is the first j in it).
+        k = j + (-(series * nCommits) // nSeries)
+        last = j == nCommits - 1
+        release = not last and k % 5 == 4
+        version = spec.releaseVersion(series, k // 5) if release else spec.snapshotVersion(series)
+        if release:
+            releases.append((j, version))
+        dependencyVersions = {specs[d].name: specs[d].snapshotVersion(series) for d in spec.dependencies}
+        stream.append(b'commit refs/heads/%s\nmark :%d\n' % (branch.encode('utf-8'), j + 1))
+        stream.append(b'committer Release Bot <release@example.com> %d +0000\n' % (epoch + 3600 * j))
+        fastImportData(stream, 'Bump %s to %s\n' % (spec.name, version))
+        if j > 0:
+            stream.append(b'from :%d\n' % (j))
+        stream.append(b'M 100644 inline %s\n' % (spec.buildFile.encode('utf-8')))
+        fastImportData(stream, buildFileContent(spec, version, dependencyVersions))
+        stream.append(b'\n')
+    # The branch is up to date with its (pretend) remote.
+    stream.append(b'reset refs/remotes/origin/%s\nfrom :%d\n\n' % (branch.encode('utf-8'), nCommits))
+    tags = [('v' + v, j) for (j, v) in reversed(releases)][:nTags]
+    for k in range(nTags - len(tags) if releases else 0):
+        (j, v) = releases[k % len(releases)]
+        tags.append(('v%s-RC%d' % (v, k // len(releases) + 1), j - 1))
+    for (tag, j) in tags:
+        stream.append(b'reset refs/tags/%s\nfrom :%d\n\n' % (tag.encode('utf-8'), j + 1))
+    return (b''.join(stream), version)
+
+def git(cwd: str, *args, input: bytes = None):
+    subprocess.run(['git'] + list(args), cwd=cwd, input=input, stdout=PIPE, stderr=PIPE, check=True)
+
+def initRepository(path: str, name: str):
+    os.makedirs(path, exist_ok=True)
+    git(path, 'init', '-q', '-b', branch)
+    git(path, 'config', 'user.email', 'release@example.com')
+    git(path, 'config', 'user.name', 'Release Bot')
+    git(path, 'remote', 'add', 'origin', remoteUrl % (name))
+    git(path, 'config', 'branch.%s.remote' % (branch), 'origin')
+    git(path, 'config', 'branch.%s.merge' % (branch), 'refs/heads/' + branch)
+
+def generateReleaseTree(root: str, nModules: int, nCommits: int = 100, nTags: int = 100, maxDependencies: int = 4, seed: int = 1) -> dict:
+    '''
+    Generate a release tree of nModules modules in root (which shouldn't exist, or should be empty).
+    Each module depends on up to maxDependencies earlier modules and has nCommits commits and nTags tags.
+    :return: the version config (module directory: {packageName, version}) written to root/version.yml.
+    '''
+    rng = random.Random(seed)
+    specs = []
+    for i in range(nModules):
+        specs.append(ModuleSpec(i, sorted(rng.sample(range(i), min(i, rng.randint(0, maxDependencies))))))
+    initRepository(root, 'release')
+    versions = {}
+    for spec in specs:
+        path = os.path.join(root, spec.name)
+        initRepository(path, spec.name)
+        (stream, version) = historyStream(spec, specs, max(1, nCommits), nTags)
+        git(path, 'fast-import', '--quiet', input=stream)
+        git(path, 'checkout', '-q', '-f', branch)
+        versions[spec.name] = {'packageName' : spec.name, 'version' : version}
+    with open(os.path.join(root, 'version.yml'), 'w') as output:
+        output.write('versions:\n')
+        for md, v in versions.items():
+            output.write('  %s: {packageName: %s, version: %s}\n' % (md, v['packageName'], v['version']))
+    with open(os.path.join(root, '.gitmodules'), 'w') as output:
+        for spec in specs:
+            output.write('[submodule "%s"]\n\tpath = %s\n\turl = %s\n\tbranch = %s\n' % (spec.name, spec.name, remoteUrl % (spec.name), branch))
+    git(root, 'add', 'version.yml', '.gitmodules')
+    git(root, 'commit', '-q', '-m', 'Synthetic release tree')
+    return versions
+
+def main(argv=None) -> int:
+    program_name = os.path.basename(sys.argv[0])
+    parser = ArgumentParser(prog=program_name, description='Generate a synthetic release tree (for benchmarks).')
+    parser.add_argument('-n', '--modules', dest='modules', type=int, action='store', help='number of modules [default: %(default)s]', default=10)
+    parser.add_argument('--commits', dest='commits', type=int, action='store', help='number of commits in each module\'s history [default: %(default)s]', default=100)
+    parser.add_argument('--tags', dest='tags', type=int, action='store', help='number of tags in each module [default: %(default)s]', default=100)
+    parser.add_argument('--dependencies', dest='dependencies', type=int, action='store', help='maximum number of dependencies of a module [default: %(default)s]', default=4)
+    parser.add_argument('--seed', dest='seed', type=int, action='store', help='random seed [default: %(default)s]', default=1)
+    parser.add_argument(dest='root', help='directory to create the tree in')
+    args = parser.parse_args(argv)
+    if os.path.exists(args.root) and os.listdir(args.root):
+        print('%s: %s isn\'t empty' % (program_name, args.root), file=sys.stderr)
+        return 1
+    generateReleaseTree(args.root, args.modules, args.commits, args.tags, args.dependencies, args.seed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+'''
+versioningSupport.rewriter -- update build files in place by splicing in new version strings.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import os
+import shutil
+
+__all__ = ['applySplices', 'replaceFile']
+
+def applySplices(content: str, splices: list) -> str:
+    '''Return content with each (start, end, replacement) splice applied.
+    Splices are character offsets into the original content and must not overlap.
+    Everything outside the splices (comments, formatting, line terminators) is preserved.
+    '''
+    pieces = []
+    pos = 0
+    for (start, end, replacement) in sorted(splices, key=lambda s: s[0]):
+        if start < pos:
+            raise ValueError('overlapping splice at offset %d' % (start))
+        pieces.append(content[pos:start])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(content[pos:])
+    return ''.join(pieces)
+
+def rotateBackups(path: str, backups: int):
+    '''Make room for a new path.bak, keeping at most backups copies (path.bak, path.bak.1, ...).'''
+    names = [path + '.bak'] + ['%s.bak.%d' % (path, i) for i in range(1, backups)]
+    if os.path.exists(names[-1]):
+        os.remove(names[-1])
+    for i in range(len(names) - 1, 0, -1):
+        if os.path.exists(names[i - 1]):
+            os.replace(names[i - 1], names[i])
+
+def replaceFile(path: str, content: str, backups: int = 1):
+    '''Atomically replace the contents of path, keeping the previous contents as path.bak (if backups > 0).
+    The new contents are written once, to a temporary file in the same directory, which is then renamed over path.
+    '''
+    outputName = path + '.versioning'
+    try:
+        with open(outputName, 'w', newline='') as output:
+            output.write(content)
+        shutil.copymode(path, outputName)
+        if backups > 0:
+            rotateBackups(path, backups)
+            backupName = path + '.bak'
+            # A hard link preserves the original without copying it.
+            try:
+                os.link(path, backupName)
+            except OSError:
+                shutil.copy2(path, backupName)
+        os.replace(outputName, path)
+    finally:
+        if os.path.exists(outputName):
+            os.remove(outputName)
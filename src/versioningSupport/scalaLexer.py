@@ -0,0 +1,163 @@
+'''
+versioningSupport.scalaLexer -- a streaming lexer that strips comments from Scala source.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import re
+from bisect import bisect_right
+
+__all__ = ['ScalaLexer', 'StrippedLine']
+
+class StrippedLine(str):
+    ''' A line with its comments removed.
+    It behaves like a str (so it can be matched against regexes), and also records
+    where each of its pieces came from in the original line.
+    '''
+    def __new__(cls, text: str, textStarts: list, lineStarts: list):
+        self = super().__new__(cls, text)
+        # Each kept piece of the line starts at textStarts[i] in the stripped text
+        #  and at lineStarts[i] in the original line.
+        self.textStarts = textStarts
+        self.lineStarts = lineStarts
+        return self
+
+    def originalOffset(self, offset: int) -> int:
+        '''Map an offset in the stripped text to the corresponding offset in the original line.'''
+        if not self.textStarts:
+            return offset
+        i = max(bisect_right(self.textStarts, offset) - 1, 0)
+        return self.lineStarts[i] + offset - self.textStarts[i]
+
+    def originalSpan(self, start: int, end: int) -> (int, int):
+        '''Map a (start, end) span of the stripped text to the original line.'''
+        if end <= start:
+            offset = self.originalOffset(start)
+            return (offset, offset)
+        return (self.originalOffset(start), self.originalOffset(end - 1) + 1)
+
+class ScalaLexer:
+    ''' A one-pass lexer for Scala (sbt and mill) build files.
+    It tracks string literals (including triple-quoted strings, which may span lines),
+    character literals and nested block comments, so '//' inside a string (a URL, for
+    example) isn't mistaken for a comment. The state carried from one line to the next
+    is (block comment depth, in triple-quoted string).
+    Each line is scanned once: the regexes jump directly to the next character that
+    could change state.
+    '''
+    INITIAL = (0, False)
+
+    normalRE = re.compile(r'"""|"|\'|//|/\*')
+    stringRE = re.compile(r'\\.|"')
+    tripleEndRE = re.compile(r'"""+')
+    commentRE = re.compile(r'/\*|\*/')
+    charLiteralRE = re.compile(r"'(?:\\.[^']*|[^\\'\n])'")
+
+    @staticmethod
+    def initialState(state) -> tuple:
+        # Accept the boolean "in comment" flag used by the original decomment().
+        if state is None or state is False:
+            return ScalaLexer.INITIAL
+        if state is True:
+            return (1, False)
+        return state
+
+    def lexLine(self, line: str, state=None) -> (StrippedLine, tuple):
+        '''Remove the comments from a line, returning the stripped line and the state for the next line.'''
+        (depth, inTriple) = ScalaLexer.initialState(state)
+        pieces = []
+        textStarts = []
+        lineStarts = []
+        textLength = 0
+        lastEnd = -1
+        n = len(line)
+        pos = 0
+
+        def keep(start: int, end: int):
+            nonlocal textLength, lastEnd
+            if end <= start:
+                return
+            # Merge adjacent pieces so uncommented lines have a single segment.
+            if start != lastEnd:
+                textStarts.append(textLength)
+                lineStarts.append(start)
+            pieces.append(line[start:end])
+            textLength += end - start
+            lastEnd = end
+
+        while pos < n:
+            if depth > 0:
+                m = ScalaLexer.commentRE.search(line, pos)
+                if m is None:
+                    break
+                depth += 1 if m.group() == '/*' else -1
+                pos = m.end()
+            elif inTriple:
+                m = ScalaLexer.tripleEndRE.search(line, pos)
+                if m is None:
+                    keep(pos, n)
+                    break
+                keep(pos, m.end())
+                inTriple = False
+                pos = m.end()
+            else:
+                m = ScalaLexer.normalRE.search(line, pos)
+                if m is None:
+                    keep(pos, n)
+                    break
+                token = m.group()
+                if token == '//':
+                    keep(pos, m.start())
+                    break
+                elif token == '/*':
+                    keep(pos, m.start())
+                    depth = 1
+                    pos = m.end()
+                elif token == '"""':
+                    keep(pos, m.end())
+                    inTriple = True
+                    pos = m.end()
+                elif token == '"':
+                    # A single line string: skip escapes until the closing quote (or the end of the line).
+                    end = n
+                    search = m.end()
+                    while True:
+                        sm = ScalaLexer.stringRE.search(line, search)
+                        if sm is None:
+                            break
+                        if sm.group() == '"':
+                            end = sm.end()
+                            break
+                        search = sm.end()
+                    keep(pos, end)
+                    pos = end
+                else:
+                    # A character literal ('"') or a symbol ('foo).
+                    cm = ScalaLexer.charLiteralRE.match(line, m.start())
+                    end = cm.end() if cm else m.end()
+                    keep(pos, end)
+                    pos = end
+
+        return (StrippedLine(''.join(pieces), textStarts, lineStarts), (depth, inTriple))
+
+    def advance(self, line: str, state=None) -> tuple:
+        '''Return the state after line, lexing it only if it could change the state.
+        Outside comments and triple-quoted strings, only the start of one of them can change it.
+        '''
+        state = ScalaLexer.initialState(state)
+        if state == ScalaLexer.INITIAL and '/*' not in line and '"""' not in line:
+            return state
+        return self.lexLine(line, state)[1]
+
+    def lexLines(self, lines, state=None):
+        '''Generate a StrippedLine for each line (without its line terminator).'''
+        for line in lines:
+            (stripped, state) = self.lexLine(line.rstrip('\n'), state)
+            yield stripped
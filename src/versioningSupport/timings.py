@@ -0,0 +1,128 @@
+'''
+versioningSupport.timings -- per-phase (and per-module) wall and CPU time, and event counts.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+__all__ = ['Timings', 'timings']
+
+class Timings:
+    ''' Accumulate the wall and CPU time spent in named phases, and counts of events (files parsed, cache hits, ...),
+    both overall and for each module. Recording costs almost nothing until enable() is called.
+    CPU time is per thread (modules may be processed concurrently), so it's only comparable within a phase.
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.start = (time.perf_counter(), time.process_time())
+            self.phases = {}
+            self.counts = {}
+            self.modules = {}
+
+    def enable(self, enabled: bool = True):
+        self.reset()
+        self.enabled = enabled
+
+    @contextmanager
+    def phase(self, name: str, module: str = None):
+        '''Time the enclosed block as phase name (for module, if one is specified).'''
+        if not self.enabled:
+            yield
+            return
+        outer = getattr(self.local, 'module', None)
+        if module is not None:
+            self.local.module = module
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            self.local.module = outer
+            with self.lock:
+                self.accumulate(self.phases, name, wall, cpu)
+                if module is not None:
+                    self.accumulate(self.moduleEntry(module)['phases'], name, wall, cpu)
+
+    @staticmethod
+    def accumulate(phases: dict, name: str, wall: float, cpu: float):
+        entry = phases.get(name)
+        if entry is None:
+            entry = {'wall' : 0.0, 'cpu' : 0.0, 'calls' : 0}
+            phases[name] = entry
+        entry['wall'] += wall
+        entry['cpu'] += cpu
+        entry['calls'] += 1
+
+    def moduleEntry(self, module: str) -> dict:
+        entry = self.modules.get(module)
+        if entry is None:
+            entry = {'phases' : {}, 'counts' : {}}
+            self.modules[module] = entry
+        return entry
+
+    def count(self, name: str, n: int = 1, module: str = None):
+        '''Count n name events, for module (or the module of the enclosing phase, if there is one).'''
+        if not self.enabled:
+            return
+        if module is None:
+            module = getattr(self.local, 'module', None)
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+            if module is not None:
+                counts = self.moduleEntry(module)['counts']
+                counts[name] = counts.get(name, 0) + n
+
+    def auditHook(self, event: str, args):
+        # Installed once; counts the subprocesses started by anything (including GitPython) while enabled.
+        if event == 'subprocess.Popen' and self.enabled:
+            self.count('subprocesses')
+
+    def report(self) -> dict:
+        with self.lock:
+            return {
+                'total' : {'wall' : time.perf_counter() - self.start[0], 'cpu' : time.process_time() - self.start[1]},
+                'phases' : {name: dict(entry) for name, entry in self.phases.items()},
+                'counts' : dict(self.counts),
+                'modules' : {md: {'phases' : {name: dict(entry) for name, entry in m['phases'].items()}, 'counts' : dict(m['counts'])} for md, m in sorted(self.modules.items())}
+            }
+
+    def write(self, output, format: str = 'text'):
+        report = self.report()
+        if format == 'json':
+            json.dump(report, output, indent=1, sort_keys=True)
+            output.write('\n')
+            return
+        print('%-24s %9s %9s %6s' % ('phase', 'wall', 'cpu', 'calls'), file=output)
+        for name, entry in report['phases'].items():
+            print('%-24s %9.4f %9.4f %6d' % (name, entry['wall'], entry['cpu'], entry['calls']), file=output)
+        print('%-24s %9.4f %9.4f' % ('total', report['total']['wall'], report['total']['cpu']), file=output)
+        for name, n in sorted(report['counts'].items()):
+            print('%-24s %9d' % (name, n), file=output)
+        for md, m in report['modules'].items():
+            phases = ', '.join(['%s %.4f' % (name, entry['wall']) for name, entry in m['phases'].items()])
+            counts = ', '.join(['%s %d' % (name, n) for name, n in sorted(m['counts'].items())])
+            print('%s: %s%s' % (md, phases, ('; ' + counts) if counts else ''), file=output)
+
+# The program's timings; main() enables them for --timings.
+timings = Timings()
+sys.addaudithook(timings.auditHook)
@@ -0,0 +1,141 @@
+'''
+versioningSupport.versionHistory -- a persistent, incrementally updated index of the version settings in a build file's history.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+import json
+import os
+import subprocess
+import threading
+from subprocess import PIPE
+
+from .gitTags import repositoryRoot
+
+__all__ = ['VersionHistoryIndex']
+
+def gitDirectory(root: str) -> str:
+    '''Return the git directory for the repository whose top level is root.'''
+    dotGit = os.path.join(root, '.git')
+    if os.path.isdir(dotGit):
+        return dotGit
+    # Submodules (and worktrees) have a .git file pointing at the real git directory.
+    try:
+        with open(dotGit, 'r') as input:
+            line = input.readline().strip()
+    except OSError:
+        return None
+    if line.startswith('gitdir:'):
+        return os.path.normpath(os.path.join(root, line[len('gitdir:'):].strip()))
+    return None
+
+class VersionHistoryIndex:
+    ''' The commits that changed the version setting in a repository's build files,
+    and the versions they set (newest first).
+    The index is saved in the repository's git directory and records the last
+    commit scanned for each build file, so later runs only need to look at the
+    commits since then (last..HEAD). If HEAD is no longer a descendant of the last
+    commit scanned (the branch was switched or rewritten), the history is rescanned.
+    '''
+    formatVersion = 1
+    indexFilename = 'versioning-history.json'
+    # Indexes we've already loaded, keyed by repository root.
+    indexes = {}
+    indexesLock = threading.Lock()
+
+    def __init__(self, root: str):
+        self.root = root
+        gitDir = gitDirectory(root)
+        self.filename = os.path.join(gitDir, VersionHistoryIndex.indexFilename) if gitDir else None
+        self.files = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def forPath(path: str) -> 'VersionHistoryIndex':
+        '''Return the (shared) history index for the repository containing path.'''
+        root = repositoryRoot(path)
+        if root is None:
+            return None
+        with VersionHistoryIndex.indexesLock:
+            index = VersionHistoryIndex.indexes.get(root)
+            if index is None:
+                index = VersionHistoryIndex(root)
+                VersionHistoryIndex.indexes[root] = index
+        return index
+
+    def load(self):
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as input:
+                data = json.load(input)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('format') == VersionHistoryIndex.formatVersion and isinstance(data.get('files'), dict):
+            self.files = data['files']
+
+    def save(self):
+        if not self.filename:
+            return
+        data = {
+            'format' : VersionHistoryIndex.formatVersion,
+            'files' : self.files
+        }
+        outputFilename = self.filename + '.versioning'
+        try:
+            with open(outputFilename, 'w', encoding='utf-8') as output:
+                json.dump(data, output)
+            os.replace(outputFilename, self.filename)
+        except OSError:
+            # The index is an optimization; failing to save it isn't fatal.
+            if os.path.exists(outputFilename):
+                os.remove(outputFilename)
+
+    def git(self, *args, check=True) -> subprocess.CompletedProcess:
+        return subprocess.run(['git'] + list(args), cwd=self.root, stdout=PIPE, stderr=PIPE, check=check, universal_newlines=True)
+
+    def scan(self, relPath: str, versionTag: str, versionLineRegex, revisions: str) -> list:
+        '''Return (commit, version) for each version line added to relPath in revisions, newest first.'''
+        # The version tag uses POSIX character classes so the same expression works for git's -G.
+        proc = self.git('log', '-m', '-p', '--format=%x01%H', '-G' + versionTag + '"', revisions, '--', relPath)
+        changes = []
+        commit = None
+        for line in proc.stdout.split('\n'):
+            if line.startswith('\x01'):
+                commit = line[1:]
+            elif line.startswith('+') and not line.startswith('+++'):
+                lm = versionLineRegex.match(line[1:])
+                if lm and commit:
+                    changes.append([commit, lm.group('version')])
+        return changes
+
+    def versions(self, path: str, baseFileName: str, versionTag: str, versionLineRegex) -> list:
+        '''Return (commit, version) for each version set in the history of path/baseFileName, newest first.'''
+        relPath = os.path.relpath(os.path.join(os.path.abspath(path), baseFileName), self.root)
+        with self.lock:
+            proc = self.git('rev-parse', '--verify', '-q', 'HEAD', check=False)
+            if proc.returncode != 0:
+                return []
+            head = proc.stdout.strip()
+            entry = self.files.get(relPath)
+            if isinstance(entry, dict) and entry.get('head') == head and isinstance(entry.get('changes'), list):
+                return entry['changes']
+            changes = None
+            if isinstance(entry, dict) and isinstance(entry.get('changes'), list) and entry.get('head'):
+                last = entry['head']
+                # Is the last commit we scanned still part of the history?
+                if self.git('merge-base', '--is-ancestor', last, head, check=False).returncode == 0:
+                    changes = self.scan(relPath, versionTag, versionLineRegex, last + '..' + head) + entry['changes']
+            if changes is None:
+                changes = self.scan(relPath, versionTag, versionLineRegex, head)
+            self.files[relPath] = {'head' : head, 'changes' : changes}
+            self.save()
+            return changes
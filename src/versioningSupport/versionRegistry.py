@@ -0,0 +1,67 @@
+'''
+versioningSupport.versionRegistry -- an index of the versions set and pinned by the build files.
+
+@author:     Jim Lawson
+
+@copyright:  2019 UC Berkeley. All rights reserved.
+
+@license:    BSD-3-Clause
+
+@contact:    ucbjrl@berkeley.edu
+@deffield    updated: Updated
+'''
+
+__all__ = ['VersionRegistry']
+
+class VersionRegistry:
+    ''' Index the build files read for a set of modules:
+    packageName -> module directory -> build file -> version, and, in reverse,
+    dependency (packageName) -> build file -> the version it pins the dependency to.
+    Modules, and the files within them, are kept in the order they were added.
+    '''
+    def __init__(self):
+        self.packages = {}
+        self.moduleDirs = {}
+        self.pins = {}
+
+    @staticmethod
+    def fromVersionConfigs(versionConfigs: dict, moduleDirs=None) -> 'VersionRegistry':
+        '''Index the modules of a version config that have had their build files read (restricted to moduleDirs, if specified).'''
+        registry = VersionRegistry()
+        selected = set(moduleDirs) if moduleDirs is not None else None
+        for moduleDir, module in versionConfigs.items():
+            if (selected is None or moduleDir in selected) and 'paths' in module:
+                registry.addModule(moduleDir, module['packageName'], module['paths'])
+        return registry
+
+    def addModule(self, moduleDir: str, packageName: str, paths: dict):
+        '''Add a module's build files: paths maps each file to its {'version', 'map'}.'''
+        self.moduleDirs[moduleDir] = packageName
+        files = self.packages.setdefault(packageName, {}).setdefault(moduleDir, {})
+        for buildFile, info in paths.items():
+            files[buildFile] = info['version']
+            for dependency, version in info.get('map', {}).items():
+                self.pins.setdefault(dependency, {})[buildFile] = version
+
+    def versions(self, packageName: str) -> list:
+        '''Return the distinct versions set for packageName (in the order they were found).'''
+        return list(dict.fromkeys([v for files in self.packages.get(packageName, {}).values() for v in files.values()]))
+
+    def ambiguous(self) -> dict:
+        '''Return the packages whose build files set more than one version, with each (module directory, version, build file).'''
+        result = {}
+        for packageName, modules in self.packages.items():
+            if len(self.versions(packageName)) > 1:
+                result[packageName] = [(md, v, f) for md, files in modules.items() for f, v in files.items()]
+        return result
+
+    def pinnedBy(self, dependency: str, version: str = None) -> dict:
+        '''Return the build files that pin dependency (to version, if specified), with the version each pins it to.'''
+        pins = self.pins.get(dependency, {})
+        if version is None:
+            return dict(pins)
+        return {f: v for f, v in pins.items() if v == version}
+
+    def mismatchedPins(self, expected: dict) -> list:
+        '''Return (build file, dependency, pinned version, expected version) for each pin that differs from expected (packageName -> version).'''
+        return [(f, d, v, expected[d]) for d, pins in self.pins.items() if d in expected for f, v in pins.items() if v != expected[d]]